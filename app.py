@@ -1,12 +1,32 @@
-import requests
-from datetime import datetime, timezone
-import json
-from flask import Flask, jsonify, request
 import time
+_IMPORT_STARTED = time.perf_counter()
+
+from datetime import datetime, timezone, timedelta
+import json
+from flask import Flask, jsonify, request, Response, stream_with_context
 import re
 import os
-from supabase import create_client, Client
-from typing import Dict, Any, Optional
+import sys
+import atexit
+import bisect
+from array import array
+import hashlib
+import hmac
+import heapq
+import gzip
+import socket
+import gc
+import queue
+import random
+import tracemalloc
+import threading
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 app = Flask(__name__)
 
@@ -17,7 +37,468 @@ DEFAULT_NOTIFICATION_URL = "https://api.codewing.in"
 if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
     raise ValueError("Missing Supabase environment variables")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# Structured logging. Records are JSON lines (ASCII-escaped, so any app name is safe on
+# any stdout encoding) put on a bounded queue and written by a background thread, so
+# the processing loops never block on stdout. When the queue is full, records are
+# dropped and counted instead of making callers wait. LOG_SAMPLE_RATES keeps only a
+# fraction of high-volume levels, e.g. "debug=0.1,info=1"; warnings and errors are never sampled.
+LOG_LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+LOG_LEVEL = LOG_LEVELS.get(os.getenv('LOG_LEVEL', 'debug').lower(), 10)
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+def parse_log_sample_rates(value: str) -> tuple:
+    """Parse "level=rate,..." into ({level: rate}, [entries that were ignored])."""
+    rates: Dict[str, float] = {}
+    invalid = []
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        level, _, rate = item.partition('=')
+        level = level.strip().lower()
+        try:
+            parsed = float(rate)
+        except ValueError:
+            parsed = -1.0
+        if level not in LOG_LEVELS or not 0.0 <= parsed <= 1.0:
+            invalid.append(item.strip())
+            continue
+        rates[level] = parsed
+    return rates, invalid
+
+LOG_SAMPLE_RATES, LOG_SAMPLE_RATES_INVALID = parse_log_sample_rates(os.getenv('LOG_SAMPLE_RATES', ''))
+
+class StructuredLogger:
+    """JSON-lines logger fed from a queue and drained by a background writer thread."""
+
+    def __init__(self, stream=None, queue_size: int = LOG_QUEUE_SIZE):
+        self.stream = stream
+        self.queue: 'queue.Queue' = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.writer: Optional[threading.Thread] = None
+        self.writer_pid: Optional[int] = None
+        self.counts = {'written': 0, 'dropped': 0, 'sampled_out': 0, 'write_errors': 0}
+        self.counts_lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self.counts_lock:
+            self.counts[key] += amount
+
+    def log(self, level: str, event: str, **fields) -> None:
+        severity = LOG_LEVELS[level]
+        if severity < LOG_LEVEL:
+            return
+        rate = LOG_SAMPLE_RATES.get(level, 1.0)
+        if severity < LOG_LEVELS['warning'] and rate < 1.0 and random.random() >= rate:
+            self._count('sampled_out')
+            return
+        record = {'ts': datetime.now(timezone.utc).isoformat(), 'level': level, 'event': event}
+        record.update(fields)
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._count('dropped')
+
+    def debug(self, event: str, **fields) -> None:
+        self.log('debug', event, **fields)
+
+    def info(self, event: str, **fields) -> None:
+        self.log('info', event, **fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self.log('warning', event, **fields)
+
+    def error(self, event: str, **fields) -> None:
+        self.log('error', event, **fields)
+
+    def _ensure_writer(self) -> None:
+        # Started on first use, and again in a forked worker where the thread did not survive
+        if self.writer is not None and self.writer_pid == os.getpid():
+            return
+        with self.lock:
+            if self.writer is None or self.writer_pid != os.getpid():
+                self.writer_pid = os.getpid()
+                self.writer = threading.Thread(target=self._write_loop, name='log-writer', daemon=True)
+                self.writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        lines = ''.join(json.dumps(record, default=str) + "\n" for record in batch)
+        try:
+            stream = self.stream or sys.stdout
+            stream.write(lines)
+            stream.flush()
+            self._count('written', len(batch))
+        except Exception:
+            self._count('write_errors', len(batch))
+
+    def flush(self) -> None:
+        """Write whatever is still queued from the calling thread (used at exit)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.counts_lock:
+            counts = dict(self.counts)
+        return dict(counts, queued=self.queue.qsize(), sample_rates=LOG_SAMPLE_RATES)
+
+log = StructuredLogger()
+atexit.register(log.flush)
+if LOG_SAMPLE_RATES_INVALID:
+    log.warning('log_sample_rates_invalid', ignored=LOG_SAMPLE_RATES_INVALID, using=LOG_SAMPLE_RATES)
+
+# Heavy clients (the supabase stack, requests) are built on first use so a cold
+# start can answer /health and /keep_alive without paying for them
+_client_lock = threading.Lock()
+_supabase_client: Optional['Client'] = None
+_http_session = None
+
+_startup_profile: Dict[str, Any] = {
+    'module_import_ms': None,
+    'first_request_ms': None,
+    'lazy_clients': {}
+}
+
+def get_supabase() -> 'Client':
+    """Return the shared Supabase client, creating it on first use."""
+    global _supabase_client
+    if _supabase_client is None:
+        with _client_lock:
+            if _supabase_client is None:
+                started = time.perf_counter()
+                from supabase import create_client
+                _supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+                _startup_profile['lazy_clients']['supabase_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return _supabase_client
+
+def get_http_session():
+    """Return the shared pooled requests session, creating it on first use."""
+    global _http_session
+    if _http_session is None:
+        with _client_lock:
+            if _http_session is None:
+                started = time.perf_counter()
+                import requests
+                _http_session = requests.Session()
+                if os.getenv('HTTP_CASSETTE_MODE'):
+                    from http_cassette import install_cassette
+                    install_cassette(_http_session)
+                _startup_profile['lazy_clients']['http_session_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return _http_session
+
+class _LazySupabase:
+    """Stands in for the Supabase client and builds the real one on first attribute access."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_supabase(), name)
+
+supabase: 'Client' = _LazySupabase()
+
+# Per-thread run profiler, only set while a ?profile=1 request is being served
+_profile_state = threading.local()
+
+class RunProfiler:
+    """Collects a tree of timed spans for a single processing run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.root = {'name': 'run', 'category': 'run', 'start_ms': 0.0, 'duration_ms': None, 'children': []}
+        self.stack = [self.root]
+        self.totals: Dict[str, Dict[str, float]] = {}
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def push(self, name: str, category: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        span = {'name': name, 'category': category, 'start_ms': round(self._elapsed_ms(), 2), 'duration_ms': None, 'children': []}
+        if meta:
+            span['meta'] = meta
+        self.stack[-1]['children'].append(span)
+        self.stack.append(span)
+        return span
+
+    def pop(self, span: Dict[str, Any]) -> None:
+        span['duration_ms'] = round(self._elapsed_ms() - span['start_ms'], 2)
+        if self.stack and self.stack[-1] is span:
+            self.stack.pop()
+        totals = self.totals.setdefault(span['category'], {'count': 0, 'total_ms': 0.0})
+        totals['count'] += 1
+        totals['total_ms'] = round(totals['total_ms'] + span['duration_ms'], 2)
+
+    def report(self) -> Dict[str, Any]:
+        self.root['duration_ms'] = round(self._elapsed_ms(), 2)
+        return {
+            'total_ms': self.root['duration_ms'],
+            'totals_by_category': self.totals,
+            'spans': self.root['children']
+        }
+
+@contextmanager
+def profile_span(name: str, category: str, **meta):
+    """Time a block as a span of the current run profile; a no-op when profiling is off."""
+    profiler = getattr(_profile_state, 'profiler', None)
+    if profiler is None:
+        yield
+        return
+    span = profiler.push(name, category, meta)
+    try:
+        yield
+    finally:
+        profiler.pop(span)
+
+def run_profiled(func, **kwargs) -> Dict[str, Any]:
+    """Run a processing function, attaching a span report when the request has ?profile=1."""
+    if request.args.get('profile', '').lower() not in ('1', 'true', 'yes'):
+        return func(**kwargs)
+
+    profiler = RunProfiler()
+    _profile_state.profiler = profiler
+    try:
+        result = func(**kwargs)
+    finally:
+        _profile_state.profiler = None
+    result['profile'] = profiler.report()
+    return result
+
+# Statistical sampler behind GET /debug/profile. It is disabled unless DEBUG_PROFILE_TOKEN
+# is set; callers then send the token in an X-Debug-Token header. Samples every other
+# thread's stack with sys._current_frames(). If sampling costs more than
+# DEBUG_PROFILE_MAX_OVERHEAD of wall time, the interval is doubled until it fits.
+DEBUG_PROFILE_TOKEN = os.getenv('DEBUG_PROFILE_TOKEN', '')
+DEBUG_PROFILE_MAX_SECONDS = float(os.getenv('DEBUG_PROFILE_MAX_SECONDS', '30'))
+DEBUG_PROFILE_DEFAULT_HZ = float(os.getenv('DEBUG_PROFILE_DEFAULT_HZ', '100'))
+DEBUG_PROFILE_MAX_HZ = float(os.getenv('DEBUG_PROFILE_MAX_HZ', '250'))
+DEBUG_PROFILE_MAX_OVERHEAD = float(os.getenv('DEBUG_PROFILE_MAX_OVERHEAD', '0.02'))
+
+# One sampling session per process; overlapping sessions would double the overhead
+_sampling_lock = threading.Lock()
+
+class StackSampler:
+    """Samples the Python stacks of all other threads and folds them into collapsed stacks."""
+
+    def __init__(self, hz: float, with_lines: bool = False, max_overhead: float = DEBUG_PROFILE_MAX_OVERHEAD):
+        self.interval = 1.0 / hz
+        self.with_lines = with_lines
+        self.max_overhead = max_overhead
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.interval_backoffs = 0
+        self.elapsed = 0.0
+
+    def _frame_label(self, frame) -> str:
+        code = frame.f_code
+        label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return f"{label}:{frame.f_lineno}" if self.with_lines else label
+
+    def sample_once(self, skip_ident: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip_ident:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}").replace(';', ':'))
+            key = ';'.join(reversed(labels))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> None:
+        """Sample from the calling thread (which is excluded) for the given wall time."""
+        own_ident = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            tick = time.perf_counter()
+            if tick >= deadline:
+                break
+            self.sample_once(own_ident)
+            cost = time.perf_counter() - tick
+            self.sampling_seconds += cost
+            # The first samples are all overhead relative to elapsed time; judge after a few
+            if self.samples >= 10 and self.sampling_seconds > self.max_overhead * (time.perf_counter() - started) and self.interval < 1.0:
+                self.interval *= 2
+                self.interval_backoffs += 1
+            time.sleep(max(0.0, min(self.interval - cost, deadline - time.perf_counter())))
+        self.elapsed = time.perf_counter() - started
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format: `thread;outer;...;inner count`, one stack per line."""
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]))
+
+    def top_functions(self, limit: int = 20) -> list:
+        """Frames by self time (how often they were the innermost frame)."""
+        leaf_counts: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            leaf_counts[leaf] = leaf_counts.get(leaf, 0) + count
+        return [{'frame': frame, 'samples': count} for frame, count in heapq.nlargest(limit, leaf_counts.items(), key=lambda item: item[1])]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'samples': self.samples,
+            'elapsed_s': round(self.elapsed, 3),
+            'final_interval_ms': round(self.interval * 1000, 2),
+            'interval_backoffs': self.interval_backoffs,
+            'overhead': round(self.sampling_seconds / self.elapsed, 4) if self.elapsed else 0.0
+        }
+
+# Memory budget for a single instance; the free tier is killed above 512MB
+MEMORY_BUDGET_MB = float(os.getenv('MEMORY_BUDGET_MB', '400'))
+MEMORY_TRACEMALLOC = os.getenv('MEMORY_TRACEMALLOC', '').lower() in ('1', 'true', 'yes')
+
+if MEMORY_TRACEMALLOC:
+    tracemalloc.start()
+
+# Last effective batch size per counter key, so a run that had to shrink starts small next time
+_memory_batch_limits: Dict[str, int] = {}
+
+def get_rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            # Peak rather than current, but the best we have without /proc (KB on Linux, bytes on macOS)
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+        except Exception:
+            return 0.0
+
+class MemoryGovernor:
+    """Keeps a processing run under MEMORY_BUDGET_MB by collecting and shrinking the batch only when needed."""
+
+    def __init__(self, counter_key: str, max_batch: int, budget_mb: float = MEMORY_BUDGET_MB):
+        self.counter_key = counter_key
+        self.budget_mb = budget_mb
+        self.max_batch = max(1, max_batch)
+        self.batch_limit = min(self.max_batch, _memory_batch_limits.get(counter_key, self.max_batch))
+        self.start_rss_mb = get_rss_mb()
+        self.current_rss_mb = self.start_rss_mb
+        self.peak_rss_mb = self.start_rss_mb
+        self.collections = 0
+        self.top_allocations: list = []
+
+    def sample(self) -> float:
+        self.current_rss_mb = get_rss_mb()
+        self.peak_rss_mb = max(self.peak_rss_mb, self.current_rss_mb)
+        return self.current_rss_mb
+
+    def checkpoint(self) -> None:
+        """Sample memory after an app; collect and shrink only if the budget is crossed."""
+        rss = self.sample()
+        if rss < self.budget_mb:
+            # Plenty of headroom again, grow back towards the requested batch size
+            if rss < self.budget_mb * 0.7 and self.batch_limit < self.max_batch:
+                self.batch_limit = min(self.max_batch, self.batch_limit * 2)
+            return
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            self.top_allocations = [
+                {'location': str(stat.traceback), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:5]
+            ]
+
+        gc.collect()
+        self.collections += 1
+        if self.sample() >= self.budget_mb:
+            self.batch_limit = max(1, self.batch_limit // 2)
+            log.warning('memory_over_budget', rss_mb=round(self.current_rss_mb, 1), budget_mb=self.budget_mb, counter_key=self.counter_key, batch_limit=self.batch_limit)
+
+    def report(self) -> Dict[str, Any]:
+        # Only carry a reduced limit over; an unconstrained run should not cap the next one
+        if self.batch_limit < self.max_batch:
+            _memory_batch_limits[self.counter_key] = self.batch_limit
+        else:
+            _memory_batch_limits.pop(self.counter_key, None)
+        report = {
+            'rss_mb': round(self.sample(), 1),
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'start_rss_mb': round(self.start_rss_mb, 1),
+            'budget_mb': self.budget_mb,
+            'collections': self.collections,
+            'batch_limit': self.batch_limit
+        }
+        if self.top_allocations:
+            report['top_allocations'] = self.top_allocations
+        return report
+
+# Time kept back from deadline_ms for notifications and the cursor update
+DEADLINE_FLUSH_RESERVE_MS = int(os.getenv('DEADLINE_FLUSH_RESERVE_MS', '2000'))
+# Assumed cost of one app (fetch, writes, rate-limit sleep) until the run has measured its own
+DEADLINE_INITIAL_APP_ESTIMATE_MS = int(os.getenv('DEADLINE_INITIAL_APP_ESTIMATE_MS', '2500'))
+
+class RunDeadline:
+    """Time budget for a processing run; a deadline_ms of None means unbounded."""
+
+    def __init__(self, deadline_ms: Optional[int]):
+        self.deadline_ms = deadline_ms if deadline_ms and deadline_ms > 0 else None
+        self.started = time.monotonic()
+        self.app_estimate_ms = float(DEADLINE_INITIAL_APP_ESTIMATE_MS)
+        self.last_app_started: Optional[float] = None
+        self.stopped_early = False
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.deadline_ms is None:
+            return None
+        return self.deadline_ms - self.elapsed_ms()
+
+    def can_start_app(self) -> bool:
+        """Whether another app fits in the budget, leaving room to flush; marks the app as started."""
+        now = time.monotonic()
+        if self.last_app_started is not None:
+            # Time since the previous app started covers its fetch, writes and sleep
+            last_cost_ms = (now - self.last_app_started) * 1000
+            self.app_estimate_ms = 0.5 * self.app_estimate_ms + 0.5 * last_cost_ms
+
+        remaining = self.remaining_ms()
+        if remaining is not None and remaining < self.app_estimate_ms + DEADLINE_FLUSH_RESERVE_MS:
+            self.stopped_early = True
+            return False
+        self.last_app_started = now
+        return True
+
+    def request_timeout(self, default: float) -> float:
+        """Timeout in seconds for a flush request, capped by what is left of the budget."""
+        remaining = self.remaining_ms()
+        if remaining is None:
+            return default
+        return max(1.0, min(default, remaining / 1000))
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        if self.deadline_ms is None:
+            return None
+        return {
+            'deadline_ms': self.deadline_ms,
+            'used_ms': round(self.elapsed_ms(), 1),
+            'remaining_ms': round(self.remaining_ms(), 1),
+            'stopped_early': self.stopped_early,
+            'app_estimate_ms': round(self.app_estimate_ms, 1)
+        }
 
 def sanitize_string(s: str) -> str:
     """Natural Unicode-aware sanitization matching the JS implementation."""
@@ -37,52 +518,363 @@ def sanitize_string(s: str) -> str:
     res = re.sub(r'-+', '-', res)
     return res.strip('-')
 
+# Circuit breaker settings, applied per upstream host (testflight.apple.com, itunes.apple.com)
+CIRCUIT_WINDOW_SECONDS = float(os.getenv('CIRCUIT_WINDOW_SECONDS', '60'))
+CIRCUIT_MIN_REQUESTS = int(os.getenv('CIRCUIT_MIN_REQUESTS', '4'))
+CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5'))
+CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '60'))
+
+# Returned instead of a beta status when a fetch was skipped because its host's circuit is open
+CIRCUIT_OPEN_STATUS = 'circuit_open'
+
+ITUNES_SEARCH_URL = "https://itunes.apple.com/search"
+
+def is_host_failure_status(status_code: int) -> bool:
+    """Responses that say the host is struggling (throttling or server errors)."""
+    return status_code == 429 or status_code >= 500
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one upstream host.
+
+    Closed: requests flow and outcomes are kept for CIRCUIT_WINDOW_SECONDS. Once
+    the window holds CIRCUIT_MIN_REQUESTS with at least CIRCUIT_FAILURE_RATE
+    failures the circuit opens and requests are refused for CIRCUIT_OPEN_SECONDS.
+    After that a single half-open probe is let through; its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = 'closed'
+        self.outcomes: deque = deque()
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self.outcomes and now - self.outcomes[0][0] > CIRCUIT_WINDOW_SECONDS:
+            self.outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        self.state = 'open'
+        self.opened_at = now
+        self.times_opened += 1
+        self.outcomes.clear()
+        log.warning('circuit_opened', host=self.host, open_seconds=CIRCUIT_OPEN_SECONDS)
+
+    def allow_request(self) -> bool:
+        with self.lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < CIRCUIT_OPEN_SECONDS:
+                    return False
+                self.state = 'half_open'
+                self.probe_in_flight = False
+            if self.state == 'half_open':
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def record(self, success: bool) -> None:
+        with self.lock:
+            now = time.monotonic()
+            if self.state == 'half_open':
+                self.probe_in_flight = False
+                if success:
+                    self.state = 'closed'
+                    self.outcomes.clear()
+                    log.info('circuit_closed', host=self.host)
+                else:
+                    self._open(now)
+                return
+
+            self.outcomes.append((now, success))
+            self._trim(now)
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            if len(self.outcomes) >= CIRCUIT_MIN_REQUESTS and failures / len(self.outcomes) >= CIRCUIT_FAILURE_RATE:
+                self._open(now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            self._trim(time.monotonic())
+            snapshot = {
+                'state': self.state,
+                'window_requests': len(self.outcomes),
+                'window_failures': sum(1 for _, ok in self.outcomes if not ok),
+                'times_opened': self.times_opened
+            }
+            if self.state == 'open':
+                snapshot['retry_in_seconds'] = round(max(0.0, CIRCUIT_OPEN_SECONDS - (time.monotonic() - self.opened_at)), 1)
+            return snapshot
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    host = urlparse(url).netloc.lower()
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(host)
+        if breaker is None:
+            breaker = _circuit_breakers[host] = CircuitBreaker(host)
+        return breaker
+
+def circuit_breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.values())
+    return {breaker.host: breaker.snapshot() for breaker in breakers}
+
+# Only the head of a TestFlight page is needed to classify it
+BETA_PAGE_MAX_BYTES = 10240
+
+def classify_beta_page(content: str) -> str:
+    """Map the text of a TestFlight join page to a betaAvailable status."""
+    content = content.lower()
+    if "this beta is full" in content:
+        return 'full'
+    if "this beta isn't accepting any new testers right now" in content:
+        return 'not accepting'
+    if "join the" in content or "start testing" in content:
+        return 'open'
+    return 'unknown'
+
+# Hedged TestFlight fetches. A fetch that has not produced response headers within the
+# recent p95 time to first byte gets a second, identical request, and the first real
+# answer wins. Hedges draw on a budget that earns HEDGE_BUDGET_RATIO of a token per
+# fetch (at most HEDGE_BUDGET_BURST banked), so extra load on Apple stays at a few
+# percent. HEDGE_BUDGET_RATIO=0 turns hedging off. Both requests share the original
+# BETA_FETCH_TIMEOUT_SECONDS deadline, so a hedge never makes a fetch slower.
+BETA_FETCH_TIMEOUT_SECONDS = 3.0
+HEDGE_BUDGET_RATIO = float(os.getenv('HEDGE_BUDGET_RATIO', '0.05'))
+HEDGE_BUDGET_BURST = float(os.getenv('HEDGE_BUDGET_BURST', '10'))
+HEDGE_MIN_DELAY_MS = float(os.getenv('HEDGE_MIN_DELAY_MS', '200'))
+HEDGE_MAX_DELAY_MS = float(os.getenv('HEDGE_MAX_DELAY_MS', '1500'))
+HEDGE_MAX_WORKERS = int(os.getenv('HEDGE_MAX_WORKERS', '32'))
+# Hedge delay used until enough first-byte times have been seen
+HEDGE_INITIAL_DELAY_MS = 1000
+HEDGE_WINDOW = 500
+HEDGE_MIN_SAMPLES = 20
+
+# Statuses that are not an answer about the beta; a hedge is still worth waiting for
+FETCH_FAILURE_STATUSES = ('timeout', 'error')
+
+class HedgePolicy:
+    """Adaptive hedge delay (p95 of recent time to first byte) and the token budget for hedges."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.first_byte_seconds: deque = deque(maxlen=HEDGE_WINDOW)
+        self.new_samples = 0
+        self.current_delay = HEDGE_INITIAL_DELAY_MS / 1000
+        self.tokens = HEDGE_BUDGET_BURST
+        self.stats = {'fetches': 0, 'hedged': 0, 'hedge_wins': 0, 'budget_denied': 0}
+
+    def enabled(self) -> bool:
+        return HEDGE_BUDGET_RATIO > 0
+
+    def observe(self, seconds: float) -> None:
+        """Record a time to first byte; fetches that timed out waiting count at their full wait."""
+        with self.lock:
+            self.first_byte_seconds.append(seconds)
+            self.new_samples += 1
+            # Sorting the window on every sample would cost more than the hedging saves
+            if len(self.first_byte_seconds) >= HEDGE_MIN_SAMPLES and self.new_samples >= 10:
+                self.new_samples = 0
+                ordered = sorted(self.first_byte_seconds)
+                p95 = ordered[int(0.95 * (len(ordered) - 1))]
+                self.current_delay = min(max(p95, HEDGE_MIN_DELAY_MS / 1000), HEDGE_MAX_DELAY_MS / 1000)
+
+    def delay(self) -> float:
+        return self.current_delay
+
+    def start_fetch(self) -> None:
+        with self.lock:
+            self.stats['fetches'] += 1
+            self.tokens = min(HEDGE_BUDGET_BURST, self.tokens + HEDGE_BUDGET_RATIO)
+
+    def try_hedge(self) -> bool:
+        with self.lock:
+            if self.tokens < 1:
+                self.stats['budget_denied'] += 1
+                return False
+            self.tokens -= 1
+            self.stats['hedged'] += 1
+            return True
+
+    def record_win(self) -> None:
+        with self.lock:
+            self.stats['hedge_wins'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.stats, delay_ms=round(self.current_delay * 1000, 1), tokens=round(self.tokens, 2), samples=len(self.first_byte_seconds))
+
+hedge_policy = HedgePolicy()
+_hedge_executor = None
+
+def get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _client_lock:
+            if _hedge_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix='beta-fetch')
+    return _hedge_executor
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one in-flight call and its result."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key: str, func, *args) -> tuple:
+        """Run func(*args) unless a call for key is already running; returns (result, shared)."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+                self.stats['calls'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            with profile_span('single_flight_wait', self.name, key=key):
+                call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+        try:
+            call['result'] = func(*args)
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call['done'].set()
+        return call['result'], False
+
+# Concurrent checks of one link share a fetch, and concurrent writes of one app share
+# the update (and its history insert and trim) instead of racing each other
+beta_fetch_flights = SingleFlight('fetch')
+status_update_flights = SingleFlight('persist')
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    return {flights.name: dict(flights.stats) for flights in (beta_fetch_flights, status_update_flights)}
+
 def fetch_beta_availability(url: str) -> str:
+    return beta_fetch_flights.do(url, _fetch_beta_availability, url)[0]
+
+def _fetch_beta_availability(url: str) -> str:
+    breaker = get_circuit_breaker(url)
+    if not breaker.allow_request():
+        return CIRCUIT_OPEN_STATUS
+
+    host_ok = False
+    with profile_span('fetch_beta_availability', 'fetch', url=url):
+        try:
+            # Half-open probes stay single so a recovering host gets one request
+            if hedge_policy.enabled() and breaker.state == 'closed':
+                status, host_ok = _hedged_beta_fetch(url)
+            else:
+                status, host_ok = _beta_page_attempt(url, BETA_FETCH_TIMEOUT_SECONDS, threading.Event(), threading.Event())
+            return status
+        finally:
+            breaker.record(bool(host_ok))
+
+def _hedged_beta_fetch(url: str) -> tuple:
+    from concurrent.futures import wait, FIRST_COMPLETED
+    started = time.perf_counter()
+    hedge_policy.start_fetch()
+    first_byte = threading.Event()
+    cancelled = threading.Event()
+    executor = get_hedge_executor()
+    primary = executor.submit(_beta_page_attempt, url, BETA_FETCH_TIMEOUT_SECONDS, first_byte, cancelled)
+    # A primary that fails fast must not leave us waiting out the hedge delay
+    primary.add_done_callback(lambda future: first_byte.set())
+    if first_byte.wait(hedge_policy.delay()) or not hedge_policy.try_hedge():
+        return primary.result()
+
+    remaining = BETA_FETCH_TIMEOUT_SECONDS - (time.perf_counter() - started)
+    hedge = executor.submit(_beta_page_attempt, url, max(remaining, 0.1), threading.Event(), cancelled)
+    pending = {primary, hedge}
+    result = ('timeout', False)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            if result[0] not in FETCH_FAILURE_STATUSES:
+                cancelled.set()
+                if future is hedge:
+                    hedge_policy.record_win()
+                return result
+    return result
+
+def _beta_page_attempt(url: str, timeout: float, first_byte: threading.Event, cancelled: threading.Event) -> tuple:
+    """One GET of a TestFlight page; returns (status, host_ok). Stops early once cancelled is set."""
+    import requests
+    started = time.perf_counter()
     try:
         # Reduced timeout and smaller buffer to save memory
-        response = requests.get(url, timeout=3, stream=True)
+        response = get_http_session().get(url, timeout=timeout, stream=True)
+        hedge_policy.observe(time.perf_counter() - started)
+        first_byte.set()
         response.raise_for_status()
         response.encoding = 'utf-8'
-        
+    
         # Read only first 10KB to save memory
         content_chunks = []
         total_size = 0
-        max_size = 10240  # 10KB limit
-        
+        max_size = BETA_PAGE_MAX_BYTES  # 10KB limit
+    
         for chunk in response.iter_content(chunk_size=1024):
+            if cancelled.is_set():
+                response.close()
+                return 'cancelled', None
             if chunk:
                 content_chunks.append(chunk.decode('utf-8', errors='ignore'))
                 total_size += len(chunk)
                 if total_size > max_size:
                     break
-        
+    
         response.close()
-        content = ''.join(content_chunks).lower()
-        
+        content = ''.join(content_chunks)
+    
         # Clear chunks from memory
         del content_chunks
-        
-        if "this beta is full" in content:
-            return 'full'
-        if "this beta isn't accepting any new testers right now" in content:
-            return 'not accepting'
-        if "join the" in content or "start testing" in content:
-            return 'open'
-        return 'unknown'
-        
+    
+        return classify_beta_page(content), True
+    
     except requests.exceptions.Timeout:
-        return 'timeout'
+        if not first_byte.is_set():
+            hedge_policy.observe(time.perf_counter() - started)
+        return 'timeout', False
+    except requests.exceptions.HTTPError as e:
+        # A dead link is the app's problem, not the host's
+        return 'error', not is_host_failure_status(e.response.status_code if e.response is not None else 0)
     except requests.exceptions.RequestException as e:
-        return 'error'
+        return 'error', False
 
 def fetch_app_info_from_itunes(app_name: str) -> Optional[Dict[str, Any]]:
     """Fetch app information from iTunes Search API"""
+    breaker = get_circuit_breaker(ITUNES_SEARCH_URL)
+    if not breaker.allow_request():
+        return None
+
     try:
         # Properly encode the app name for URL
         import urllib.parse
         encoded_app_name = urllib.parse.quote(app_name)
-        search_url = f"https://itunes.apple.com/search?term={encoded_app_name}&entity=software"
-        search_response = requests.get(search_url, timeout=10)
+        search_url = f"{ITUNES_SEARCH_URL}?term={encoded_app_name}&entity=software"
+        try:
+            search_response = get_http_session().get(search_url, timeout=10)
+        except Exception:
+            breaker.record(False)
+            raise
+        breaker.record(not is_host_failure_status(search_response.status_code))
         
         if search_response.status_code == 200:
             search_data = search_response.json()
@@ -124,10 +916,7 @@ def fetch_app_info_from_itunes(app_name: str) -> Optional[Dict[str, Any]]:
                         }
         return None
     except Exception as e:
-        try:
-            print(f"Error fetching iTunes info for {app_name}: {e}")
-        except UnicodeEncodeError:
-            print(f"Error fetching iTunes info for [App with special characters]: {e}")
+        log.error('itunes_fetch_failed', app=app_name, error=str(e))
         return None
 
 def enrich_app_with_itunes_data(app_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -139,10 +928,7 @@ def enrich_app_with_itunes_data(app_data: Dict[str, Any]) -> Dict[str, Any]:
     )
     
     if needs_enrichment:
-        try:
-            print(f"Enriching app data for: {app_data['name']} (missing screenshots and description)")
-        except UnicodeEncodeError:
-            print(f"Enriching app data for: [App with special characters] (missing screenshots and description)")
+        log.debug('enriching_app', app=app_data['name'], reason='missing screenshots and description')
         
         itunes_info = fetch_app_info_from_itunes(app_data['name'])
         
@@ -164,151 +950,1225 @@ def enrich_app_with_itunes_data(app_data: Dict[str, Any]) -> Dict[str, Any]:
             if not app_data.get('logo') and itunes_info.get('logo'):
                 app_data['logo'] = itunes_info['logo']
             
-            try:
-                print(f"Successfully enriched app data for: {app_data['name']}")
-            except UnicodeEncodeError:
-                print("Successfully enriched app data for: [App with special characters]")
+            log.debug('app_enriched', app=app_data['name'])
         else:
-            try:
-                print(f"Could not fetch iTunes data for: {app_data['name']}")
-            except UnicodeEncodeError:
-                print("Could not fetch iTunes data for: [App with special characters]")
+            log.info('itunes_data_missing', app=app_data['name'])
     
     return app_data
 
+# Number of app_history rows kept per app
+HISTORY_LIMIT = 30
+
+def build_new_app(app_data: Dict[str, Any], sanitized_name: str) -> Dict[str, Any]:
+    """Row inserted into `apps` the first time an app is seen."""
+    return {
+        'name': app_data['name'],
+        'sanitizedName': sanitized_name,
+        'link': app_data.get('link', ''),
+        'logo': app_data.get('logo', ''),
+        'appType': app_data.get('appType', 'Beta'),
+        'betaAvailable': app_data.get('betaAvailable', 'unknown'),
+        'clickCount': app_data.get('clickCount', 0),
+        'description': app_data.get('description', ''),
+        'categories': app_data.get('categories', []),
+        'appStore': app_data.get('appStore', ''),
+        'screenshotUrls': app_data.get('screenshotUrls', []),
+        'features': app_data.get('features', []),
+        'artistViewUrl': app_data.get('artistViewUrl', ''),
+        'trackContentRating': app_data.get('trackContentRating', ''),
+        'primaryGenreName': app_data.get('primaryGenreName', ''),
+        'sellerName': app_data.get('sellerName', ''),
+        'artworkUrl100': app_data.get('artworkUrl100', ''),
+        'lastChecked': datetime.now(timezone.utc).isoformat()
+    }
+
+def app_data_unchanged(current_app: Dict[str, Any], app_data: Dict[str, Any]) -> bool:
+    """True when a fresh check would not change anything stored for the app."""
+    # Normalize values for proper comparison
+    return (
+        current_app.get('clickCount', 0) == app_data['clickCount'] and
+        current_app.get('betaAvailable', 'unknown') == app_data['betaAvailable'] and
+        (current_app.get('screenshotUrls') or []) == (app_data.get('screenshotUrls') or []) and
+        (current_app.get('description') or '') == (app_data.get('description') or '') and
+        (current_app.get('categories') or []) == (app_data.get('categories') or []) and
+        (current_app.get('features') or []) == (app_data.get('features') or []) and
+        (current_app.get('appStore') or '') == (app_data.get('appStore') or '') and
+        (current_app.get('artistViewUrl') or '') == (app_data.get('artistViewUrl') or '') and
+        (current_app.get('logo') or '') == (app_data.get('logo') or '')
+    )
+
+def is_status_change_to_open(previous_status: Optional[str], new_status: str) -> bool:
+    return previous_status in ['full', 'not accepting', 'error', 'unknown'] and new_status == 'open'
+
+def build_app_update(app_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Columns written to `apps` when a check changed something."""
+    return {
+        'betaAvailable': app_data['betaAvailable'],
+        'clickCount': app_data['clickCount'],  # Ensure we're using the new click count
+        'link': app_data['link'],
+        'logo': app_data['logo'],
+        'screenshotUrls': app_data.get('screenshotUrls', []),
+        'description': app_data.get('description', ''),
+        'categories': app_data.get('categories', []),
+        'features': app_data.get('features', []),
+        'appStore': app_data.get('appStore', ''),
+        'artistViewUrl': app_data.get('artistViewUrl', ''),
+        'trackContentRating': app_data.get('trackContentRating', ''),
+        'primaryGenreName': app_data.get('primaryGenreName', ''),
+        'sellerName': app_data.get('sellerName', ''),
+        'artworkUrl100': app_data.get('artworkUrl100', ''),
+        'lastChecked': datetime.now(timezone.utc).isoformat()
+    }
+
+def build_history_entry(app_id: Any, app_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'appId': app_id,
+        'status': app_data['betaAvailable'],
+        'clickCount': app_data['clickCount'],
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
+
 def get_or_create_app(app_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     sanitized_name = sanitize_string(app_data['name'])
     
     try:
-        result = supabase.table('apps').select('*').eq('sanitizedName', sanitized_name).execute()
+        with profile_span('apps.select', 'supabase'):
+            result = supabase.table('apps').select('*').eq('sanitizedName', sanitized_name).execute()
         
         if result.data:
             return result.data[0]
         
-        new_app = {
-            'name': app_data['name'],
-            'sanitizedName': sanitized_name,
-            'link': app_data.get('link', ''),
-            'logo': app_data.get('logo', ''),
-            'appType': app_data.get('appType', 'Beta'),
-            'betaAvailable': app_data.get('betaAvailable', 'unknown'),
-            'clickCount': app_data.get('clickCount', 0),
-            'description': app_data.get('description', ''),
-            'categories': app_data.get('categories', []),
-            'appStore': app_data.get('appStore', ''),
-            'screenshotUrls': app_data.get('screenshotUrls', []),
-            'features': app_data.get('features', []),
-            'artistViewUrl': app_data.get('artistViewUrl', ''),
-            'trackContentRating': app_data.get('trackContentRating', ''),
-            'primaryGenreName': app_data.get('primaryGenreName', ''),
-            'sellerName': app_data.get('sellerName', ''),
-            'artworkUrl100': app_data.get('artworkUrl100', ''),
-            'lastChecked': datetime.now(timezone.utc).isoformat()
-        }
+        new_app = build_new_app(app_data, sanitized_name)
         
-        result = supabase.table('apps').insert(new_app).execute()
+        with profile_span('apps.insert', 'supabase'):
+            result = supabase.table('apps').insert(new_app).execute()
+        app_snapshot.apply_rows(result.data)
         return result.data[0] if result.data else None
         
     except Exception as e:
         return None
 
+# Status-change events kept in memory for SSE replay
+STATUS_EVENT_BUFFER_SIZE = int(os.getenv('STATUS_EVENT_BUFFER_SIZE', '1000'))
+SSE_KEEPALIVE_SECONDS = 15
+# The threaded /events route holds a worker thread per subscriber, so it takes at
+# most SSE_MAX_SUBSCRIBERS at once and ends each stream after SSE_MAX_STREAM_SECONDS
+# (clients reconnect with Last-Event-ID); the ASGI route has no such limits
+SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', '8'))
+SSE_MAX_STREAM_SECONDS = int(os.getenv('SSE_MAX_STREAM_SECONDS', '300'))
+
+class StatusEventBroadcaster:
+    """In-process ring buffer of status-change events that any number of SSE subscribers follow.
+
+    Event ids are `<boot>-<seq>`, so a client reconnecting with an id from before a
+    restart gets the whole retained buffer instead of silently missing events. Reads
+    also say how many events after the client's id were already pushed out of the
+    buffer, so the stream can tell the client to resync.
+    """
+
+    def __init__(self, size: int = STATUS_EVENT_BUFFER_SIZE):
+        self.boot = format(int(time.time()), 'x')
+        self.events: deque = deque(maxlen=size)
+        self.next_seq = 1
+        self.condition = threading.Condition()
+        self.async_waiters: set = set()
+        self.subscribers = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        with self.condition:
+            event = {'id': f'{self.boot}-{self.next_seq}', 'seq': self.next_seq, 'event': event_type, 'data': data}
+            self.next_seq += 1
+            self.events.append(event)
+            self.condition.notify_all()
+            waiters = list(self.async_waiters)
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone
+                self.remove_async_waiter((loop, waiter))
+
+    def _seq_from_id(self, last_event_id: Optional[str]) -> int:
+        if not last_event_id:
+            return self.next_seq - 1
+        boot, _, seq = last_event_id.partition('-')
+        if boot != self.boot or not seq.isdigit():
+            return 0
+        return int(seq)
+
+    def _after(self, last_seq: int) -> tuple:
+        oldest = self.events[0]['seq'] if self.events else self.next_seq
+        return [event for event in self.events if event['seq'] > last_seq], max(0, oldest - last_seq - 1)
+
+    def events_after(self, last_event_id: Optional[str]) -> tuple:
+        """(retained events after last_event_id, count of evicted ones between); no id means only new events."""
+        last_seq = self._seq_from_id(last_event_id)
+        with self.condition:
+            return self._after(last_seq)
+
+    def wait_for_events(self, last_event_id: Optional[str], timeout: float) -> tuple:
+        last_seq = self._seq_from_id(last_event_id)
+        with self.condition:
+            if self.next_seq - 1 <= last_seq:
+                self.condition.wait(timeout)
+            return self._after(last_seq)
+
+    def subscribe(self, limit: int) -> bool:
+        """Take one of `limit` subscriber slots; False when they are all in use."""
+        with self.condition:
+            if self.subscribers >= limit:
+                return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self) -> None:
+        with self.condition:
+            self.subscribers = max(0, self.subscribers - 1)
+
+    def add_async_waiter(self, waiter: tuple) -> None:
+        """Register an (event loop, asyncio.Event) pair that is set on every publish."""
+        with self.condition:
+            self.async_waiters.add(waiter)
+
+    def remove_async_waiter(self, waiter: tuple) -> None:
+        with self.condition:
+            self.async_waiters.discard(waiter)
+
+    def latest_id(self) -> str:
+        return f'{self.boot}-{self.next_seq - 1}'
+
+status_events = StatusEventBroadcaster()
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+def format_resync(missed: int) -> str:
+    """Tells a subscriber that fell behind the buffer to reload state (e.g. GET /apps)."""
+    return f"event: resync\ndata: {json.dumps({'missed': missed})}\n\n"
+
+def publish_status_outcome(app_data: Dict[str, Any], update_result: Dict[str, Any]) -> None:
+    """Broadcast an update_app_status outcome when the app's beta status actually moved."""
+    if not update_result.get('updated') or 'current_status' not in update_result:
+        return
+    if update_result['current_status'] == update_result.get('previous_status'):
+        return
+    status_events.publish('status', {
+        'name': update_result['name'],
+        'sanitizedName': sanitize_string(update_result['name']),
+        'link': app_data.get('link', ''),
+        'previous_status': update_result['previous_status'],
+        'current_status': update_result['current_status'],
+        'status_changed': update_result['status_changed'],
+        'click_count': update_result['click_count'],
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    })
+
+# Columnar catalog: one packed column per field instead of one dict per app.
+# Text fields are a single joined string plus end offsets, integers live in
+# array('q'), betaAvailable is a one-byte code into STATUS_CODES and category
+# lists are shared tuples of interned names. Rows are materialised lazily
+# through AppRow views, so only the apps a run actually checks become dicts.
+STATUS_CODES = ['open', 'full', 'not accepting', 'unknown', 'timeout', 'error']
+CATALOG_TEXT_FIELDS = ('name', 'sanitizedName', 'link', 'logo', 'lastChecked')
+CATALOG_INT_FIELDS = ('id', 'clickCount')
+_MISSING = object()
+_SLOT_MISSING, _SLOT_NONE, _SLOT_VALUE, _SLOT_OTHER = 0, 1, 2, 3
+
+class _TextColumn:
+    __slots__ = ('_kinds', '_ends', '_text', '_pending', '_other')
+
+    def __init__(self):
+        self._kinds = bytearray()
+        self._ends = array('q')
+        self._text = ''
+        self._pending = []
+        self._other = {}
+
+    def append(self, value: Any) -> None:
+        end = self._ends[-1] if self._ends else 0
+        if isinstance(value, str):
+            self._kinds.append(_SLOT_VALUE)
+            self._pending.append(value)
+            end += len(value)
+            if len(self._pending) >= 4096:
+                self.flush()
+        elif value is _MISSING:
+            self._kinds.append(_SLOT_MISSING)
+        elif value is None:
+            self._kinds.append(_SLOT_NONE)
+        else:
+            self._other[len(self._kinds)] = value
+            self._kinds.append(_SLOT_OTHER)
+        self._ends.append(end)
+
+    def flush(self) -> None:
+        if self._pending:
+            self._text += ''.join(self._pending)
+            self._pending = []
+
+    def get(self, index: int) -> Any:
+        kind = self._kinds[index]
+        if kind == _SLOT_VALUE:
+            self.flush()
+            return self._text[self._ends[index - 1] if index else 0:self._ends[index]]
+        if kind == _SLOT_NONE:
+            return None
+        return self._other[index] if kind == _SLOT_OTHER else _MISSING
+
+class _IntColumn:
+    __slots__ = ('_kinds', 'values', '_other')
+
+    def __init__(self):
+        self._kinds = bytearray()
+        self.values = array('q')  # 0 wherever the row has no plain int
+        self._other = {}
+
+    def append(self, value: Any) -> None:
+        if type(value) is int and -2**63 <= value < 2**63:
+            self._kinds.append(_SLOT_VALUE)
+            self.values.append(value)
+            return
+        if value is _MISSING:
+            self._kinds.append(_SLOT_MISSING)
+        elif value is None:
+            self._kinds.append(_SLOT_NONE)
+        else:
+            self._other[len(self._kinds)] = value
+            self._kinds.append(_SLOT_OTHER)
+        self.values.append(0)
+
+    def get(self, index: int) -> Any:
+        kind = self._kinds[index]
+        if kind == _SLOT_VALUE:
+            return self.values[index]
+        if kind == _SLOT_NONE:
+            return None
+        return self._other[index] if kind == _SLOT_OTHER else _MISSING
+
+class _StatusColumn:
+    __slots__ = ('_codes', '_other')
+
+    def __init__(self):
+        self._codes = array('b')
+        self._other = {}
+
+    def append(self, value: Any) -> None:
+        if value in STATUS_CODES:
+            self._codes.append(STATUS_CODES.index(value))
+        elif value is _MISSING:
+            self._codes.append(-1)
+        elif value is None:
+            self._codes.append(-2)
+        else:
+            self._other[len(self._codes)] = value
+            self._codes.append(-3)
+
+    def get(self, index: int) -> Any:
+        code = self._codes[index]
+        if code >= 0:
+            return STATUS_CODES[code]
+        if code == -2:
+            return None
+        return self._other[index] if code == -3 else _MISSING
+
+class _ObjectColumn:
+    __slots__ = ('_values',)
+
+    def __init__(self):
+        self._values = []
+
+    def append(self, value: Any) -> None:
+        self._values.append(value)
+
+    def get(self, index: int) -> Any:
+        return self._values[index]
+
+class AppRow:
+    """Read-only view of one catalog row; call to_dict() for a mutable copy."""
+    __slots__ = ('_catalog', '_index')
+
+    def __init__(self, catalog: 'AppCatalog', index: int):
+        self._catalog = catalog
+        self._index = index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._catalog._value(key, self._index)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._catalog._value(key, self._index)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self._catalog._value(key, self._index) is not _MISSING
+
+    def to_dict(self) -> Dict[str, Any]:
+        row = {}
+        for key in self._catalog.fields:
+            value = self._catalog._value(key, self._index)
+            if value is not _MISSING:
+                row[key] = list(value) if key == 'categories' and isinstance(value, tuple) else value
+        return row
+
+class AppCatalog:
+    """Column-oriented list of apps with a clickCount-sorted index."""
+
+    def __init__(self):
+        self.fields = []
+        self._columns = {}
+        self._category_sets = {}
+        self._by_clicks = None
+        self._size = 0
+
+    @classmethod
+    def from_rows(cls, rows) -> 'AppCatalog':
+        catalog = cls()
+        for row in rows:
+            catalog.append(row)
+        catalog.flush()
+        return catalog
+
+    def flush(self) -> None:
+        """Pack text appended since the last flush; reads do this on demand."""
+        for column in self._columns.values():
+            if isinstance(column, _TextColumn):
+                column.flush()
+
+    def _new_column(self, key: str):
+        if key in CATALOG_TEXT_FIELDS:
+            column = _TextColumn()
+        elif key in CATALOG_INT_FIELDS:
+            column = _IntColumn()
+        elif key == 'betaAvailable':
+            column = _StatusColumn()
+        else:
+            column = _ObjectColumn()
+        for _ in range(self._size):
+            column.append(_MISSING)
+        return column
+
+    def _shared_categories(self, categories: list) -> Any:
+        key = tuple(sys.intern(c) if isinstance(c, str) else c for c in categories)
+        try:
+            return self._category_sets.setdefault(key, key)
+        except TypeError:
+            return categories
+
+    def append(self, row: Dict[str, Any]) -> None:
+        for key in row:
+            if key not in self._columns:
+                self._columns[key] = self._new_column(key)
+                self.fields.append(key)
+        for key, column in self._columns.items():
+            value = row.get(key, _MISSING)
+            if key == 'categories' and isinstance(value, list):
+                value = self._shared_categories(value)
+            column.append(value)
+        self._by_clicks = None
+        self._size += 1
+
+    def _value(self, key: str, index: int) -> Any:
+        column = self._columns.get(key)
+        return _MISSING if column is None else column.get(index)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> AppRow:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return AppRow(self, index)
+
+    def __iter__(self):
+        return (AppRow(self, i) for i in range(self._size))
+
+    def _click_values(self) -> array:
+        column = self._columns.get('clickCount')
+        return column.values if isinstance(column, _IntColumn) else array('q', bytes(8 * self._size))
+
+    def by_click_count(self) -> array:
+        """Row indexes ordered by clickCount, highest first (stable for ties)."""
+        if self._by_clicks is None:
+            clicks = self._click_values()
+            self._by_clicks = array('q', sorted(range(self._size), key=lambda i: -clicks[i]))
+        return self._by_clicks
+
+    def at_least(self, threshold: int) -> int:
+        """Number of rows with clickCount >= threshold; they lead by_click_count()."""
+        order = self.by_click_count()
+        clicks = self._click_values()
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if clicks[order[mid]] >= threshold:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def top(self, count: int) -> 'ClickWindow':
+        """The first `count` rows of by_click_count(), e.g. top(at_least(threshold))."""
+        return ClickWindow(self, count)
+
+class ClickWindow:
+    """Leading rows of a catalog's clickCount order, as AppRow views."""
+    __slots__ = ('_catalog', '_order', '_size')
+
+    def __init__(self, catalog: AppCatalog, count: int):
+        self._catalog = catalog
+        self._order = catalog.by_click_count()
+        self._size = max(0, min(count, len(self._order)))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> AppRow:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return AppRow(self._catalog, self._order[index])
+
+    def __iter__(self):
+        return (AppRow(self._catalog, self._order[i]) for i in range(self._size))
+
+class InteractionCounts:
+    """sanitizedName -> clickCount as a packed sorted name column and an array of counts."""
+
+    def __init__(self, pairs):
+        latest = {}
+        for name, clicks in pairs:
+            latest[name] = clicks
+        ordered = sorted(latest)
+        self._names = _TextColumn()
+        for name in ordered:
+            self._names.append(name)
+        self._names.flush()
+        self._counts = array('q', (latest[name] or 0 for name in ordered))
+        self._size = len(ordered)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._names.get(mid)
+            if probe == name:
+                return self._counts[mid]
+            if probe < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return default
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def items(self):
+        return ((self._names.get(i), self._counts[i]) for i in range(self._size))
+
+# In-memory copy of the apps table behind GET /apps
+APPS_SNAPSHOT_FIELDS = ('id', 'name', 'sanitizedName', 'link', 'logo', 'betaAvailable', 'clickCount', 'categories', 'lastChecked', 'retiredAt')
+APPS_SNAPSHOT_DELTA_SECONDS = int(os.getenv('APPS_SNAPSHOT_DELTA_SECONDS', '60'))
+APPS_SNAPSHOT_FULL_SECONDS = int(os.getenv('APPS_SNAPSHOT_FULL_SECONDS', '3600'))
+# lastChecked is stamped by each writer's clock before its commit lands, so a delta
+# pull re-reads this far behind the newest value it has seen
+APPS_SNAPSHOT_DELTA_OVERLAP_SECONDS = int(os.getenv('APPS_SNAPSHOT_DELTA_OVERLAP_SECONDS', '300'))
+APPS_SNAPSHOT_RESPONSE_CACHE = 64
+
+class AppSnapshot:
+    """Read-side copy of `apps`, kept current without rereading the table.
+
+    Rows written by this service are applied as they are written. Other writers are
+    picked up by a delta pull, at most every APPS_SNAPSHOT_DELTA_SECONDS, of rows whose
+    lastChecked is past the newest value a pull has returned minus
+    APPS_SNAPSHOT_DELTA_OVERLAP_SECONDS. Only pulls move that high-water mark, so this
+    service's own writes never push it past rows other writers have yet to commit;
+    re-read rows that are unchanged, or older than the copy held, are ignored. A full reload every
+    APPS_SNAPSHOT_FULL_SECONDS catches deletions. Rendered responses are cached
+    per query until the snapshot changes. order_version moves only when an app is
+    added, retired or its clickCount changes, which is all ThresholdIndex cares about.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.order_version = 0
+        self.loaded_at = 0.0
+        self.delta_at = 0.0
+        self.high_water: Optional[str] = None
+        self.db_reads = 0
+        self.lock = threading.Lock()
+        self.reloaded = threading.Condition(self.lock)
+        self.reloading = False
+        self.written_during_reload: Optional[list] = None
+        self.responses: 'OrderedDict[tuple, tuple]' = OrderedDict()
+
+    def _fetch(self, since: Optional[str] = None) -> list:
+        rows = []
+        page_size = 1000
+        page = 0
+        while True:
+            query = supabase.table('apps').select(', '.join(APPS_SNAPSHOT_FIELDS))
+            if since:
+                query = query.gt('lastChecked', since)
+            result = query.order('lastChecked').range(page * page_size, (page + 1) * page_size - 1).execute()
+            self.db_reads += 1
+            rows.extend(result.data or [])
+            if not result.data or len(result.data) < page_size:
+                return rows
+            page += 1
+
+    def _delta_since(self) -> Optional[str]:
+        if not self.high_water:
+            return None
+        try:
+            return (datetime.fromisoformat(self.high_water) - timedelta(seconds=APPS_SNAPSHOT_DELTA_OVERLAP_SECONDS)).isoformat()
+        except ValueError:
+            return self.high_water
+
+    def _apply(self, rows: list, pulled: bool = False) -> bool:
+        changed = False
+        for row in rows:
+            name = row.get('sanitizedName')
+            if not name:
+                continue
+            current = self.rows.setdefault(name, {})
+            if pulled and row.get('lastChecked') and (current.get('lastChecked') or '') > row['lastChecked']:
+                # Our own newer write has not reached the table yet (write-behind)
+                continue
+            trimmed = {field: row[field] for field in APPS_SNAPSHOT_FIELDS if field in row}
+            if any(current.get(field) != value for field, value in trimmed.items()):
+                if not current or any(field in trimmed and current.get(field) != trimmed[field] for field in ('clickCount', 'retiredAt')):
+                    self.order_version += 1
+                current.update(trimmed)
+                changed = True
+            if pulled and row.get('lastChecked') and (self.high_water is None or row['lastChecked'] > self.high_water):
+                self.high_water = row['lastChecked']
+        if changed:
+            self.version += 1
+            self.responses.clear()
+        return changed
+
+    def ensure_fresh(self) -> None:
+        """Full reload or delta pull, if one is due.
+
+        One caller fetches, outside the lock, and swaps the result in; the others
+        keep serving the current copy meanwhile, or wait if nothing is loaded yet.
+        """
+        with self.lock:
+            while self.reloading and not self.loaded_at:
+                self.reloaded.wait()
+            if self.reloading:
+                return
+            now = time.monotonic()
+            full = not self.loaded_at or now - self.loaded_at > APPS_SNAPSHOT_FULL_SECONDS
+            if not full and now - self.delta_at <= APPS_SNAPSHOT_DELTA_SECONDS:
+                return
+            since = None if full else self._delta_since()
+            self.reloading = True
+            self.written_during_reload = []
+        rows = None
+        try:
+            rows = self._fetch(since)
+        finally:
+            with self.lock:
+                if rows is not None and full:
+                    self.rows = {}
+                    self.high_water = None
+                    self.version += 1
+                    self.order_version += 1
+                    self.responses.clear()
+                    self._apply(rows, pulled=True)
+                    # Our own writes that landed on the old copy while the fetch ran
+                    self._apply(self.written_during_reload)
+                    self.loaded_at = self.delta_at = now
+                elif rows is not None:
+                    self._apply(rows, pulled=True)
+                    self.delta_at = now
+                self.reloading = False
+                self.written_during_reload = None
+                self.reloaded.notify_all()
+
+    def apply_rows(self, rows: Optional[list]) -> None:
+        """Fold rows this service just wrote into the snapshot (no-op until it is first loaded)."""
+        if not rows or not self.loaded_at:
+            return
+        with self.lock:
+            self._apply(rows)
+            if self.written_during_reload is not None:
+                self.written_during_reload.extend(rows)
+
+    def render(self, status: Optional[set], min_clicks: int, category: Optional[str], limit: Optional[int]) -> tuple:
+        """JSON body, gzip body and strong ETag digest for a filtered listing."""
+        with self.lock:
+            key = (self.version, tuple(sorted(status)) if status else None, min_clicks, category, limit)
+            cached = self.responses.get(key)
+            if cached:
+                self.responses.move_to_end(key)
+                return cached
+            apps = [
+                dict(row) for row in self.rows.values()
+                if (row.get('clickCount') or 0) >= min_clicks
+                and (not status or row.get('betaAvailable') in status)
+                and (not category or category in [c.lower() for c in (row.get('categories') or [])])
+            ]
+        apps.sort(key=lambda row: (-(row.get('clickCount') or 0), row.get('sanitizedName') or ''))
+        if limit:
+            apps = apps[:limit]
+        body = json.dumps({'count': len(apps), 'apps': apps}, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        rendered = (body, gzip.compress(body, 6), hashlib.sha256(body).hexdigest()[:32])
+        with self.lock:
+            self.responses[key] = rendered
+            while len(self.responses) > APPS_SNAPSHOT_RESPONSE_CACHE:
+                self.responses.popitem(last=False)
+        return rendered
+
+    def stats(self) -> Dict[str, Any]:
+        return {'apps': len(self.rows), 'version': self.version, 'order_version': self.order_version, 'db_reads': self.db_reads, 'high_water': self.high_water}
+
+app_snapshot = AppSnapshot()
+
+class ThresholdIndex:
+    """clickCount-ordered index over app_snapshot shared by every threshold route.
+
+    Each route used to run its own gte/order query; now they all read one
+    AppCatalog that the snapshot keeps fresh, and resolve their threshold with
+    AppCatalog.at_least. Only rows at or above the lowest threshold asked for so
+    far are indexed; a lower threshold widens the index on its first request.
+    """
+
+    def __init__(self, snapshot: AppSnapshot):
+        self.snapshot = snapshot
+        self.catalog = AppCatalog()
+        self.floor: Optional[int] = None
+        self.order_version = -1
+        self.builds = 0
+
+    def _rebuild(self) -> None:
+        # Appended by name so by_click_count, being stable, breaks ties by name
+        active = sorted(
+            (row for row in self.snapshot.rows.values() if not row.get('retiredAt') and (row.get('clickCount') or 0) >= self.floor),
+            key=lambda row: row.get('sanitizedName') or '',
+        )
+        catalog = AppCatalog.from_rows(active)
+        catalog.by_click_count()
+        self.catalog = catalog
+        self.order_version = self.snapshot.order_version
+        self.builds += 1
+
+    def window(self, threshold: int) -> ClickWindow:
+        """Indexed apps with clickCount >= threshold, highest first.
+
+        Rows are read-only views of a catalog that later rebuilds replace rather
+        than modify; call to_dict() on the row being checked.
+        """
+        self.snapshot.ensure_fresh()
+        with self.snapshot.lock:
+            if self.floor is None or threshold < self.floor:
+                self.floor = threshold
+                self._rebuild()
+            elif self.order_version != self.snapshot.order_version:
+                self._rebuild()
+            catalog = self.catalog
+        return catalog.top(catalog.at_least(threshold))
+
+    def stats(self) -> Dict[str, Any]:
+        return {'apps': len(self.catalog), 'floor': self.floor, 'builds': self.builds, 'snapshot': self.snapshot.stats()}
+
+threshold_index = ThresholdIndex(app_snapshot)
+
+# Aggregates over app_history, maintained as history rows are written so analytics
+# never rescan it (app_history itself only keeps HISTORY_LIMIT rows per app). Table:
+#   app_history_stats ("appId" int8 primary key, "sanitizedName" text, "samples" int8,
+#     "transitions" int8, "transitionCounts" jsonb, "opens" int8, "openPeriods" int8,
+#     "openSeconds" float8, "openSince" timestamptz, "lastStatus" text,
+#     "lastFlipAt" timestamptz, "firstSeenAt" timestamptz, "updatedAt" timestamptz)
+HISTORY_STATS_RELOAD_SECONDS = int(os.getenv('HISTORY_STATS_RELOAD_SECONDS', '300'))
+HISTORY_STATS_WRITE_ATTEMPTS = 5
+HISTORY_STATS_TOTAL_FIELDS = ('samples', 'transitions', 'opens', 'openPeriods', 'openSeconds')
+HISTORY_STATS_SORTS = ('transitions', 'opens', 'openSeconds', 'samples')
+# Only these count as a flip; timeouts and fetch errors say nothing about the beta
+HISTORY_DEFINITIVE_STATUSES = ('open', 'full', 'not accepting')
+
+def seconds_between(start: str, end: str) -> float:
+    return max((datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds(), 0.0)
+
+def fold_history_entry(stats: Optional[Dict[str, Any]], app_id: Any, sanitized_name: str, previous_status: Optional[str], entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the app's aggregate row with one more history entry folded in."""
+    at = entry['timestamp']
+    status = entry['status']
+    if stats:
+        row = dict(stats)
+    else:
+        row = {
+            'appId': app_id, 'samples': 0, 'transitions': 0, 'transitionCounts': {},
+            'opens': 0, 'openPeriods': 0, 'openSeconds': 0.0, 'openSince': None,
+            'lastStatus': previous_status if previous_status in HISTORY_DEFINITIVE_STATUSES else None,
+            'lastFlipAt': None, 'firstSeenAt': at
+        }
+    row['sanitizedName'] = sanitized_name
+    row['samples'] += 1
+    row['updatedAt'] = at
+    if status not in HISTORY_DEFINITIVE_STATUSES:
+        return row
+
+    last = row.get('lastStatus')
+    if last is None:
+        if status == 'open':
+            row['openSince'] = at
+    elif status != last:
+        counts = dict(row.get('transitionCounts') or {})
+        counts[f'{last}>{status}'] = counts.get(f'{last}>{status}', 0) + 1
+        row['transitionCounts'] = counts
+        row['transitions'] += 1
+        row['lastFlipAt'] = at
+        if status == 'open':
+            row['opens'] += 1
+            row['openSince'] = at
+        elif last == 'open':
+            # An app already open when tracking began has no known start to measure from
+            if row.get('openSince'):
+                row['openSeconds'] += seconds_between(row['openSince'], at)
+                row['openPeriods'] += 1
+            row['openSince'] = None
+    row['lastStatus'] = status
+    return row
+
+class HistoryAnalytics:
+    """In-memory copy of app_history_stats with fleet totals kept up to date.
+
+    Writes fold each new history entry into the app's row, read fresh from the
+    table so an app that moved between instances keeps counting from where the
+    other instance left it. The row goes back conditional on the samples count it
+    was read with (samples only grows), and is re-read and re-folded on conflict,
+    so concurrent writers never lose each other's entries. The write-behind flush
+    folds all of an app's entries in a window into one write. Reads are served
+    from memory; the copy is reloaded
+    every HISTORY_STATS_RELOAD_SECONDS to pick up other instances' writes.
+    """
+
+    def __init__(self):
+        self.stats: Dict[Any, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Any] = {}
+        self.totals = dict.fromkeys(HISTORY_STATS_TOTAL_FIELDS, 0)
+        self.open_now = 0
+        self.loaded_at = 0.0
+        self.version = 0
+        self.top_cache: Dict[tuple, list] = {}
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+    def _account(self, row: Dict[str, Any], sign: int) -> None:
+        for field in HISTORY_STATS_TOTAL_FIELDS:
+            self.totals[field] += sign * (row.get(field) or 0)
+        if row.get('openSince'):
+            self.open_now += sign
+
+    def _put(self, row: Dict[str, Any]) -> None:
+        previous = self.stats.get(row['appId'])
+        if previous:
+            self._account(previous, -1)
+        self.stats[row['appId']] = row
+        self.by_name[row.get('sanitizedName')] = row['appId']
+        self._account(row, 1)
+        self.version += 1
+        self.top_cache.clear()
+
+    def ensure_loaded(self) -> None:
+        with self.load_lock:
+            if self.loaded_at and time.monotonic() - self.loaded_at < HISTORY_STATS_RELOAD_SECONDS:
+                return
+            rows = []
+            page_size = 1000
+            page = 0
+            while True:
+                result = supabase.table('app_history_stats').select('*').order('appId').range(page * page_size, (page + 1) * page_size - 1).execute()
+                rows.extend(result.data or [])
+                if not result.data or len(result.data) < page_size:
+                    break
+                page += 1
+            with self.lock:
+                self.stats = {}
+                self.by_name = {}
+                self.totals = dict.fromkeys(HISTORY_STATS_TOTAL_FIELDS, 0)
+                self.open_now = 0
+                for row in rows:
+                    self._put(row)
+                self.loaded_at = time.monotonic()
+
+    def record(self, app_id: Any, sanitized_name: str, previous_status: Optional[str], entry: Dict[str, Any]) -> None:
+        """Fold a history row that was just written; failures never fail the status write."""
+        self.record_batch([(app_id, sanitized_name, previous_status, entry)])
+
+    def record_batch(self, items: list) -> None:
+        """Fold (app_id, sanitized_name, previous_status, entry) tuples, in order, with one write per app."""
+        by_app: Dict[Any, list] = {}
+        for app_id, sanitized_name, previous_status, entry in items:
+            by_app.setdefault(app_id, []).append((sanitized_name, previous_status, entry))
+        try:
+            with profile_span('app_history_stats.upsert', 'supabase', apps=len(by_app)):
+                current = supabase.table('app_history_stats').select('*').in_('appId', list(by_app)).execute()
+                rows = {row['appId']: row for row in current.data or []}
+                for app_id, folds in by_app.items():
+                    self._write(app_id, folds, rows.get(app_id))
+        except Exception as e:
+            log.error('history_stats_update_failed', app_ids=list(by_app), error=str(e))
+
+    def _write(self, app_id: Any, folds: list, stats: Optional[Dict[str, Any]]) -> None:
+        for _ in range(HISTORY_STATS_WRITE_ATTEMPTS):
+            row = stats
+            for sanitized_name, previous_status, entry in folds:
+                row = fold_history_entry(row, app_id, sanitized_name, previous_status, entry)
+            if stats is None:
+                try:
+                    supabase.table('app_history_stats').insert(row).execute()
+                    written = True
+                except Exception:
+                    # Another writer created the row first; fold into theirs
+                    written = False
+            else:
+                written = bool(supabase.table('app_history_stats')
+                    .update(row)
+                    .eq('appId', app_id)
+                    .eq('samples', stats.get('samples') or 0)
+                    .execute().data)
+            if written:
+                if self.loaded_at:
+                    with self.lock:
+                        self._put(row)
+                return
+            current = supabase.table('app_history_stats').select('*').eq('appId', app_id).execute()
+            stats = current.data[0] if current.data else None
+        log.warning('history_stats_conflict', app_id=app_id, attempts=HISTORY_STATS_WRITE_ATTEMPTS)
+
+    def backfill(self) -> Dict[str, Any]:
+        """One-off: seed aggregates for apps with none yet from the history still on hand."""
+        self.loaded_at = 0.0
+        self.ensure_loaded()
+        app_snapshot.ensure_fresh()
+        with app_snapshot.lock:
+            names = {row.get('id'): name for name, row in app_snapshot.rows.items()}
+        seeded = {}
+        page_size = 1000
+        page = 0
+        while True:
+            result = supabase.table('app_history')\
+                .select('appId, status, timestamp')\
+                .order('appId')\
+                .order('timestamp')\
+                .range(page * page_size, (page + 1) * page_size - 1)\
+                .execute()
+            for entry in result.data or []:
+                app_id = entry['appId']
+                if app_id in self.stats or app_id not in names:
+                    continue
+                seeded[app_id] = fold_history_entry(seeded.get(app_id), app_id, names[app_id], None, entry)
+            if not result.data or len(result.data) < page_size:
+                break
+            page += 1
+        rows = list(seeded.values())
+        for start in range(0, len(rows), 500):
+            supabase.table('app_history_stats').upsert(rows[start:start + 500], on_conflict='appId').execute()
+        with self.lock:
+            for row in rows:
+                self._put(row)
+        return {'seeded': len(rows), 'tracked': len(self.stats)}
+
+    def describe(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        described = dict(row)
+        described['meanOpenSeconds'] = round(row['openSeconds'] / row['openPeriods'], 1) if row.get('openPeriods') else None
+        if row.get('openSince'):
+            described['openForSeconds'] = round(seconds_between(row['openSince'], datetime.now(timezone.utc).isoformat()), 1)
+        return described
+
+    def app_stats(self, name: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            app_id = self.by_name.get(name) or self.by_name.get(sanitize_string(name))
+            row = self.stats.get(app_id)
+        return self.describe(row) if row else None
+
+    def fleet_stats(self, sort: str, limit: int) -> Dict[str, Any]:
+        with self.lock:
+            key = (self.version, sort, limit)
+            top = self.top_cache.get(key)
+            if top is None:
+                top = heapq.nlargest(limit, self.stats.values(), key=lambda row: row.get(sort) or 0)
+                self.top_cache[key] = top
+            totals = dict(self.totals)
+            tracked = len(self.stats)
+            open_now = self.open_now
+        return {
+            'apps_tracked': tracked,
+            'open_now': open_now,
+            'totals': totals,
+            'mean_open_seconds': round(totals['openSeconds'] / totals['openPeriods'], 1) if totals['openPeriods'] else None,
+            'top': {'sort': sort, 'apps': [self.describe(row) for row in top]}
+        }
+
+history_analytics = HistoryAnalytics()
+
+# Optional local write-behind store (WRITE_BEHIND_DB=<path to a SQLite file>). Status
+# writes and cursor moves land in SQLite and return at once; a background thread
+# flushes them to Supabase in bulk, in the order they were made, retrying with
+# backoff while Supabase is slow or down. Delivery is at least once: a crash
+# between a flush and its acknowledgement can repeat a history row.
+WRITE_BEHIND_DB = os.getenv('WRITE_BEHIND_DB', '')
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv('WRITE_BEHIND_FLUSH_SECONDS', '2'))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500'))
+WRITE_BEHIND_MAX_BACKOFF_SECONDS = 60
+
+class WriteBehindStore:
+    """SQLite-backed app state, cursor positions and an ordered outbox for Supabase.
+
+    Tables:
+      app_state (sanitizedName primary key, row)      apps row with unflushed writes, JSON
+      cursors   (counterKey primary key, lastChecked)
+      outbox    (seq autoincrement, kind, key, payload, createdAt)
+    Outbox kinds are app_update, history and cursor. An app_state row lives only
+    while the app has updates in the outbox; once they are acknowledged it is
+    dropped and the next check reads the app from Supabase again, so writes by
+    other instances or routes are not hidden behind a stale local copy. Rows left
+    from a previous process are flushed when the store is opened again.
+    """
+
+    def __init__(self, path: str):
+        import sqlite3
+        self.path = path
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS app_state ("sanitizedName" TEXT PRIMARY KEY, row TEXT NOT NULL)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS cursors ("counterKey" TEXT PRIMARY KEY, "lastChecked" INTEGER NOT NULL)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, "createdAt" REAL NOT NULL)')
+        self.flushed = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.flusher: Optional[threading.Thread] = None
+
+    def _start_flusher(self) -> None:
+        if self.flusher is None:
+            with self.lock:
+                if self.flusher is None:
+                    self.flusher = threading.Thread(target=self._flush_loop, name='write-behind', daemon=True)
+                    self.flusher.start()
+
+    def get_app(self, sanitized_name: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.db.execute('SELECT row FROM app_state WHERE "sanitizedName" = ?', (sanitized_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _enqueue(self, kind: str, key: str, payload: Dict[str, Any]) -> None:
+        self.db.execute('INSERT INTO outbox (kind, key, payload, "createdAt") VALUES (?, ?, ?, ?)', (kind, key, json.dumps(payload), time.time()))
+
+    def enqueue_status(self, current_app: Dict[str, Any], update_data: Dict[str, Any], history_entry: Dict[str, Any], previous_status: Optional[str]) -> None:
+        """Record a status write locally: new app state, apps update and history row, atomically."""
+        sanitized_name = current_app['sanitizedName']
+        with self.lock:
+            self.db.execute('BEGIN')
+            try:
+                self.db.execute('INSERT OR REPLACE INTO app_state VALUES (?, ?)', (sanitized_name, json.dumps(dict(current_app, **update_data))))
+                self._enqueue('app_update', sanitized_name, update_data)
+                self._enqueue('history', sanitized_name, {'entry': history_entry, 'previous_status': previous_status})
+                self.db.execute('COMMIT')
+            except Exception:
+                self.db.execute('ROLLBACK')
+                raise
+        self._start_flusher()
+
+    def get_cursor(self, counter_key: str) -> Optional[int]:
+        with self.lock:
+            row = self.db.execute('SELECT "lastChecked" FROM cursors WHERE "counterKey" = ?', (counter_key,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, counter_key: str, last_checked: int) -> None:
+        with self.lock:
+            self.db.execute('BEGIN')
+            try:
+                self.db.execute('INSERT OR REPLACE INTO cursors VALUES (?, ?)', (counter_key, last_checked))
+                self._enqueue('cursor', counter_key, {'lastChecked': last_checked})
+                self.db.execute('COMMIT')
+            except Exception:
+                self.db.execute('ROLLBACK')
+                raise
+        self._start_flusher()
+
+    def _flush_group(self, kind: str, ops: list) -> None:
+        if kind == 'app_update':
+            # Later updates of the same app win field by field, as they would have in order
+            merged: Dict[str, Dict[str, Any]] = {}
+            for _, _, key, payload in ops:
+                merged.setdefault(key, {}).update(payload)
+            for key, update_data in merged.items():
+                supabase.table('apps').update(update_data).eq('sanitizedName', key).execute()
+        elif kind == 'history':
+            supabase.table('app_history').insert([payload['entry'] for _, _, _, payload in ops]).execute()
+            history_analytics.record_batch([(payload['entry']['appId'], key, payload['previous_status'], payload['entry']) for _, _, key, payload in ops])
+            for app_id in {payload['entry']['appId'] for _, _, _, payload in ops}:
+                try:
+                    trim_app_history(app_id)
+                except Exception as e:
+                    # The rows are in; retrying the run would only duplicate them
+                    log.error('history_trim_failed', app_id=app_id, error=str(e))
+        elif kind == 'cursor':
+            latest = {key: payload['lastChecked'] for _, _, key, payload in ops}
+            for key, last_checked in latest.items():
+                write_processing_index(key, last_checked)
+
+    def flush(self) -> int:
+        """Push up to WRITE_BEHIND_BATCH_SIZE outbox rows to Supabase; returns how many were sent.
+
+        The window goes out grouped by kind: one merged update per app, then one bulk
+        history insert, then one write per cursor. Each app's updates and history rows
+        keep their order. A group's rows leave the outbox only once it is written, so a
+        failure retries from that group without skipping or reordering anything.
+        """
+        with self.flush_lock:
+            with self.lock:
+                rows = self.db.execute('SELECT seq, kind, key, payload FROM outbox ORDER BY seq LIMIT ?', (WRITE_BEHIND_BATCH_SIZE,)).fetchall()
+            ops = [(seq, kind, key, json.loads(payload)) for seq, kind, key, payload in rows]
+            sent = 0
+            for kind in ('app_update', 'history', 'cursor'):
+                group = [op for op in ops if op[1] == kind]
+                if not group:
+                    continue
+                with profile_span(f'write_behind.{kind}', 'supabase', rows=len(group)):
+                    self._flush_group(kind, group)
+                with self.lock:
+                    self.db.execute(f'DELETE FROM outbox WHERE seq IN ({",".join("?" * len(group))})', [op[0] for op in group])
+                    if kind == 'app_update':
+                        # Supabase has these apps now; forget the local copy unless more writes are queued
+                        keys = sorted({op[2] for op in group})
+                        self.db.execute(
+                            f'DELETE FROM app_state WHERE "sanitizedName" IN ({",".join("?" * len(keys))}) '
+                            'AND NOT EXISTS (SELECT 1 FROM outbox WHERE kind = \'app_update\' AND key = app_state."sanitizedName")',
+                            keys
+                        )
+                sent += len(group)
+            self.flushed += sent
+            return sent
+
+    def _flush_loop(self) -> None:
+        while True:
+            delay = min(WRITE_BEHIND_FLUSH_SECONDS * 2 ** min(self.failures, 16), WRITE_BEHIND_MAX_BACKOFF_SECONDS)
+            time.sleep(delay)
+            try:
+                while self.flush() == WRITE_BEHIND_BATCH_SIZE:
+                    pass
+                self.failures = 0
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                log.error('write_behind_flush_failed', failures=self.failures, error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            pending, oldest = self.db.execute('SELECT COUNT(*), MIN("createdAt") FROM outbox').fetchone()
+        return {
+            'pending': pending,
+            'oldest_pending_seconds': round(time.time() - oldest, 1) if oldest else None,
+            'flushed': self.flushed,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
+
+    def close(self) -> None:
+        """Best-effort final flush at shutdown; anything left is sent by the next process."""
+        try:
+            self.flush()
+        except Exception as e:
+            log.warning('write_behind_rows_left', error=str(e))
+
+write_behind: Optional[WriteBehindStore] = None
+if WRITE_BEHIND_DB:
+    write_behind = WriteBehindStore(WRITE_BEHIND_DB)
+    atexit.register(write_behind.close)
+    write_behind._start_flusher()
+
+def trim_app_history(app_id: Any) -> None:
+    """Delete an app's history rows beyond the newest HISTORY_LIMIT."""
+    with profile_span('app_history.select', 'supabase'):
+        history_result = supabase.table('app_history')\
+            .select('id')\
+            .eq('appId', app_id)\
+            .order('timestamp', desc=True)\
+            .execute()
+    
+    if len(history_result.data) > HISTORY_LIMIT:
+        old_ids = [item['id'] for item in history_result.data[HISTORY_LIMIT:]]
+        if old_ids:
+            with profile_span('app_history.delete', 'supabase'):
+                supabase.table('app_history').delete().in_('id', old_ids).execute()
+
 def update_app_status(app_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Persist a checked status.
+
+    Overlapping callers that saw the same status for the same app share one write and
+    get its result, marked coalesced=True. A caller with a different status does its
+    own write, so no observation is dropped in favour of another caller's.
+    """
+    update_result, shared = status_update_flights.do(status_update_key(app_data), _persist_app_status, app_data)
+    return dict(update_result, coalesced=True) if shared else update_result
+
+def status_update_key(app_data: Dict[str, Any]) -> str:
+    return f"{sanitize_string(app_data['name'])}\x1f{app_data.get('betaAvailable')}"
+
+def _persist_app_status(app_data: Dict[str, Any]) -> Dict[str, Any]:
+    with profile_span('update_app_status', 'persist', app=app_data.get('name')):
+        update_result = _update_app_status(app_data)
+    publish_status_outcome(app_data, update_result)
+    return update_result
+
+def _update_app_status(app_data: Dict[str, Any]) -> Dict[str, Any]:
     sanitized_name = sanitize_string(app_data['name'])
     
     try:
-        result = supabase.table('apps').select('*').eq('sanitizedName', sanitized_name).execute()
-        
-        if not result.data:
-            get_or_create_app(app_data)
-            return {'updated': True, 'status_changed': False, 'previous_status': None}
-        
-        current_app = result.data[0]
+        current_app = write_behind.get_app(sanitized_name) if write_behind else None
+        if current_app is None:
+            with profile_span('apps.select', 'supabase'):
+                result = supabase.table('apps').select('*').eq('sanitizedName', sanitized_name).execute()
+            
+            if not result.data:
+                get_or_create_app(app_data)
+                return {'updated': True, 'status_changed': False, 'previous_status': None}
+            
+            current_app = result.data[0]
         previous_status = current_app.get('betaAvailable', 'unknown')
-        current_click_count = current_app.get('clickCount', 0)
         new_click_count = app_data['clickCount']
         
         # Check if any important data has changed (not just status and clicks)
-        # Normalize values for proper comparison
-        current_screenshots = current_app.get('screenshotUrls') or []
-        new_screenshots = app_data.get('screenshotUrls') or []
-        current_description = current_app.get('description') or ''
-        new_description = app_data.get('description') or ''
-        current_categories = current_app.get('categories') or []
-        new_categories = app_data.get('categories') or []
-        current_features = current_app.get('features') or []
-        new_features = app_data.get('features') or []
-        current_appstore = current_app.get('appStore') or ''
-        new_appstore = app_data.get('appStore') or ''
-        current_artist_url = current_app.get('artistViewUrl') or ''
-        new_artist_url = app_data.get('artistViewUrl') or ''
-        current_logo = current_app.get('logo') or ''
-        new_logo = app_data.get('logo') or ''
-        
-        data_unchanged = (
-            current_click_count == new_click_count and 
-            current_app.get('betaAvailable', 'unknown') == app_data['betaAvailable'] and
-            current_screenshots == new_screenshots and
-            current_description == new_description and
-            current_categories == new_categories and
-            current_features == new_features and
-            current_appstore == new_appstore and
-            current_artist_url == new_artist_url and
-            current_logo == new_logo
-        )
-        
-        if data_unchanged:
+        if app_data_unchanged(current_app, app_data):
             return {'updated': False, 'status_changed': False, 'previous_status': previous_status}
         
-        status_changed_to_open = (
-            previous_status in ['full', 'not accepting', 'error', 'unknown'] and 
-            app_data['betaAvailable'] == 'open'
-        )
-        
-        update_data = {
-            'betaAvailable': app_data['betaAvailable'],
-            'clickCount': new_click_count,  # Ensure we're using the new click count
-            'link': app_data['link'],
-            'logo': app_data['logo'],
-            'screenshotUrls': app_data.get('screenshotUrls', []),
-            'description': app_data.get('description', ''),
-            'categories': app_data.get('categories', []),
-            'features': app_data.get('features', []),
-            'appStore': app_data.get('appStore', ''),
-            'artistViewUrl': app_data.get('artistViewUrl', ''),
-            'trackContentRating': app_data.get('trackContentRating', ''),
-            'primaryGenreName': app_data.get('primaryGenreName', ''),
-            'sellerName': app_data.get('sellerName', ''),
-            'artworkUrl100': app_data.get('artworkUrl100', ''),
-            'lastChecked': datetime.now(timezone.utc).isoformat()
-        }
-        
-        update_result = supabase.table('apps').update(update_data).eq('sanitizedName', sanitized_name).execute()
-        
-        if not update_result.data:
-            try:
-                print(f"Warning: No rows updated for app {app_data['name']}")
-            except UnicodeEncodeError:
-                print(f"Warning: No rows updated for app [App with special characters]")
-        
-        history_entry = {
-            'appId': current_app['id'],
-            'status': app_data['betaAvailable'],
-            'clickCount': app_data['clickCount'],
-            'timestamp': datetime.now(timezone.utc).isoformat()
-        }
-        
-        supabase.table('app_history').insert(history_entry).execute()
-        
-        history_result = supabase.table('app_history')\
-            .select('id')\
-            .eq('appId', current_app['id'])\
-            .order('timestamp', desc=True)\
-            .execute()
+        status_changed_to_open = is_status_change_to_open(previous_status, app_data['betaAvailable'])
+        update_data = build_app_update(app_data)
+        history_entry = build_history_entry(current_app['id'], app_data)
         
-        if len(history_result.data) > 30:
-            old_ids = [item['id'] for item in history_result.data[30:]]
-            if old_ids:
-                supabase.table('app_history').delete().in_('id', old_ids).execute()
+        if write_behind:
+            # Lands in the local store now; the flusher writes apps and app_history later
+            write_behind.enqueue_status(current_app, update_data, history_entry, previous_status)
+            app_snapshot.apply_rows([dict(current_app, **update_data)])
+        else:
+            with profile_span('apps.update', 'supabase'):
+                update_result = supabase.table('apps').update(update_data).eq('sanitizedName', sanitized_name).execute()
+            app_snapshot.apply_rows(update_result.data)
+            
+            if not update_result.data:
+                log.warning('app_status_not_updated', app=app_data['name'])
+            
+            with profile_span('app_history.insert', 'supabase'):
+                supabase.table('app_history').insert(history_entry).execute()
+            history_analytics.record(current_app['id'], sanitized_name, previous_status, history_entry)
+            trim_app_history(current_app['id'])
         
         return {
             'updated': True, 
@@ -320,76 +2180,93 @@ def update_app_status(app_data: Dict[str, Any]) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        try:
-            print(f"Error updating app status for {app_data.get('name', 'Unknown')}: {str(e)}")
-        except UnicodeEncodeError:
-            print(f"Error updating app status for [App with special characters]: {str(e)}")
+        log.error('app_status_update_failed', app=app_data.get('name', 'Unknown'), error=str(e))
         return {'updated': False, 'status_changed': False, 'previous_status': None, 'error': str(e)}
 
-def check_if_notification_sent(app_name: str, current_status: str, previous_status: str) -> bool:
-    """Check if a notification was already sent for this specific status change"""
-    try:
-        sanitized_name = sanitize_string(app_name)
-        result = supabase.table('telegram_posts')\
-            .select('timestamp, version')\
-            .eq('appname', app_name)\
-            .execute()
-        
-        if not result.data:
-            return False
-        
-        last_post = result.data[0]
-        last_version = last_post.get('version', '')
-        
-        # Check if we already sent a notification for this specific status change
-        status_change_pattern = f'python_status_change_{previous_status}_to_{current_status}'
-        if status_change_pattern in last_version:
-            return True
-            
-        return False
-        
-    except Exception as e:
-        return False
+def notification_version_prefix(current_status: str, previous_status: str) -> str:
+    return f'python_status_change_{previous_status}_to_{current_status}'
+
+# Postgres unique_violation, as reported in postgrest's APIError.code
+UNIQUE_VIOLATION = '23505'
+
+def notification_claim_row(app_name: str, current_status: str, previous_status: str) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc).isoformat()
+    return {'appname': app_name, 'timestamp': now, 'version': f'{notification_version_prefix(current_status, previous_status)}_{now}'}
+
+def notification_unclaimed_filter(current_status: str, previous_status: str) -> str:
+    """telegram_posts rows whose last recorded change is a different one."""
+    return f'version.is.null,version.not.like.*{notification_version_prefix(current_status, previous_status)}*'
+
+def claim_notification(app_name: str, current_status: str, previous_status: str) -> bool:
+    """Record a notification for this status change unless one was already recorded; True if claimed.
 
-def record_notification_sent(app_name: str, current_status: str, previous_status: str) -> None:
-    """Record that a notification was sent for this app status change"""
+    telegram_posts is unique on appname, so the claim is one conditional write: move a
+    row that records a different change, or insert the app's first row. Only one caller
+    wins either way, whether it runs on another thread, the asgi loop or another instance.
+    """
+    row = notification_claim_row(app_name, current_status, previous_status)
     try:
-        version = f'python_status_change_{previous_status}_to_{current_status}_{datetime.now(timezone.utc).isoformat()}'
-        supabase.table('telegram_posts').upsert({
-            'appname': app_name,
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'version': version
-        }, {
-            'onConflict': 'appname'
-        }).execute()
+        with profile_span('telegram_posts.claim', 'supabase'):
+            claimed = supabase.table('telegram_posts')\
+                .update(row)\
+                .eq('appname', app_name)\
+                .or_(notification_unclaimed_filter(current_status, previous_status))\
+                .execute()
+            if claimed.data:
+                return True
+            try:
+                supabase.table('telegram_posts').insert(row).execute()
+                return True
+            except Exception as e:
+                if getattr(e, 'code', None) == UNIQUE_VIOLATION:
+                    # Already recorded, or another caller claimed it first
+                    return False
+                raise
     except Exception as e:
-        pass
+        # An unreachable telegram_posts must not silence alerts
+        log.warning('notification_claim_unavailable', app=app_name, error=str(e))
+        return True
+
+def build_notify_entry(app: Dict[str, Any], previous_status: Optional[str]) -> Dict[str, Any]:
+    """Entry for an app whose beta just opened, as sent to the Telegram and email endpoints"""
+    return {
+        'name': app['name'],
+        'clickCount': app['clickCount'],
+        'betaAvailable': 'open',
+        'previousStatus': previous_status,
+        'categories': app.get('categories', []),
+        'logo': app.get('logo', ''),
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
 
-def send_email_notification(apps_to_notify: list, base_url: str = DEFAULT_NOTIFICATION_URL) -> Dict[str, Any]:
+def build_email_apps(apps_to_notify: list) -> list:
+    """Format apps data for email notification"""
+    return [
+        {
+            'name': app['name'],
+            'betaAvailable': app.get('betaAvailable', app.get('status', 'open')),
+            'clickCount': app.get('clickCount', 0),
+            'categories': app.get('categories', []),
+            'logo': app.get('logo', ''),
+            'timestamp': app.get('timestamp', datetime.now(timezone.utc).isoformat())
+        }
+        for app in apps_to_notify
+    ]
+
+def send_email_notification(apps_to_notify: list, base_url: str = DEFAULT_NOTIFICATION_URL, timeout: float = 30) -> Dict[str, Any]:
+    import requests
     try:
         if not apps_to_notify:
             return {'success': False, 'message': 'No apps to notify via email'}
         
         api_url = f"{base_url}/api/sendEmailToList"
         
-        # Format apps data for email notification
-        email_apps = []
-        for app in apps_to_notify:
-            email_app = {
-                'name': app['name'],
-                'betaAvailable': app.get('betaAvailable', app.get('status', 'open')),
-                'clickCount': app.get('clickCount', 0),
-                'categories': app.get('categories', []),
-                'logo': app.get('logo', ''),
-                'timestamp': app.get('timestamp', datetime.now(timezone.utc).isoformat())
-            }
-            email_apps.append(email_app)
-        
         payload = {
-            'apps': email_apps
+            'apps': build_email_apps(apps_to_notify)
         }
         
-        response = requests.post(api_url, json=payload, timeout=30)
+        with profile_span(api_url.rsplit('/', 1)[-1], 'notify', apps=len(apps_to_notify)):
+            response = get_http_session().post(api_url, json=payload, timeout=timeout)
         
         if response.status_code == 200:
             return {'success': True, 'data': response.json(), 'sent_count': len(apps_to_notify)}
@@ -401,7 +2278,8 @@ def send_email_notification(apps_to_notify: list, base_url: str = DEFAULT_NOTIFI
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def send_telegram_notification(apps_to_notify: list, base_url: str = DEFAULT_NOTIFICATION_URL) -> Dict[str, Any]:
+def send_telegram_notification(apps_to_notify: list, base_url: str = DEFAULT_NOTIFICATION_URL, timeout: float = 30) -> Dict[str, Any]:
+    import requests
     try:
         if not apps_to_notify:
             return {'success': False, 'message': 'No apps to notify'}
@@ -412,7 +2290,8 @@ def send_telegram_notification(apps_to_notify: list, base_url: str = DEFAULT_NOT
             'apps': apps_to_notify
         }
         
-        response = requests.post(api_url, json=payload, timeout=30)
+        with profile_span(api_url.rsplit('/', 1)[-1], 'notify', apps=len(apps_to_notify)):
+            response = get_http_session().post(api_url, json=payload, timeout=timeout)
         
         if response.status_code == 200:
             return {'success': True, 'data': response.json(), 'sent_count': len(apps_to_notify)}
@@ -424,10 +2303,124 @@ def send_telegram_notification(apps_to_notify: list, base_url: str = DEFAULT_NOT
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def get_user_interactions() -> Dict[str, int]:
+# Open-beta notifications are queued and sent as digests across runs, so a busy day
+# costs a few Telegram posts and list emails instead of one per run. Queue table:
+#   notification_queue ("id" int8 identity primary key, "appName" text, "baseUrl" text,
+#     "entry" jsonb, "urgent" bool, "queuedAt" timestamptz, "sentTelegram" bool,
+#     "sentEmail" bool, "claimedBy" text, "claimedAt" timestamptz)
+# A digest goes out when the oldest entry is NOTIFY_DIGEST_WINDOW_SECONDS old, when
+# NOTIFY_DIGEST_MAX_APPS are waiting, or at once when an app has at least
+# NOTIFY_URGENT_CLICKS clicks. NOTIFY_DIGEST_WINDOW_SECONDS=0 sends every run's list directly.
+NOTIFY_DIGEST_WINDOW_SECONDS = int(os.getenv('NOTIFY_DIGEST_WINDOW_SECONDS', '900'))
+NOTIFY_DIGEST_MAX_APPS = int(os.getenv('NOTIFY_DIGEST_MAX_APPS', '20'))
+NOTIFY_URGENT_CLICKS = int(os.getenv('NOTIFY_URGENT_CLICKS', '500'))
+NOTIFY_CLAIM_SECONDS = 120
+
+def _unclaimed_filter(now: datetime) -> str:
+    expired = (now - timedelta(seconds=NOTIFY_CLAIM_SECONDS)).isoformat()
+    return f'claimedBy.is.null,claimedAt.lt.{expired}'
+
+def queue_notifications(apps_to_notify: list, base_url: str) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    with profile_span('notification_queue.insert', 'supabase', apps=len(apps_to_notify)):
+        supabase.table('notification_queue').insert([{
+            'appName': entry['name'],
+            'baseUrl': base_url,
+            'entry': entry,
+            'urgent': (entry.get('clickCount') or 0) >= NOTIFY_URGENT_CLICKS,
+            'queuedAt': now,
+            'sentTelegram': False,
+            'sentEmail': False
+        } for entry in apps_to_notify]).execute()
+
+def flush_notification_digest(base_url: str, force: bool = False, timeout: float = 30) -> Optional[Dict[str, Any]]:
+    """Send queued entries for base_url as one digest if one is due (or force); None if nothing was sent."""
+    now = datetime.now(timezone.utc)
+    with profile_span('notification_queue.select', 'supabase'):
+        pending = supabase.table('notification_queue')\
+            .select('id, queuedAt, urgent')\
+            .eq('baseUrl', base_url)\
+            .or_(_unclaimed_filter(now))\
+            .order('queuedAt')\
+            .execute().data or []
+    if not pending:
+        return None
+    oldest = datetime.fromisoformat(pending[0]['queuedAt'])
+    due = (
+        force
+        or len(pending) >= NOTIFY_DIGEST_MAX_APPS
+        or any(row.get('urgent') for row in pending)
+        or (now - oldest).total_seconds() >= NOTIFY_DIGEST_WINDOW_SECONDS
+    )
+    if not due:
+        return {'queued': len(pending), 'sent': False, 'oldest_age_seconds': round((now - oldest).total_seconds(), 1)}
+
+    # Claiming through an update that only matches unclaimed rows keeps two instances
+    # from sending the same entries
+    with profile_span('notification_queue.claim', 'supabase'):
+        claimed = supabase.table('notification_queue')\
+            .update({'claimedBy': INSTANCE_ID, 'claimedAt': now.isoformat()})\
+            .in_('id', [row['id'] for row in pending])\
+            .or_(_unclaimed_filter(now))\
+            .execute().data or []
+    if not claimed:
+        return None
+
+    telegram_rows = [row for row in claimed if not row.get('sentTelegram')]
+    email_rows = [row for row in claimed if not row.get('sentEmail')]
+    telegram_res = send_telegram_notification([row['entry'] for row in telegram_rows], base_url, timeout=timeout) if telegram_rows else None
+    email_res = send_email_notification([row['entry'] for row in email_rows], base_url, timeout=timeout) if email_rows else None
+
+    # A channel that failed is retried with the next digest; the one that worked is not repeated
+    if telegram_res and telegram_res.get('success'):
+        supabase.table('notification_queue').update({'sentTelegram': True}).in_('id', [row['id'] for row in telegram_rows]).execute()
+    if email_res and email_res.get('success'):
+        supabase.table('notification_queue').update({'sentEmail': True}).in_('id', [row['id'] for row in email_rows]).execute()
+    claimed_ids = [row['id'] for row in claimed]
+    supabase.table('notification_queue').delete().in_('id', claimed_ids).eq('sentTelegram', True).eq('sentEmail', True).execute()
+    supabase.table('notification_queue').update({'claimedBy': None, 'claimedAt': None}).in_('id', claimed_ids).execute()
+    return {'queued': 0, 'sent': True, 'apps': len(claimed), 'telegram': telegram_res, 'email': email_res}
+
+def send_notifications_now(apps_to_notify: list, base_url: str, timeout: float = 30) -> Dict[str, Any]:
+    """Send entries straight away, in the shape flush_notification_digest returns."""
+    return {
+        'queued': 0,
+        'sent': True,
+        'apps': len(apps_to_notify),
+        'telegram': send_telegram_notification(apps_to_notify, base_url, timeout=timeout),
+        'email': send_email_notification(apps_to_notify, base_url, timeout=timeout)
+    }
+
+def dispatch_notifications(apps_to_notify: list, base_url: str = DEFAULT_NOTIFICATION_URL, timeout: float = 30) -> Optional[Dict[str, Any]]:
+    """Queue a run's open-beta entries and send a digest if one is due.
+
+    Returns flush_notification_digest's result ('sent' is False while the digest
+    is held), the same shape when the entries had to go out directly, or None.
+    """
+    if NOTIFY_DIGEST_WINDOW_SECONDS <= 0:
+        return send_notifications_now(apps_to_notify, base_url, timeout=timeout) if apps_to_notify else None
+    if apps_to_notify:
+        try:
+            queue_notifications(apps_to_notify, base_url)
+        except Exception as e:
+            # The queue is an optimisation; never lose an alert because it is unavailable
+            log.warning('notification_queue_unavailable', error=str(e))
+            return send_notifications_now(apps_to_notify, base_url, timeout=timeout)
+    # From here the digest owns the entries: a failed flush leaves them queued for the next one
+    try:
+        return flush_notification_digest(base_url, timeout=timeout)
+    except Exception as e:
+        log.warning('notification_digest_flush_failed', error=str(e))
+        return None
+
+def get_user_interactions() -> InteractionCounts:
+    with profile_span('get_user_interactions', 'source'):
+        return _get_user_interactions()
+
+def _get_user_interactions() -> InteractionCounts:
     try:
         # Fetch ALL user interactions without limit using pagination
-        all_interactions = []
+        pairs = []
         page_size = 1000
         page = 0
         
@@ -441,78 +2434,250 @@ def get_user_interactions() -> Dict[str, int]:
             if not result.data or len(result.data) == 0:
                 break
                 
-            all_interactions.extend(result.data)
+            pairs.extend((item['sanitizedName'], item.get('clickCount', 0)) for item in result.data if item.get('sanitizedName'))
             
             if len(result.data) < page_size:
                 break
                 
             page += 1
         
-        if not all_interactions:
-            print("Warning: No user interactions found")
-            return {}
+        if not pairs:
+            log.warning('user_interactions_empty')
+            return InteractionCounts(())
         
-        interactions = {}
-        for item in all_interactions:
-            sanitized_name = item.get('sanitizedName')
-            click_count = item.get('clickCount', 0)
-            if sanitized_name:
-                interactions[sanitized_name] = click_count
+        interactions = InteractionCounts(pairs)
+        del pairs
         
-        print(f"Loaded {len(interactions)} user interactions (all data)")
+        log.info('user_interactions_loaded', count=len(interactions))
         
         return interactions
     except Exception as e:
-        print(f"Error fetching user interactions: {str(e)}")
-        return {}
+        log.error('user_interactions_failed', error=str(e))
+        return InteractionCounts(())
+
+
+
+# Sharding lets several instances split the apps catalog between them. Tables:
+#   service_instances ("instanceId" text primary key, "startedAt" timestamptz, "lastSeen" timestamptz)
+#   shard_leases ("shardId" int primary key, "instanceId" text, "leaseExpiresAt" timestamptz)
+SHARDING_ENABLED = os.getenv('SHARDING_ENABLED', '').lower() in ('1', 'true', 'yes')
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '64'))
+SHARD_LEASE_SECONDS = int(os.getenv('SHARD_LEASE_SECONDS', '120'))
+SHARD_VIRTUAL_NODES = 32
+INSTANCE_ID = os.getenv('INSTANCE_ID') or f"{socket.gethostname()}-{os.getpid()}"
+if SHARDING_ENABLED and not os.getenv('INSTANCE_ID'):
+    # hostname-pid changes on every restart, so the ring reshuffles shards each deploy
+    log.warning('instance_id_not_set', instance_id=INSTANCE_ID, hint='set INSTANCE_ID to a stable name per instance')
+
+def stable_hash(value: str) -> int:
+    """Process-independent 64-bit hash (the builtin hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def shard_for(sanitized_name: str) -> int:
+    return stable_hash(sanitized_name) % SHARD_COUNT
+
+class HashRing:
+    """Consistent hash ring, so a membership change only moves the shards of the joining or leaving instance."""
+
+    def __init__(self, nodes: list, virtual_nodes: int = SHARD_VIRTUAL_NODES):
+        self.points = sorted(
+            (stable_hash(f'{node}#{replica}'), node)
+            for node in nodes
+            for replica in range(virtual_nodes)
+        )
+        self.hashes = [point for point, _ in self.points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self.points:
+            return None
+        position = bisect.bisect(self.hashes, stable_hash(key)) % len(self.points)
+        return self.points[position][1]
+
+class ShardCoordinator:
+    """Registers this instance and keeps time-limited leases on its share of the catalog.
+
+    Every live instance (heartbeat within SHARD_LEASE_SECONDS) is placed on a hash
+    ring and each shard wants the instance that owns it on the ring. A shard is
+    only taken over once the previous holder's lease has expired, so two instances
+    never check the same shard at once while membership changes.
+    """
+
+    def __init__(self, instance_id: str = INSTANCE_ID):
+        self.instance_id = instance_id
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.owned_shards: set = set()
+        self.live_instances: list = []
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+        self.shards_seeded = False
+
+    def _heartbeat(self, now: datetime) -> None:
+        supabase.table('service_instances').upsert({
+            'instanceId': self.instance_id,
+            'startedAt': self.started_at,
+            'lastSeen': now.isoformat()
+        }, on_conflict='instanceId').execute()
+
+    def _load_live_instances(self, now: datetime) -> list:
+        cutoff = (now - timedelta(seconds=SHARD_LEASE_SECONDS)).isoformat()
+        result = supabase.table('service_instances').select('instanceId').gte('lastSeen', cutoff).execute()
+        instances = {row['instanceId'] for row in (result.data or [])}
+        instances.add(self.instance_id)
+        return sorted(instances)
+
+    def _seed_shards(self) -> None:
+        if self.shards_seeded:
+            return
+        supabase.table('shard_leases').upsert(
+            [{'shardId': shard, 'instanceId': None, 'leaseExpiresAt': datetime.fromtimestamp(0, timezone.utc).isoformat()} for shard in range(SHARD_COUNT)],
+            on_conflict='shardId',
+            ignore_duplicates=True
+        ).execute()
+        self.shards_seeded = True
+
+    def refresh(self, force: bool = False) -> set:
+        """Heartbeat, rebalance and renew leases; cheap to call before every run."""
+        with self.lock:
+            if not force and time.monotonic() - self.refreshed_at < SHARD_LEASE_SECONDS / 3:
+                return set(self.owned_shards)
+
+            now = datetime.now(timezone.utc)
+            self._heartbeat(now)
+            self._seed_shards()
+            self.live_instances = self._load_live_instances(now)
+
+            ring = HashRing(self.live_instances)
+            desired = [shard for shard in range(SHARD_COUNT) if ring.owner(f'shard-{shard}') == self.instance_id]
+
+            # Give back shards that moved to another instance so it does not wait out the lease
+            released = sorted(self.owned_shards - set(desired))
+            if released:
+                supabase.table('shard_leases')\
+                    .update({'leaseExpiresAt': now.isoformat()})\
+                    .eq('instanceId', self.instance_id)\
+                    .in_('shardId', released)\
+                    .execute()
+
+            # Renew our own leases and take over desired shards whose lease has lapsed, in one conditional update
+            owned = set()
+            if desired:
+                expires = (now + timedelta(seconds=SHARD_LEASE_SECONDS)).isoformat()
+                result = supabase.table('shard_leases')\
+                    .update({'instanceId': self.instance_id, 'leaseExpiresAt': expires})\
+                    .in_('shardId', desired)\
+                    .or_(f'instanceId.eq.{self.instance_id},leaseExpiresAt.lt.{now.isoformat()}')\
+                    .execute()
+                owned = {row['shardId'] for row in (result.data or [])}
+
+            if owned != self.owned_shards:
+                log.info('shards_rebalanced', instance_id=self.instance_id, owned=len(owned), shard_count=SHARD_COUNT, live_instances=len(self.live_instances))
+            self.owned_shards = owned
+            self.refreshed_at = time.monotonic()
+            return set(owned)
 
+    def release_all(self) -> None:
+        """Drop our leases and registration so the remaining instances rebalance immediately."""
+        try:
+            now = datetime.now(timezone.utc).isoformat()
+            supabase.table('shard_leases').update({'leaseExpiresAt': now}).eq('instanceId', self.instance_id).execute()
+            supabase.table('service_instances').delete().eq('instanceId', self.instance_id).execute()
+        except Exception as e:
+            log.error('shard_release_failed', instance_id=self.instance_id, error=str(e))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'enabled': SHARDING_ENABLED,
+            'instance_id': self.instance_id,
+            'shard_count': SHARD_COUNT,
+            'owned_shards': sorted(self.owned_shards),
+            'live_instances': self.live_instances,
+            'lease_seconds': SHARD_LEASE_SECONDS
+        }
 
+shard_coordinator = ShardCoordinator()
+
+if SHARDING_ENABLED:
+    atexit.register(shard_coordinator.release_all)
+
+def filter_owned_apps(apps_data: list, counter_key: str) -> tuple:
+    """Narrow a catalog to this instance's shards; also returns the cursor key for that shard set.
+
+    The cursor is keyed by the shards held, not by INSTANCE_ID, so a restarted
+    instance that gets the same shards back resumes where it left off, and a
+    changed shard set (whose app list is different anyway) starts a fresh cursor.
+    """
+    if not SHARDING_ENABLED:
+        return apps_data, counter_key
+    owned = shard_coordinator.refresh()
+    owned_apps = [app for app in apps_data if shard_for(app.get('sanitizedName') or sanitize_string(app.get('name', ''))) in owned]
+    shard_set = hashlib.blake2b(','.join(str(shard) for shard in sorted(owned)).encode('utf-8'), digest_size=6).hexdigest()
+    return owned_apps, f'{counter_key}@shards-{shard_set}'
 
 def get_processing_index(counter_key: str) -> int:
+    if write_behind:
+        local = write_behind.get_cursor(counter_key)
+        if local is not None:
+            return local
     try:
-        result = supabase.table('processing_indexes').select('lastChecked').eq('counterKey', counter_key).execute()
+        with profile_span('get_processing_index', 'cursor', counter_key=counter_key):
+            result = supabase.table('processing_indexes').select('lastChecked').eq('counterKey', counter_key).execute()
         return result.data[0]['lastChecked'] if (hasattr(result, 'data') and result.data) else 0
     except Exception as e:
-        print(f"Error getting processing index for {counter_key}: {e}")
+        log.error('processing_index_read_failed', counter_key=counter_key, error=str(e))
         return 0
 
-def process_apps_from_supabase(click_threshold: int, counter_key: str, max_apps_to_process: int = 5, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL) -> Dict[str, Any]:
-    """Fetch and process apps directly from Supabase, focusing on high-click apps to keep usage low."""
+def process_apps_from_supabase(click_threshold: int, counter_key: str, max_apps_to_process: int = 5, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL, deadline_ms: Optional[int] = None) -> Dict[str, Any]:
+    """Fetch and process apps directly from Supabase, focusing on high-click apps to keep usage low.
+
+    With deadline_ms set, the run stops starting new apps once the next one would
+    not fit in the budget, and still flushes notifications and the cursor.
+    """
+    deadline = RunDeadline(deadline_ms)
+    journal = None
     try:
-        # Get apps from Supabase that meet the click threshold
-        # We only fetch necessary columns to minimize Supabase egress (data usage)
-        # We skip 'description' and 'screenshotUrls' as they are not needed for status checks
-        fields = 'id, name, link, betaAvailable, clickCount, sanitizedName, categories, logo, lastChecked'
-        query = supabase.table('apps')\
-            .select(fields)\
-            .gte('clickCount', click_threshold)\
-            .order('clickCount', desc=True)
-            
-        result = query.execute()
+        # Apps meeting the click threshold come from the shared clickCount index, so
+        # every route and every back-to-back run reads one cached copy of `apps`
+        with profile_span('load_apps', 'source', click_threshold=click_threshold):
+            apps_data = threshold_index.window(click_threshold)
         
-        if not result.data:
+        if not apps_data:
             return {"message": "No apps found in Supabase meeting the threshold", "processed": 0}
 
-        apps_data = result.data
+        apps_data, counter_key = filter_owned_apps(apps_data, counter_key)
+        if not apps_data:
+            return {"message": f"No apps in the shards held by {INSTANCE_ID}", "processed": 0}
         total_apps = len(apps_data)
         
-        start_index = get_processing_index(counter_key)
+        governor = MemoryGovernor(counter_key, max_apps_to_process)
+        claim = claim_processing_range(counter_key, min(governor.batch_limit, total_apps))
+        start_index = claim['start'] if claim else get_processing_index(counter_key)
+        if claim:
+            journal = RunJournal(counter_key, notification_base_url, commit=lambda done: checkpoint_processing_range(counter_key, claim, done))
+        else:
+            journal = RunJournal(counter_key, notification_base_url, commit=lambda done: update_processing_index(counter_key, (start_index + done) % total_apps))
         count = 0
         checked = 0
-        apps_to_notify = []
+        # Entries a crashed run claimed but never sent go out with this run's
+        apps_to_notify = journal.adopt() if send_notifications else []
+        circuit_open = False
 
         # Only process a small batch at a time
-        while count < max_apps_to_process and checked < total_apps:
+        while count < governor.batch_limit and checked < total_apps and (claim is None or start_index + checked < claim['end']):
+            if not deadline.can_start_app():
+                break
+
             app_index = (start_index + checked) % total_apps
-            app = apps_data[app_index]
+            app = apps_data[app_index].to_dict()
             
-            try:
-                print(f"Checking app: {app.get('name')} (clicks: {app.get('clickCount')})")
-            except Exception:
-                pass
+            log.debug('checking_app', app=app.get('name'), clicks=app.get('clickCount'))
 
             # Re-check beta availability
-            app['betaAvailable'] = fetch_beta_availability(app['link'])
+            beta_status = fetch_beta_availability(app['link'])
+            if beta_status == CIRCUIT_OPEN_STATUS:
+                # Leave this app for the next run rather than recording a status we never saw
+                circuit_open = True
+                break
+            app['betaAvailable'] = beta_status
             
             # Enrich with iTunes data if missing critical details
             # app = enrich_app_with_itunes_data(app)
@@ -520,36 +2685,30 @@ def process_apps_from_supabase(click_threshold: int, counter_key: str, max_apps_
             update_result = update_app_status(app)
             
             if update_result['updated'] and update_result['status_changed'] and update_result['current_status'] == 'open':
-                if send_notifications and not check_if_notification_sent(app['name'], 'open', update_result['previous_status']):
-                    apps_to_notify.append({
-                        'name': app['name'],
-                        'clickCount': app['clickCount'],
-                        'betaAvailable': 'open',
-                        'previousStatus': update_result['previous_status'],
-                        'categories': app.get('categories', []),
-                        'logo': app.get('logo', ''),
-                        'timestamp': datetime.now(timezone.utc).isoformat()
-                    })
-                    record_notification_sent(app['name'], 'open', update_result['previous_status'])
+                if send_notifications and claim_notification(app['name'], 'open', update_result['previous_status']):
+                    entry = build_notify_entry(app, update_result['previous_status'])
+                    journal.add_notification(entry)
+                    apps_to_notify.append(entry)
 
             count += 1
             checked += 1
+            journal.app_done(app.get('name'), checked)
             
             # Rate limiting for scraping/API calls
-            time.sleep(1.0)
-            import gc
-            gc.collect()
+            with profile_span('rate_limit_sleep', 'sleep'):
+                time.sleep(1.0)
+            governor.checkpoint()
 
         # Handle notifications
-        telegram_res = None
-        email_res = None
-        if send_notifications and apps_to_notify:
-            telegram_res = send_telegram_notification(apps_to_notify, notification_base_url)
-            email_res = send_email_notification(apps_to_notify, notification_base_url)
+        notifications = journal.dispatch(timeout=deadline.request_timeout(30)) if send_notifications else None
 
         # Update index for next run
-        new_index = (start_index + checked) % total_apps
-        update_processing_index(counter_key, new_index)
+        if claim:
+            complete_processing_range(counter_key, claim, checked)
+        else:
+            new_index = (start_index + checked) % total_apps
+            update_processing_index(counter_key, new_index)
+        journal.finish()
 
         return {
             "message": f"Processed {count} apps from Supabase for {counter_key}.",
@@ -558,34 +2717,337 @@ def process_apps_from_supabase(click_threshold: int, counter_key: str, max_apps_
                 "processed": count,
                 "notifications_sent": len(apps_to_notify)
             },
-            "telegram": telegram_res,
-            "email": email_res
+            "memory": governor.report(),
+            "circuit_open": circuit_open,
+            "deadline": deadline.report(),
+            "telegram": notifications and notifications.get('telegram'),
+            "email": notifications and notifications.get('email')
         }
     except Exception as e:
+        if journal:
+            journal.abandon()
         return {"error": str(e)}
 
+# Cursor reservations. processing_indexes needs a "reservedUntil" int8 column (end of
+# the newest range handed out) and every outstanding range is a row of:
+#   processing_reservations ("counterKey" text, "start" int8, "end" int8, "done" int8,
+#     "owner" text, "expiresAt" timestamptz, primary key ("counterKey", "start"))
+# Positions are absolute and only ever grow; the app index is position % total_apps.
+# A run moves its row's "done" and lease forward at each checkpoint and deletes the row
+# once the range is finished. A row whose lease lapsed (the run died) or that a run
+# handed back short is re-issued from its "done" offset before a new range is cut.
+# lastChecked is only the low-water mark: every position below it is done.
+CURSOR_LEASE_SECONDS = int(os.getenv('CURSOR_LEASE_SECONDS', '600'))
+CURSOR_CLAIM_ATTEMPTS = 5
+
+def claim_processing_range(counter_key: str, size: int) -> Optional[Dict[str, int]]:
+    """Reserve cursor positions for this run: a lapsed range if there is one, else the next `size`.
+
+    Overlapping runs of the same counter key get disjoint ranges. Returns
+    {'start', 'end', 'reservation', 'owner'} (reservation is the row's key) or None
+    when reservations are unavailable (e.g. the table is missing), in which case
+    callers fall back to the plain cursor.
+    """
+    with profile_span('claim_processing_range', 'cursor', counter_key=counter_key, size=size):
+        try:
+            owner = f"{INSTANCE_ID}-{time.time_ns()}"
+            for _ in range(CURSOR_CLAIM_ATTEMPTS):
+                now = datetime.now(timezone.utc)
+                expires = (now + timedelta(seconds=CURSOR_LEASE_SECONDS)).isoformat()
+                claim = _reissue_processing_range(counter_key, owner, now, expires)
+                if claim is None:
+                    claim = _reserve_processing_range(counter_key, size, owner, expires)
+                if claim is not None:
+                    return claim
+
+            log.warning('cursor_reservation_failed', counter_key=counter_key, attempts=CURSOR_CLAIM_ATTEMPTS)
+            return None
+        except Exception as e:
+            log.warning('cursor_reservations_unavailable', counter_key=counter_key, error=str(e))
+            return None
+
+def _reissue_processing_range(counter_key: str, owner: str, now: datetime, expires: str) -> Optional[Dict[str, int]]:
+    result = supabase.table('processing_reservations')\
+        .select('start, end, done, owner, expiresAt')\
+        .eq('counterKey', counter_key)\
+        .lt('expiresAt', now.isoformat())\
+        .order('start')\
+        .limit(1)\
+        .execute()
+    if not result.data:
+        return None
+    row = result.data[0]
+    # Conditional on the old owner and lease, so exactly one run takes it over
+    taken = supabase.table('processing_reservations')\
+        .update({'owner': owner, 'expiresAt': expires})\
+        .eq('counterKey', counter_key)\
+        .eq('start', row['start'])\
+        .eq('owner', row['owner'])\
+        .eq('expiresAt', row['expiresAt'])\
+        .execute()
+    if not taken.data:
+        return None
+    log.warning('cursor_range_reissued', counter_key=counter_key, start=row['start'], end=row['end'], done=row.get('done') or 0, previous_owner=row['owner'])
+    return {'start': row['start'] + (row.get('done') or 0), 'end': row['end'], 'reservation': row['start'], 'owner': owner}
+
+def _reserve_processing_range(counter_key: str, size: int, owner: str, expires: str) -> Optional[Dict[str, int]]:
+    result = supabase.table('processing_indexes').select('lastChecked, reservedUntil').eq('counterKey', counter_key).execute()
+    if result.data:
+        row = result.data[0]
+        start = row['reservedUntil'] if row.get('reservedUntil') is not None else (row.get('lastChecked') or 0)
+    else:
+        try:
+            supabase.table('processing_indexes').insert({'counterKey': counter_key, 'lastChecked': 0, 'reservedUntil': 0}).execute()
+        except Exception:
+            # Another run created the row first
+            pass
+        start = 0
+    try:
+        # The primary key makes the reservation itself the allocation: one run per start
+        supabase.table('processing_reservations').insert({
+            'counterKey': counter_key,
+            'start': start,
+            'end': start + size,
+            'done': 0,
+            'owner': owner,
+            'expiresAt': expires
+        }).execute()
+    except Exception:
+        # Taken. Its run may have died before moving reservedUntil; move it on its behalf
+        existing = supabase.table('processing_reservations').select('end').eq('counterKey', counter_key).eq('start', start).execute()
+        if existing.data:
+            _advance_reserved_until(counter_key, existing.data[0]['end'])
+        return None
+    _advance_reserved_until(counter_key, start + size)
+    return {'start': start, 'end': start + size, 'reservation': start, 'owner': owner}
+
+def _advance_reserved_until(counter_key: str, end: int) -> None:
+    supabase.table('processing_indexes')\
+        .update({'reservedUntil': end})\
+        .eq('counterKey', counter_key)\
+        .or_(f'reservedUntil.lt.{end},reservedUntil.is.null')\
+        .execute()
+
+def _save_processing_range(counter_key: str, claim: Dict[str, int], processed: int, expires: str) -> bool:
+    done = claim['start'] - claim['reservation'] + processed
+    result = supabase.table('processing_reservations')\
+        .update({'done': done, 'expiresAt': expires})\
+        .eq('counterKey', counter_key)\
+        .eq('start', claim['reservation'])\
+        .eq('owner', claim['owner'])\
+        .execute()
+    return bool(result.data)
+
+def checkpoint_processing_range(counter_key: str, claim: Dict[str, int], processed: int) -> None:
+    """Record progress through a reserved range mid-run and extend its lease."""
+    with profile_span('checkpoint_processing_range', 'cursor', counter_key=counter_key, position=claim['start'] + processed):
+        try:
+            expires = (datetime.now(timezone.utc) + timedelta(seconds=CURSOR_LEASE_SECONDS)).isoformat()
+            if not _save_processing_range(counter_key, claim, processed, expires):
+                log.warning('cursor_range_lost', counter_key=counter_key, reservation=claim['reservation'], owner=claim['owner'])
+        except Exception as e:
+            log.error('processing_index_commit_failed', counter_key=counter_key, error=str(e))
+
+def _commit_processing_position(counter_key: str) -> Optional[int]:
+    """Move lastChecked up to the lowest position not yet done; returns it."""
+    outstanding = supabase.table('processing_reservations').select('start, done').eq('counterKey', counter_key).execute()
+    if outstanding.data:
+        committed = min(row['start'] + (row.get('done') or 0) for row in outstanding.data)
+    else:
+        index = supabase.table('processing_indexes').select('reservedUntil').eq('counterKey', counter_key).execute()
+        if not index.data or index.data[0].get('reservedUntil') is None:
+            return None
+        committed = index.data[0]['reservedUntil']
+    # Never move the cursor backwards past a run that finished before us
+    supabase.table('processing_indexes')\
+        .update({'lastChecked': committed})\
+        .eq('counterKey', counter_key)\
+        .lt('lastChecked', committed)\
+        .execute()
+    return committed
+
+def complete_processing_range(counter_key: str, claim: Dict[str, int], processed: int) -> None:
+    """Finish a reserved range, handing back any unprocessed tail for the next claim."""
+    position = claim['start'] + processed
+    with profile_span('complete_processing_range', 'cursor', counter_key=counter_key, position=position):
+        try:
+            if position >= claim['end']:
+                supabase.table('processing_reservations')\
+                    .delete()\
+                    .eq('counterKey', counter_key)\
+                    .eq('start', claim['reservation'])\
+                    .eq('owner', claim['owner'])\
+                    .execute()
+            else:
+                # An already lapsed lease: the next claim re-issues the tail from here
+                _save_processing_range(counter_key, claim, processed, datetime.now(timezone.utc).isoformat())
+            committed = _commit_processing_position(counter_key)
+            log.info('processing_index_committed', counter_key=counter_key, index=committed, position=position, reserved_start=claim['start'], reserved_end=claim['end'])
+        except Exception as e:
+            log.error('processing_index_commit_failed', counter_key=counter_key, error=str(e))
+
 def update_processing_index(counter_key: str, last_checked: int) -> None:
+    with profile_span('update_processing_index', 'cursor', counter_key=counter_key, last_checked=last_checked):
+        _update_processing_index(counter_key, last_checked)
+
+def _update_processing_index(counter_key: str, last_checked: int) -> None:
+    if write_behind:
+        write_behind.set_cursor(counter_key, last_checked)
+        return
     try:
-        res = supabase.table('processing_indexes').select('counterKey').eq('counterKey', counter_key).execute()
-        if hasattr(res, 'data') and res.data:
-            supabase.table('processing_indexes').update({'lastChecked': last_checked}).eq('counterKey', counter_key).execute()
-            print(f"Updated index {counter_key} to {last_checked}")
-        else:
-            supabase.table('processing_indexes').insert({
-                'counterKey': counter_key,
-                'lastChecked': last_checked
-            }).execute()
-            print(f"Inserted new index {counter_key} at {last_checked}")
-            
+        write_processing_index(counter_key, last_checked)
     except Exception as e:
-        print(f"Error updating processing_indexes for {counter_key}: {e}")
+        log.error('processing_index_write_failed', counter_key=counter_key, error=str(e))
+
+def write_processing_index(counter_key: str, last_checked: int) -> None:
+    res = supabase.table('processing_indexes').select('counterKey').eq('counterKey', counter_key).execute()
+    if hasattr(res, 'data') and res.data:
+        supabase.table('processing_indexes').update({'lastChecked': last_checked}).eq('counterKey', counter_key).execute()
+        log.info('processing_index_updated', counter_key=counter_key, index=last_checked)
+    else:
+        supabase.table('processing_indexes').insert({
+            'counterKey': counter_key,
+            'lastChecked': last_checked
+        }).execute()
+        log.info('processing_index_created', counter_key=counter_key, index=last_checked)
+
+# Run journal. Processing runs move their cursor every RUN_CHECKPOINT_APPS apps instead
+# of once at the end, and record their progress and open-beta entries that are not yet
+# safely handed off. Table:
+#   run_journal ("runId" text primary key, "counterKey" text, "instanceId" text,
+#     "baseUrl" text, "startedAt" timestamptz, "heartbeatAt" timestamptz, "checked" int8,
+#     "lastApp" text, "pendingNotifications" jsonb)
+# A finished run deletes its row. A row whose heartbeat is older than
+# RUN_JOURNAL_STALE_SECONDS belongs to a run that died. The next notifying run of the
+# same counter key adopts its entries and sends them with its own. In digest mode an
+# entry goes into notification_queue as soon as it is claimed, so the journal only
+# holds entries when notifications are sent directly or the queue write failed.
+RUN_CHECKPOINT_APPS = int(os.getenv('RUN_CHECKPOINT_APPS', '5'))
+RUN_JOURNAL_STALE_SECONDS = int(os.getenv('RUN_JOURNAL_STALE_SECONDS', '300'))
+# heartbeatAt of a run that failed cleanly, so its row is adoptable at once
+RUN_JOURNAL_ABANDONED_AT = '1970-01-01T00:00:00+00:00'
+
+class RunJournal:
+    """Checkpoints one processing run, so a crash costs at most RUN_CHECKPOINT_APPS apps and no notifications."""
+
+    def __init__(self, counter_key: str, base_url: str, commit=None):
+        self.counter_key = counter_key
+        self.base_url = base_url
+        # commit(checked) persists the cursor for `checked` apps done
+        self.commit = commit
+        self.run_id = f"{INSTANCE_ID}-{time.time_ns()}"
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.checked = 0
+        self.since_checkpoint = 0
+        self.last_app: Optional[str] = None
+        self.pending: list = []
+        self.enabled = True
+
+    def adopt(self) -> list:
+        """Take over the unsent entries of dead runs of this counter key; returns them."""
+        if not self.enabled:
+            return []
+        stale = (datetime.now(timezone.utc) - timedelta(seconds=RUN_JOURNAL_STALE_SECONDS)).isoformat()
+        try:
+            # The delete is the claim: of two runs adopting at once only one gets the rows back
+            with profile_span('run_journal.adopt', 'supabase'):
+                rows = supabase.table('run_journal')\
+                    .delete()\
+                    .eq('counterKey', self.counter_key)\
+                    .eq('baseUrl', self.base_url)\
+                    .lt('heartbeatAt', stale)\
+                    .execute().data or []
+        except Exception as e:
+            log.warning('run_journal_unavailable', counter_key=self.counter_key, error=str(e))
+            self.enabled = False
+            return []
+        adopted = [entry for row in rows for entry in (row.get('pendingNotifications') or [])]
+        if rows:
+            log.warning('run_journal_adopted', counter_key=self.counter_key, runs=[row['runId'] for row in rows], checked=[row.get('checked') for row in rows], notifications=len(adopted))
+        if adopted:
+            self.pending.extend(adopted)
+            self._save()
+        return adopted
+
+    def add_notification(self, entry: Dict[str, Any]) -> None:
+        """Make a claimed entry durable before the run goes on."""
+        if NOTIFY_DIGEST_WINDOW_SECONDS > 0:
+            try:
+                queue_notifications([entry], self.base_url)
+                return
+            except Exception as e:
+                log.warning('notification_queue_unavailable', error=str(e))
+        self.pending.append(entry)
+        self._save()
+
+    def app_done(self, app_name: Optional[str], cursor_checked: int) -> None:
+        self.checked += 1
+        self.last_app = app_name
+        self.since_checkpoint += 1
+        if self.since_checkpoint >= RUN_CHECKPOINT_APPS:
+            self.checkpoint(cursor_checked)
+
+    def checkpoint(self, cursor_checked: int) -> None:
+        self.since_checkpoint = 0
+        if self.commit:
+            self.commit(cursor_checked)
+        self._save()
+
+    def dispatch(self, timeout: float = 30) -> Optional[Dict[str, Any]]:
+        """Send this run's held entries (or flush the digest); returns dispatch_notifications' result."""
+        result = dispatch_notifications(self.pending, self.base_url, timeout=timeout)
+        self.dispatched()
+        return result
+
+    def dispatched(self) -> None:
+        """Forget the held entries once they are sent, so a crash before finish() cannot resend them."""
+        if self.pending:
+            self.pending = []
+            self._save()
+
+    def finish(self) -> None:
+        if not self.enabled:
+            return
+        try:
+            supabase.table('run_journal').delete().eq('runId', self.run_id).execute()
+        except Exception as e:
+            log.warning('run_journal_unavailable', counter_key=self.counter_key, error=str(e))
+
+    def abandon(self) -> None:
+        """Leave the row for the next run to adopt straight away (the run failed before finishing)."""
+        self._save(heartbeat=RUN_JOURNAL_ABANDONED_AT)
+
+    def _save(self, heartbeat: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        try:
+            with profile_span('run_journal.save', 'supabase'):
+                supabase.table('run_journal').upsert({
+                    'runId': self.run_id,
+                    'counterKey': self.counter_key,
+                    'instanceId': INSTANCE_ID,
+                    'baseUrl': self.base_url,
+                    'startedAt': self.started_at,
+                    'heartbeatAt': heartbeat or datetime.now(timezone.utc).isoformat(),
+                    'checked': self.checked,
+                    'lastApp': self.last_app,
+                    'pendingNotifications': self.pending
+                }, on_conflict='runId').execute()
+        except Exception as e:
+            # Without the table runs behave as before: the cursor still moves at checkpoints
+            log.warning('run_journal_unavailable', counter_key=self.counter_key, error=str(e))
+            self.enabled = False
 
-def process_apps_from_api(api_url: str, click_threshold: int, counter_key: str, max_apps_to_process: int = 1, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL) -> Dict[str, Any]:
+def process_apps_from_api(api_url: str, click_threshold: int, counter_key: str, max_apps_to_process: int = 1, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL, deadline_ms: Optional[int] = None) -> Dict[str, Any]:
+    """deadline_ms bounds the run as in process_apps_from_supabase."""
+    deadline = RunDeadline(deadline_ms)
+    journal = None
     try:
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
+        with profile_span('load_apps', 'source', url=api_url):
+            response = get_http_session().get(api_url, timeout=10)
+            response.raise_for_status()
+            
+            data = response.json()
         
         response.close()
         del response
@@ -593,7 +3055,8 @@ def process_apps_from_api(api_url: str, click_threshold: int, counter_key: str,
         if not data or 'apps' not in data:
             raise Exception('No app data found to process.')
 
-        apps_data = data['apps']
+        apps_data = AppCatalog.from_rows(data['apps'])
+        del data
         
         # Get current user interactions for accurate click counts
         user_interactions = get_user_interactions()
@@ -604,37 +3067,43 @@ def process_apps_from_api(api_url: str, click_threshold: int, counter_key: str,
         start_index = get_processing_index(counter_key)
         
         total_apps = len(apps_data)
+        journal = RunJournal(counter_key, notification_base_url, commit=lambda done: update_processing_index(counter_key, (start_index + done) % total_apps))
         count = 0
         checked = 0
         apps_below_threshold = 0
-        apps_to_notify = []
+        # Entries a crashed run claimed but never sent go out with this run's
+        apps_to_notify = journal.adopt() if send_notifications else []
+        circuit_open = False
+        governor = MemoryGovernor(counter_key, max_apps_to_process)
 
         max_check_limit = min(max_apps_to_process * 3, total_apps)
-        try:
-            print(f"process_apps_from_api: total_apps={total_apps}, start_index={start_index}, max_check_limit={max_check_limit}, max_apps_to_process={max_apps_to_process}")
-        except Exception:
-            pass
+        log.info('api_run_started', total_apps=total_apps, start_index=start_index, max_check_limit=max_check_limit, max_apps_to_process=max_apps_to_process)
         
-        while count < max_apps_to_process and checked < max_check_limit and checked < total_apps:
+        while count < governor.batch_limit and checked < max_check_limit and checked < total_apps:
             app_index = (start_index + checked) % total_apps
-            app = apps_data[app_index].copy()
+            app = apps_data[app_index].to_dict()
 
             # Update click count from user_interactions instead of using stale API data
             sanitized_app_name = sanitize_string(app.get('name', ''))
             api_click = app.get('clickCount', 0)
             user_click = user_interactions.get(sanitized_app_name, 0)
             app['clickCount'] = user_click
-            try:
-                print(f"Checking app index={app_index} name={app.get('name')} sanitized={sanitized_app_name} api_click={api_click} user_click={user_click}")
-            except Exception:
-                pass
+            log.debug('checking_app', index=app_index, app=app.get('name'), sanitized=sanitized_app_name, api_clicks=api_click, clicks=user_click)
 
             if app['clickCount'] >= click_threshold:
+                if not deadline.can_start_app():
+                    break
+
                 # Enrich app with iTunes data if missing details
                 # app = enrich_app_with_itunes_data(app)
                 
                 # App already has betaAvailable status from API, but let's check it fresh
-                app['betaAvailable'] = fetch_beta_availability(app['link'])
+                beta_status = fetch_beta_availability(app['link'])
+                if beta_status == CIRCUIT_OPEN_STATUS:
+                    # Leave this app for the next run rather than recording a status we never saw
+                    circuit_open = True
+                    break
+                app['betaAvailable'] = beta_status
                 update_result = update_app_status(app)
                 
                 count += 1  # Count all qualifying apps, not just updated ones
@@ -644,63 +3113,38 @@ def process_apps_from_api(api_url: str, click_threshold: int, counter_key: str,
                     if (send_notifications and 
                         update_result['status_changed'] and 
                         update_result['current_status'] == 'open' and
-                        not check_if_notification_sent(
+                        claim_notification(
                             app['name'], 
                             update_result['current_status'], 
                             update_result['previous_status']
                         )):
                         
-                        apps_to_notify.append({
-                            'name': app['name'],
-                            'clickCount': app['clickCount'],
-                            'betaAvailable': app['betaAvailable'],
-                            'previousStatus': update_result['previous_status'],
-                            'categories': app.get('categories', []),
-                            'logo': app.get('logo', ''),
-                            'timestamp': datetime.now(timezone.utc).isoformat()
-                        })
-                        
-                        # Record that we're about to send a notification for this change
-                        record_notification_sent(
-                            app['name'],
-                            update_result['current_status'],
-                            update_result['previous_status']
-                        )
+                        entry = build_notify_entry(app, update_result['previous_status'])
+                        journal.add_notification(entry)
+                        apps_to_notify.append(entry)
                 
-                try:
-                    if update_result.get('updated'):
-                        print(f"Updated {app.get('name')} -> clickCount {user_click}")
-                    else:
-                        print(f"No update for {app.get('name')} (unchanged)")
-                except Exception:
-                    pass
-                import gc
-                gc.collect()
-                time.sleep(1.0)
+                log.debug('app_checked', app=app.get('name'), clicks=user_click, updated=bool(update_result.get('updated')))
+                governor.checkpoint()
+                with profile_span('rate_limit_sleep', 'sleep'):
+                    time.sleep(1.0)
             else:
                 apps_below_threshold += 1
-                try:
-                    print(f"Skipped {app.get('name')} below threshold (clicks={app['clickCount']})")
-                except Exception:
-                    pass
+                log.debug('app_below_threshold', app=app.get('name'), clicks=app['clickCount'])
 
             checked += 1
+            if app['clickCount'] >= click_threshold:
+                # Skips are free to redo, so only fetched apps count towards a checkpoint
+                journal.app_done(app.get('name'), checked)
             del app
 
-        notification_result = None
-        email_notification_result = None
-        if send_notifications and apps_to_notify:
-            notification_result = send_telegram_notification(apps_to_notify, notification_base_url)
-            email_notification_result = send_email_notification(apps_to_notify, notification_base_url)
+        notifications = journal.dispatch(timeout=deadline.request_timeout(30)) if send_notifications else None
 
-        del data
+        del apps_data
         del user_interactions
-        
-        import gc
-        gc.collect()
 
         new_last_checked_index = (start_index + checked) % total_apps
         update_processing_index(counter_key, new_last_checked_index)
+        journal.finish()
 
         result = {
             "message": f"Processed {count} apps for {counter_key}.", 
@@ -710,28 +3154,35 @@ def process_apps_from_api(api_url: str, click_threshold: int, counter_key: str,
                 "below_threshold": apps_below_threshold,
                 "click_threshold": click_threshold,
                 "notifications_sent": len(apps_to_notify) if apps_to_notify else 0
-            }
+            },
+            "memory": governor.report(),
+            "circuit_open": circuit_open,
+            "deadline": deadline.report()
         }
         
-        if notification_result:
-            result["telegram_notification"] = notification_result
+        if notifications and notifications.get('telegram'):
+            result["telegram_notification"] = notifications['telegram']
             
-        if email_notification_result:
-            result["email_notification"] = email_notification_result
+        if notifications and notifications.get('email'):
+            result["email_notification"] = notifications['email']
             
         return result
         
     except Exception as e:
-        import gc
-        gc.collect()
+        if journal:
+            journal.abandon()
         return {"error": str(e)}
 
-def process_apps_from_json(json_url: str, click_threshold: int, counter_key: str, max_apps_to_process: int = 1, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL) -> Dict[str, Any]:
+def process_apps_from_json(json_url: str, click_threshold: int, counter_key: str, max_apps_to_process: int = 1, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL, deadline_ms: Optional[int] = None) -> Dict[str, Any]:
+    """deadline_ms bounds the run as in process_apps_from_supabase."""
+    deadline = RunDeadline(deadline_ms)
+    journal = None
     try:
-        response = requests.get(json_url, timeout=10, stream=True)
-        response.raise_for_status()
-        
-        data = response.json()
+        with profile_span('load_apps', 'source', url=json_url):
+            response = get_http_session().get(json_url, timeout=10, stream=True)
+            response.raise_for_status()
+            
+            data = response.json()
         
         response.close()
         del response
@@ -739,94 +3190,101 @@ def process_apps_from_json(json_url: str, click_threshold: int, counter_key: str
         if not data or 'apps' not in data[0]:
             raise Exception('No app data found to process.')
 
+        apps_data = AppCatalog.from_rows(data[0]['apps'])
+        del data
+
         user_interactions = get_user_interactions()
         
         if not user_interactions:
             return {"error": "No user interactions found - cannot determine click counts"}
         
+        catalog_diff = catalog_tracker.sync(json_url, apps_data, user_interactions)
+        priority = catalog_diff.pop('priority')[:CATALOG_PRIORITY_PER_RUN]
         start_index = get_processing_index(counter_key)
         
-        total_apps = len(data[0]['apps'])
+        total_apps = len(apps_data)
+        journal = RunJournal(counter_key, notification_base_url, commit=lambda done: update_processing_index(counter_key, (start_index + done) % total_apps))
         count = 0
         checked = 0
         apps_below_threshold = 0
-        apps_to_notify = []
+        # Entries a crashed run claimed but never sent go out with this run's
+        apps_to_notify = journal.adopt() if send_notifications else []
+        circuit_open = False
+        governor = MemoryGovernor(counter_key, max_apps_to_process)
 
         max_check_limit = min(max_apps_to_process * 3, total_apps)
+        queued = set(priority)
         
-        while count < max_apps_to_process and checked < max_check_limit and checked < total_apps:
-            app_index = (start_index + checked) % total_apps
-            app = data[0]['apps'][app_index].copy()
+        while count < governor.batch_limit and checked < max_check_limit and checked < total_apps:
+            # New and changed apps go first and do not move the rotation cursor;
+            # the rotation steps over apps the queue just checked
+            from_queue = bool(priority)
+            app_index = priority.pop(0) if from_queue else (start_index + checked) % total_apps
+            if not from_queue and app_index in queued:
+                checked += 1
+                continue
+            app = apps_data[app_index].to_dict()
             sanitized_app_name = sanitize_string(app['name'])
             app['clickCount'] = user_interactions.get(sanitized_app_name, 0)
 
-            if app['clickCount'] >= click_threshold:
+            if from_queue or app['clickCount'] >= click_threshold:
+                if not deadline.can_start_app():
+                    break
+
                 # Enrich app with iTunes data if missing details
                 # app = enrich_app_with_itunes_data(app)
                 
-                app['betaAvailable'] = fetch_beta_availability(app['link'])
+                beta_status = fetch_beta_availability(app['link'])
+                if beta_status == CIRCUIT_OPEN_STATUS:
+                    # Leave this app for the next run rather than recording a status we never saw
+                    circuit_open = True
+                    break
+                app['betaAvailable'] = beta_status
                 update_result = update_app_status(app)
+                catalog_tracker.checked(json_url, sanitized_app_name)
                 
                 count += 1  # Count all qualifying apps, not just updated ones
                 
                 # Log only errors
                 if 'error' in update_result:
-                    try:
-                        print(f"Failed to update {app['name']}: {update_result.get('error')}")
-                    except UnicodeEncodeError:
-                        print(f"Failed to update [App with special characters]: {update_result.get('error')}")
+                    log.error('app_update_failed', app=app['name'], error=update_result.get('error'))
                 
                 if update_result['updated']:
                     # Only send notification if status changed to open AND we haven't already notified about this change
                     if (send_notifications and 
                         update_result['status_changed'] and 
                         update_result['current_status'] == 'open' and
-                        not check_if_notification_sent(
+                        claim_notification(
                             app['name'], 
                             update_result['current_status'], 
                             update_result['previous_status']
                         )):
                         
-                        apps_to_notify.append({
-                            'name': app['name'],
-                            'clickCount': app['clickCount'],
-                            'betaAvailable': app['betaAvailable'],
-                            'previousStatus': update_result['previous_status'],
-                            'categories': app.get('categories', []),
-                            'logo': app.get('logo', ''),
-                            'timestamp': datetime.now(timezone.utc).isoformat()
-                        })
-                        
-                        # Record that we're about to send a notification for this change
-                        record_notification_sent(
-                            app['name'],
-                            update_result['current_status'],
-                            update_result['previous_status']
-                        )
+                        entry = build_notify_entry(app, update_result['previous_status'])
+                        journal.add_notification(entry)
+                        apps_to_notify.append(entry)
                 
-                import gc
-                gc.collect()
-                time.sleep(1.0)
+                governor.checkpoint()
+                with profile_span('rate_limit_sleep', 'sleep'):
+                    time.sleep(1.0)
             else:
                 apps_below_threshold += 1
 
-            checked += 1
+            if not from_queue:
+                checked += 1
+            if from_queue or app['clickCount'] >= click_threshold:
+                # Skips are free to redo, so only fetched apps count towards a checkpoint
+                journal.app_done(app.get('name'), checked)
             del app
 
-        notification_result = None
-        email_notification_result = None
-        if send_notifications and apps_to_notify:
-            notification_result = send_telegram_notification(apps_to_notify, notification_base_url)
-            email_notification_result = send_email_notification(apps_to_notify, notification_base_url)
+        notifications = journal.dispatch(timeout=deadline.request_timeout(30)) if send_notifications else None
 
-        del data
+        del apps_data
         del user_interactions
-        
-        import gc
-        gc.collect()
 
         new_last_checked_index = (start_index + checked) % total_apps
         update_processing_index(counter_key, new_last_checked_index)
+        journal.finish()
 
         result = {
             "message": f"Processed {count} qualifying apps for {counter_key}.", 
@@ -836,57 +3294,223 @@ def process_apps_from_json(json_url: str, click_threshold: int, counter_key: str
                 "below_threshold": apps_below_threshold,
                 "click_threshold": click_threshold,
                 "notifications_sent": len(apps_to_notify) if apps_to_notify else 0
-            }
+            },
+            "catalog_diff": catalog_diff,
+            "memory": governor.report(),
+            "circuit_open": circuit_open,
+            "deadline": deadline.report()
         }
         
-        if notification_result:
-            result["telegram_notification"] = notification_result
+        if notifications and notifications.get('telegram'):
+            result["telegram_notification"] = notifications['telegram']
             
-        if email_notification_result:
-            result["email_notification"] = email_notification_result
+        if notifications and notifications.get('email'):
+            result["email_notification"] = notifications['email']
             
         return result
         
     except Exception as e:
-        import gc
-        gc.collect()
+        if journal:
+            journal.abandon()
         return {"error": str(e)}
 
+MARKDOWN_APP_PATTERN = re.compile(r"\*\*(.*?)\*\*:.*?\[!\[App Logo\]\((.*?)\)\]\((.*?)\)")
+
+def iter_markdown_apps(markdown_content: str):
+    for match in MARKDOWN_APP_PATTERN.finditer(markdown_content):
+        yield {"name": match.group(1), "logo": match.group(2), "link": match.group(3)}
+
 def parse_markdown(markdown_content: str) -> list:
-    app_pattern = r"\*\*(.*?)\*\*:.*?\[!\[App Logo\]\((.*?)\)\]\((.*?)\)"
-    matches = re.findall(app_pattern, markdown_content)
-    return [{"name": match[0], "logo": match[1], "link": match[2]} for match in matches]
+    return list(iter_markdown_apps(markdown_content))
+
+# Successive fetches of a markdown or JSON catalog are diffed, so new apps do not wait
+# behind the round-robin cursor. Apps that appeared are created with one bulk insert.
+# They are checked ahead of the rotation whatever their click count, and so are apps
+# whose link or logo changed. Apps that left the catalog are retired: "retiredAt" is set
+# and the Supabase rotation skips them until they reappear. Needs a nullable
+# "retiredAt" timestamptz column on apps. The first fetch in a process has nothing to
+# diff against, so it only treats apps missing from the apps table as added.
+CATALOG_PRIORITY_PER_RUN = int(os.getenv('CATALOG_PRIORITY_PER_RUN', '10'))
+CATALOG_WRITE_BATCH = 200
+# An app is retired only after this many fetches in a row without it, and a fetch that
+# lost more than this fraction of the previous catalog (truncated file, bad deploy)
+# does not count towards retirement at all
+CATALOG_RETIRE_AFTER_FETCHES = int(os.getenv('CATALOG_RETIRE_AFTER_FETCHES', '3'))
+CATALOG_RETIRE_MAX_FRACTION = float(os.getenv('CATALOG_RETIRE_MAX_FRACTION', '0.2'))
+
+class CatalogTracker:
+    """Last fetched fingerprint of every app per catalog source, plus apps waiting to be checked first."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fingerprints: Dict[str, Dict[str, int]] = {}
+        # source -> app -> consecutive fetches it was missing from; kept in fingerprints until retired
+        self.missing: Dict[str, Dict[str, int]] = {}
+        self.pending: Dict[str, 'OrderedDict[str, bool]'] = {}
+        self.totals = {'added': 0, 'changed': 0, 'removed': 0, 'inserted': 0}
+
+    def sync(self, source: str, catalog: AppCatalog, user_interactions: InteractionCounts) -> Dict[str, Any]:
+        """Diff catalog against the previous fetch of source and apply the difference.
+
+        The result's 'priority' lists catalog positions to check before the rotation.
+        """
+        current: Dict[str, int] = {}
+        positions: Dict[str, int] = {}
+        for index, row in enumerate(catalog):
+            name = sanitize_string(row['name'])
+            current[name] = stable_hash(f"{row.get('link') or ''}\x1f{row.get('logo') or ''}")
+            positions[name] = index
+
+        with self.lock:
+            previous = self.fingerprints.get(source)
+            missing = self.missing.setdefault(source, {})
+            gone = [name for name in previous if name not in current] if previous is not None else []
+            dropped: list = []
+            if len(gone) > CATALOG_RETIRE_MAX_FRACTION * len(previous or ()):
+                log.warning('catalog_shrink_ignored', source=source, previous=len(previous), missing=len(gone))
+            else:
+                for name in gone:
+                    missing[name] = missing.get(name, 0) + 1
+                    if missing[name] >= CATALOG_RETIRE_AFTER_FETCHES:
+                        dropped.append(name)
+            for name in list(missing):
+                if name in current or name in dropped:
+                    del missing[name]
+            # Apps not dropped yet stay in the fingerprint, so a later fetch still sees them go
+            stored = dict(current)
+            stored.update((name, previous[name]) for name in gone if name not in dropped)
+            self.fingerprints[source] = stored
+            # Only an app no source lists any more is retired, so a source that lists it
+            # un-retiring it can never undo another source's retirement
+            removed = [
+                name for name in dropped
+                if not any(name in prints for other, prints in self.fingerprints.items() if other != source)
+            ]
+
+        app_snapshot.ensure_fresh()
+        with app_snapshot.lock:
+            known = {name: bool(row.get('retiredAt')) for name, row in app_snapshot.rows.items()}
+        if previous is None:
+            added = [name for name in current if name not in known]
+            changed: list = []
+        else:
+            added = [name for name in current if name not in previous]
+            changed = [name for name, fingerprint in current.items() if name in previous and previous[name] != fingerprint]
+
+        new_rows = [
+            build_new_app(dict(catalog[positions[name]].to_dict(), clickCount=user_interactions.get(name, 0)), name)
+            for name in added if name not in known
+        ]
+        inserted = self._insert(new_rows)
+        self._set_retired(removed, datetime.now(timezone.utc).isoformat())
+        self._set_retired([name for name in current if known.get(name)], None)
 
-def process_apps(file_url: str, click_threshold: int, counter_key: str, max_apps_to_check: int = 20, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL) -> Dict[str, Any]:
+        with self.lock:
+            queue = self.pending.setdefault(source, OrderedDict())
+            for name in added + changed:
+                queue[name] = True
+            for name in dropped:
+                queue.pop(name, None)
+            priority = [positions[name] for name in queue if name in positions]
+            self.totals['added'] += len(added)
+            self.totals['changed'] += len(changed)
+            self.totals['removed'] += len(removed)
+            self.totals['inserted'] += inserted
+
+        if added or changed or removed:
+            log.info('catalog_diff', source=source, added=len(added), changed=len(changed), removed=len(removed), inserted=inserted)
+        return {'added': len(added), 'changed': len(changed), 'removed': len(removed), 'inserted': inserted, 'priority': priority}
+
+    def checked(self, source: str, sanitized_name: str) -> None:
+        """Drop an app from the front of the queue once it has a status."""
+        with self.lock:
+            queue = self.pending.get(source)
+            if queue is not None:
+                queue.pop(sanitized_name, None)
+
+    def _insert(self, rows: list) -> int:
+        inserted = 0
+        for i in range(0, len(rows), CATALOG_WRITE_BATCH):
+            try:
+                with profile_span('apps.bulk_insert', 'supabase', rows=len(rows[i:i + CATALOG_WRITE_BATCH])):
+                    result = supabase.table('apps').insert(rows[i:i + CATALOG_WRITE_BATCH]).execute()
+                app_snapshot.apply_rows(result.data)
+                inserted += len(result.data or [])
+            except Exception as e:
+                # update_app_status still creates these one at a time when they are checked
+                log.error('catalog_insert_failed', rows=len(rows[i:i + CATALOG_WRITE_BATCH]), error=str(e))
+        return inserted
+
+    def _set_retired(self, names: list, retired_at: Optional[str]) -> None:
+        for i in range(0, len(names), CATALOG_WRITE_BATCH):
+            try:
+                with profile_span('apps.retire', 'supabase', rows=len(names[i:i + CATALOG_WRITE_BATCH])):
+                    result = supabase.table('apps').update({'retiredAt': retired_at}).in_('sanitizedName', names[i:i + CATALOG_WRITE_BATCH]).execute()
+                app_snapshot.apply_rows(result.data)
+            except Exception as e:
+                log.error('catalog_retire_failed', rows=len(names[i:i + CATALOG_WRITE_BATCH]), retiring=retired_at is not None, error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.totals, sources=len(self.fingerprints), pending=sum(len(queue) for queue in self.pending.values()), missing=sum(len(names) for names in self.missing.values()))
+
+catalog_tracker = CatalogTracker()
+
+def process_apps(file_url: str, click_threshold: int, counter_key: str, max_apps_to_check: int = 20, send_notifications: bool = False, notification_base_url: str = DEFAULT_NOTIFICATION_URL, deadline_ms: Optional[int] = None) -> Dict[str, Any]:
+    """deadline_ms bounds the run as in process_apps_from_supabase."""
+    deadline = RunDeadline(deadline_ms)
+    journal = None
     try:
-        response = requests.get(file_url, timeout=30)
+        with profile_span('load_apps', 'source', url=file_url):
+            response = get_http_session().get(file_url, timeout=30)
         if not response.text:
             raise Exception('Failed to fetch Markdown content from GitHub')
 
-        markdown_content = response.text
-        data = parse_markdown(markdown_content)
+        data = AppCatalog.from_rows(iter_markdown_apps(response.text))
 
         if not data:
             raise Exception('No app data found to process.')
 
         user_interactions = get_user_interactions()
+        catalog_diff = catalog_tracker.sync(file_url, data, user_interactions)
+        priority = catalog_diff.pop('priority')[:CATALOG_PRIORITY_PER_RUN]
         last_checked = get_processing_index(counter_key)
         start_index = last_checked
+        journal = RunJournal(counter_key, notification_base_url, commit=lambda done: update_processing_index(counter_key, (start_index + done) % len(data)))
         count = 0
-        apps_to_notify = []
+        checked = 0
+        # Entries a crashed run claimed but never sent go out with this run's
+        apps_to_notify = journal.adopt() if send_notifications else []
+        circuit_open = False
 
-        for i in range(start_index, start_index + max_apps_to_check):
-            app_index = i % len(data)
-            app = data[app_index]
+        # New and changed apps go first, count towards max_apps_to_check and do not
+        # move the rotation cursor; the rotation steps over apps the queue just checked
+        queued = set(priority)
+        rotation = [i % len(data) for i in range(start_index, start_index + min(len(data), max(0, max_apps_to_check - len(priority))))]
+        for position, app_index in enumerate(priority + rotation):
+            from_queue = position < len(priority)
+            if not from_queue and app_index in queued:
+                checked += 1
+                continue
+            app = data[app_index].to_dict()
             sanitized_app_name = sanitize_string(app['name'])
             app['clickCount'] = user_interactions.get(sanitized_app_name, 0)
 
-            if app['clickCount'] >= click_threshold:
+            if from_queue or app['clickCount'] >= click_threshold:
+                if not deadline.can_start_app():
+                    break
+
                 # Enrich app with iTunes data if missing details
                 # app = enrich_app_with_itunes_data(app)
                 
-                app['betaAvailable'] = fetch_beta_availability(app['link'])
+                beta_status = fetch_beta_availability(app['link'])
+                if beta_status == CIRCUIT_OPEN_STATUS:
+                    # Leave this app for the next run rather than recording a status we never saw
+                    circuit_open = True
+                    break
+                app['betaAvailable'] = beta_status
                 update_result = update_app_status(app)
+                catalog_tracker.checked(file_url, sanitized_app_name)
                 
                 if update_result['updated']:
                     count += 1
@@ -895,58 +3519,60 @@ def process_apps(file_url: str, click_threshold: int, counter_key: str, max_apps
                     if (send_notifications and 
                         update_result['status_changed'] and 
                         update_result['current_status'] == 'open' and
-                        not check_if_notification_sent(
+                        claim_notification(
                             app['name'], 
                             update_result['current_status'], 
                             update_result['previous_status']
                         )):
                         
-                        apps_to_notify.append({
-                            'name': app['name'],
-                            'clickCount': app['clickCount'],
-                            'betaAvailable': app['betaAvailable'],
-                            'previousStatus': update_result['previous_status'],
-                            'categories': app.get('categories', []),
-                            'logo': app.get('logo', ''),
-                            'timestamp': datetime.now(timezone.utc).isoformat()
-                        })
-                        
-                        # Record that we're about to send a notification for this change
-                        record_notification_sent(
-                            app['name'],
-                            update_result['current_status'],
-                            update_result['previous_status']
-                        )
+                        entry = build_notify_entry(app, update_result['previous_status'])
+                        journal.add_notification(entry)
+                        apps_to_notify.append(entry)
+
+            if not from_queue:
+                checked += 1
+            if from_queue or app['clickCount'] >= click_threshold:
+                # Skips are free to redo, so only fetched apps count towards a checkpoint
+                journal.app_done(app.get('name'), checked)
 
-        notification_result = None
-        email_notification_result = None
-        if send_notifications and apps_to_notify:
-            # Send both Telegram and Email notifications
-            notification_result = send_telegram_notification(apps_to_notify, notification_base_url)
-            email_notification_result = send_email_notification(apps_to_notify, notification_base_url)
+        # Telegram and email go out together whenever the digest is due
+        notifications = journal.dispatch(timeout=deadline.request_timeout(30)) if send_notifications else None
 
-        new_last_checked_index = (start_index + max_apps_to_check) % len(data)
+        new_last_checked_index = (start_index + checked) % len(data)
         update_processing_index(counter_key, new_last_checked_index)
+        journal.finish()
 
         result = {
             "message": f"App statuses updated successfully for {counter_key}.",
             "details": {
                 "processed": count,
                 "notifications_sent": len(apps_to_notify) if apps_to_notify else 0
-            }
+            },
+            "catalog_diff": catalog_diff,
+            "circuit_open": circuit_open,
+            "deadline": deadline.report()
         }
         
-        if notification_result:
-            result["telegram_notification"] = notification_result
+        if notifications and notifications.get('telegram'):
+            result["telegram_notification"] = notifications['telegram']
             
-        if email_notification_result:
-            result["email_notification"] = email_notification_result
+        if notifications and notifications.get('email'):
+            result["email_notification"] = notifications['email']
             
         return result
         
     except Exception as e:
+        if journal:
+            journal.abandon()
         return {"error": str(e)}
 
+def get_deadline_ms_arg() -> Optional[int]:
+    """Optional ?deadline_ms= budget for a check run"""
+    try:
+        return int(request.args['deadline_ms']) if 'deadline_ms' in request.args else None
+    except (ValueError, TypeError):
+        return None
+
 @app.route('/check_supabase_api', methods=['GET'])
 def check_supabase_api():
     notification_url = request.args.get('notification_url', DEFAULT_NOTIFICATION_URL)
@@ -961,12 +3587,14 @@ def check_supabase_api():
     except (ValueError, TypeError):
         max_apps_to_process = 3
     
-    result = process_apps_from_supabase(
+    result = run_profiled(
+        process_apps_from_supabase,
         click_threshold=click_threshold, 
         counter_key='supabase_api_check', 
         max_apps_to_process=max_apps_to_process,
         send_notifications=True,
-        notification_base_url=notification_url
+        notification_base_url=notification_url,
+        deadline_ms=get_deadline_ms_arg()
     )
     return jsonify(result)
 
@@ -984,12 +3612,14 @@ def check_apps():
     except (ValueError, TypeError):
         max_apps_to_process = 5
     
-    result = process_apps_from_supabase(
+    result = run_profiled(
+        process_apps_from_supabase,
         click_threshold=click_threshold, 
         counter_key='supabase_check_apps', 
         max_apps_to_process=max_apps_to_process,
         send_notifications=True,
-        notification_base_url=notification_url
+        notification_base_url=notification_url,
+        deadline_ms=get_deadline_ms_arg()
     )
     return jsonify(result)
 
@@ -1007,12 +3637,14 @@ def check_apps_with_notifications():
     except (ValueError, TypeError):
         max_apps_to_process = 10
     
-    result = process_apps_from_supabase(
+    result = run_profiled(
+        process_apps_from_supabase,
         click_threshold=click_threshold, 
         counter_key='supabase_notifications_check', 
         max_apps_to_process=max_apps_to_process,
         send_notifications=True,
-        notification_base_url=notification_url
+        notification_base_url=notification_url,
+        deadline_ms=get_deadline_ms_arg()
     )
     return jsonify(result)
 
@@ -1025,12 +3657,14 @@ def daily_stat():
     except (ValueError, TypeError):
         click_threshold = 5
     
-    result = process_apps_from_supabase(
+    result = run_profiled(
+        process_apps_from_supabase,
         click_threshold=click_threshold, 
         counter_key='supabase_daily_stat',
         max_apps_to_process=3,
         send_notifications=True,
-        notification_base_url=notification_url
+        notification_base_url=notification_url,
+        deadline_ms=get_deadline_ms_arg()
     )
     return jsonify(result)
 
@@ -1049,33 +3683,323 @@ def check_high_clicks():
     except (ValueError, TypeError):
         max_apps_to_process = 5
     
-    result = process_apps_from_supabase(
+    result = run_profiled(
+        process_apps_from_supabase,
         click_threshold=click_threshold, 
         counter_key='supabase_high_click_check', 
         max_apps_to_process=max_apps_to_process,
         send_notifications=True,
-        notification_base_url=notification_url
+        notification_base_url=notification_url,
+        deadline_ms=get_deadline_ms_arg()
     )
     return jsonify(result)
 
 @app.route('/health', methods=['GET'])
 def health():
-    import gc
-    gc.collect()
     return jsonify({
         "status": "healthy", 
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "rss_mb": round(get_rss_mb(), 1),
+        "memory_budget_mb": MEMORY_BUDGET_MB,
+        "circuits": circuit_breaker_states(),
+        "catalog_index": threshold_index.stats(),
+        "single_flight": single_flight_stats(),
+        "hedging": hedge_policy.snapshot(),
+        "catalog_diff": catalog_tracker.stats(),
+        "write_behind": write_behind.stats() if write_behind else None,
+        "logging": log.stats()
     })
 
 @app.route('/keep_alive', methods=['GET'])
 def keep_alive():
-    import gc
-    gc.collect()
     return jsonify({
         "status": "alive",
         "timestamp": datetime.now(timezone.utc).isoformat()
     })
 
+@app.route('/startup_profile', methods=['GET'])
+def startup_profile():
+    """Report import and lazy client construction timings for the current process"""
+    return jsonify({
+        **_startup_profile,
+        'loaded_modules': {
+            name: name in sys.modules for name in ('supabase', 'postgrest', 'gotrue', 'realtime', 'storage3', 'supafunc', 'httpx', 'requests')
+        }
+    })
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Sample every thread's stack for ?seconds=N and return collapsed stacks (or JSON with ?format=json)"""
+    if not DEBUG_PROFILE_TOKEN:
+        return jsonify({"error": "Profiling is disabled; set DEBUG_PROFILE_TOKEN"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Debug-Token', '').encode('utf-8'), DEBUG_PROFILE_TOKEN.encode('utf-8')):
+        return jsonify({"error": "Invalid debug token"}), 403
+    
+    try:
+        seconds = min(max(float(request.args.get('seconds', '5')), 0.1), DEBUG_PROFILE_MAX_SECONDS)
+    except (ValueError, TypeError):
+        seconds = 5.0
+    try:
+        hz = min(max(float(request.args.get('hz', DEBUG_PROFILE_DEFAULT_HZ)), 1.0), DEBUG_PROFILE_MAX_HZ)
+    except (ValueError, TypeError):
+        hz = DEBUG_PROFILE_DEFAULT_HZ
+    
+    if not _sampling_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already running"}), 409
+    try:
+        sampler = StackSampler(hz, with_lines=request.args.get('lines', '').lower() in ('1', 'true', 'yes'))
+        sampler.run(seconds)
+    finally:
+        _sampling_lock.release()
+    
+    if request.args.get('format', 'collapsed').lower() == 'json':
+        return jsonify({
+            **sampler.summary(),
+            'hz': hz,
+            'top_functions': sampler.top_functions(),
+            'collapsed': sampler.collapsed()
+        })
+    summary = sampler.summary()
+    return Response(sampler.collapsed(), mimetype='text/plain', headers={
+        'X-Profile-Samples': str(summary['samples']),
+        'X-Profile-Overhead': str(summary['overhead'])
+    })
+
+@app.route('/events', methods=['GET'])
+def events():
+    """Server-sent events stream of app status changes, with replay via Last-Event-ID"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if not status_events.subscribe(SSE_MAX_SUBSCRIBERS):
+        return jsonify({"error": "Too many event subscribers; retry later"}), 503, {'Retry-After': '30'}
+
+    def stream():
+        cursor = last_event_id or status_events.latest_id()
+        ends_at = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        yield f"retry: 3000\n: connected at {cursor}\n\n"
+        while time.monotonic() < ends_at:
+            pending, missed = status_events.wait_for_events(cursor, min(SSE_KEEPALIVE_SECONDS, max(0.0, ends_at - time.monotonic())))
+            if missed:
+                yield format_resync(missed)
+            if not pending:
+                yield ": keep-alive\n\n"
+                continue
+            for event in pending:
+                yield format_sse(event)
+                cursor = event['id']
+
+    response = Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(status_events.unsubscribe)
+    return response
+
+@app.route('/apps', methods=['GET'])
+def list_apps():
+    """Current app statuses from the in-memory snapshot; filters: status, min_clicks, category, limit"""
+    try:
+        app_snapshot.ensure_fresh()
+    except Exception as e:
+        if not app_snapshot.loaded_at:
+            return jsonify({"error": str(e)}), 503
+        # Serve the last good snapshot through a database blip
+        log.error('apps_snapshot_refresh_failed', error=str(e))
+
+    status = {value.strip() for value in request.args.get('status', '').split(',') if value.strip()} or None
+    try:
+        min_clicks = int(request.args.get('min_clicks', '0'))
+    except (ValueError, TypeError):
+        min_clicks = 0
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except (ValueError, TypeError):
+        limit = None
+    category = request.args.get('category', '').strip().lower() or None
+
+    body, gzip_body, digest = app_snapshot.render(status, min_clicks, category, limit)
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+    # Strong validators must differ per content-coding
+    etag = f'{digest}-gzip' if use_gzip else digest
+
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+        return Response(gzip_body, mimetype='application/json', headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
+
+# Limits for POST /check_batch
+CHECK_BATCH_MAX_ITEMS = int(os.getenv('CHECK_BATCH_MAX_ITEMS', '500'))
+CHECK_BATCH_CONCURRENCY = int(os.getenv('CHECK_BATCH_CONCURRENCY', '8'))
+
+def resolve_batch_items(items: list) -> list:
+    """Pair each requested link or app name with its catalog row, if there is one.
+
+    Every input keeps its position as 'index'; a later input naming a link already
+    requested gets 'duplicate_of' (the earlier index) and is not checked again.
+    """
+    app_snapshot.ensure_fresh()
+    with app_snapshot.lock:
+        by_link = {row.get('link'): row for row in app_snapshot.rows.values() if row.get('link')}
+        by_name = app_snapshot.rows
+        resolved = []
+        seen: Dict[str, int] = {}
+        for index, item in enumerate(items):
+            value = str(item).strip()
+            if value.startswith(('http://', 'https://')):
+                row = by_link.get(value)
+                link = value
+            else:
+                row = by_name.get(sanitize_string(value))
+                link = row.get('link') if row else None
+            if link and link in seen:
+                resolved.append({'input': value, 'index': index, 'link': link, 'duplicate_of': seen[link]})
+                continue
+            if link:
+                seen[link] = index
+            resolved.append({'input': value, 'index': index, 'link': link, 'row': dict(row) if row else None})
+    return resolved
+
+def check_batch_item(item: Dict[str, Any], persist: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    row = item['row']
+    outcome = {'input': item['input'], 'index': item['index'], 'link': item['link'], 'name': row.get('name') if row else None}
+    if not item['link']:
+        outcome['error'] = 'Unknown app name'
+        return outcome
+    status = fetch_beta_availability(item['link'])
+    outcome['status'] = status
+    outcome['previous_status'] = row.get('betaAvailable') if row else None
+    if persist:
+        if not row:
+            outcome['persisted'] = False
+            outcome['error'] = 'Link is not in the catalog; not persisted'
+        elif status == CIRCUIT_OPEN_STATUS:
+            outcome['persisted'] = False
+        else:
+            row['betaAvailable'] = status
+            update_result = update_app_status(row)
+            outcome['persisted'] = update_result.get('updated', False)
+            outcome['status_changed'] = update_result.get('status_changed', False)
+    outcome['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return outcome
+
+@app.route('/check_batch', methods=['POST'])
+def check_batch():
+    """Check a list of TestFlight links or app names now; streams one NDJSON line per result
+
+    Body: {"items": [...], "persist": false, "concurrency": 8}. Results arrive in
+    completion order, one per item with its "index"; a repeat of an earlier link
+    is not checked again and its line says "duplicate_of" that item's index. A
+    summary line with "done": true comes last.
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Body must be a JSON object with a non-empty 'items' list"}), 400
+    if len(items) > CHECK_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {CHECK_BATCH_MAX_ITEMS} items per batch"}), 400
+    persist = bool(payload.get('persist', False))
+    try:
+        concurrency = max(1, min(int(payload.get('concurrency', CHECK_BATCH_CONCURRENCY)), CHECK_BATCH_CONCURRENCY))
+    except (ValueError, TypeError):
+        concurrency = CHECK_BATCH_CONCURRENCY
+    try:
+        resolved = resolve_batch_items(items)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 503
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def stream():
+        started = time.perf_counter()
+        counts: Dict[str, int] = {}
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='check_batch')
+        try:
+            futures = [executor.submit(check_batch_item, item, persist) for item in resolved if 'duplicate_of' not in item]
+            for item in resolved:
+                if 'duplicate_of' in item:
+                    counts['duplicate'] = counts.get('duplicate', 0) + 1
+                    yield json.dumps({'input': item['input'], 'index': item['index'], 'link': item['link'], 'duplicate_of': item['duplicate_of']}) + "\n"
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = {'error': str(e)}
+                key = outcome.get('status') or ('unresolved' if 'input' in outcome else 'error')
+                counts[key] = counts.get(key, 0) + 1
+                yield json.dumps(outcome) + "\n"
+            yield json.dumps({
+                'done': True,
+                'checked': len(futures),
+                'statuses': counts,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+            }) + "\n"
+        finally:
+            # A client that hangs up early should not keep the pool checking links
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream(), mimetype='application/x-ndjson', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/notifications/flush', methods=['POST'])
+def flush_notifications():
+    """Send the queued notification digest now instead of waiting for its window"""
+    notification_url = request.args.get('notification_url', DEFAULT_NOTIFICATION_URL)
+    try:
+        return jsonify(flush_notification_digest(notification_url, force=True) or {"queued": 0, "sent": False})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/analytics/history', methods=['GET'])
+def history_stats():
+    """Status history analytics; ?app=<name> for one app, otherwise fleet-wide (sort, limit)"""
+    started = time.perf_counter()
+    try:
+        history_analytics.ensure_loaded()
+    except Exception as e:
+        if not history_analytics.loaded_at:
+            return jsonify({"error": str(e)}), 503
+        log.error('history_stats_reload_failed', error=str(e))
+
+    name = request.args.get('app', '').strip()
+    if name:
+        stats = history_analytics.app_stats(name)
+        if not stats:
+            return jsonify({"error": f"No history stats for {name}"}), 404
+        result = {"app": stats}
+    else:
+        sort = request.args.get('sort', 'transitions')
+        if sort not in HISTORY_STATS_SORTS:
+            return jsonify({"error": f"sort must be one of {', '.join(HISTORY_STATS_SORTS)}"}), 400
+        try:
+            limit = max(1, min(int(request.args.get('limit', '10')), 500))
+        except (ValueError, TypeError):
+            limit = 10
+        result = history_analytics.fleet_stats(sort, limit)
+    result['query_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(result)
+
+@app.route('/analytics/history/backfill', methods=['POST'])
+def backfill_history_stats():
+    """Seed aggregates for apps that have none from the app_history rows still kept"""
+    try:
+        return jsonify(history_analytics.backfill())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/shards', methods=['GET'])
+def shards():
+    """Show which catalog shards this instance holds"""
+    try:
+        if SHARDING_ENABLED:
+            shard_coordinator.refresh(force=request.args.get('refresh') == '1')
+        return jsonify(shard_coordinator.status())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/enrich_apps', methods=['GET'])
 def enrich_apps():
     """Manually enrich apps with iTunes data for apps missing details"""
@@ -1116,10 +4040,7 @@ def enrich_apps():
             )
             
             if needs_enrichment:
-                try:
-                    print(f"Enriching app: {app['name']}")
-                except UnicodeEncodeError:
-                    print("Enriching app: [App with special characters]")
+                log.debug('enriching_app', app=app['name'])
                 
                 # Create app data structure for enrichment
                 app_data = {
@@ -1148,10 +4069,7 @@ def enrich_apps():
                     update_result = update_app_status(enriched_app_data)
                     if update_result['updated']:
                         enriched_count += 1
-                        try:
-                            print(f"Successfully enriched and saved: {app['name']}")
-                        except UnicodeEncodeError:
-                            print("Successfully enriched and saved: [App with special characters]")
+                        log.debug('app_enriched', app=app['name'], saved=True)
                 
                 time.sleep(0.5)  # Rate limit iTunes API calls
         
@@ -1167,45 +4085,134 @@ def enrich_apps():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/sync_all_click_counts', methods=['GET'])
-def sync_all_click_counts():
-    """Sync ALL click counts from user_interactions to apps table"""
-    try:
-        print("Starting full click count synchronization...")
-        
-        # Get all user interactions
-        user_interactions = get_user_interactions()
-        if not user_interactions:
-            return jsonify({"error": "No user interactions found"}), 500
-        
-        # Get all apps that need updating
-        result = supabase.table('apps')\
-            .select('id, name, sanitizedName, clickCount')\
-            .execute()
-        
-        if not result.data:
-            return jsonify({"error": "No apps found"}), 500
-        
-        apps_to_update = []
-        for app in result.data:
-            sanitized_name = app['sanitizedName']
-            current_clicks = app.get('clickCount', 0)
-            new_clicks = user_interactions.get(sanitized_name, 0)
-            
+# Click-count reconciliation by hashed buckets, so a sync moves data in proportion to
+# the drift instead of the catalog. Apps are bucketed by the leading hex digits of
+# md5("sanitizedName"). For each bucket the server returns two digests over the bucket's
+# (sanitizedName, clickCount) pairs: one with apps."clickCount" and one with the
+# user_interactions count. Matching digests mean the bucket is in sync. Buckets that
+# differ are split one hex digit deeper, down to CLICK_SYNC_MAX_DEPTH or until a bucket
+# is small enough, and only those buckets' rows are pulled and diffed. Functions:
+#   click_count_buckets(p_depth int, p_prefixes text[])
+#     returns table (bucket text, "rows" int8, "appsDigest" text, "interactionsDigest" text)
+#     select left(md5(a."sanitizedName"), p_depth), count(*),
+#       md5(string_agg(a."sanitizedName" || ':' || coalesce(a."clickCount", 0), ',' order by a."sanitizedName")),
+#       md5(string_agg(a."sanitizedName" || ':' || coalesce(u."clickCount", 0), ',' order by a."sanitizedName"))
+#     from apps a left join user_interactions u on u."sanitizedName" = a."sanitizedName"
+#     where p_prefixes is null or left(md5(a."sanitizedName"), p_depth - 1) = any(p_prefixes)
+#     group by 1
+#   click_count_bucket_rows(p_depth int, p_prefixes text[])
+#     returns table (id int8, name text, "sanitizedName" text, "clickCount" int8, "interactionClicks" int8)
+#     the same join with coalesce(u."clickCount", 0) as "interactionClicks",
+#     where left(md5(a."sanitizedName"), p_depth) = any(p_prefixes)
+# CLICK_SYNC_MODE=full (or a missing function) falls back to diffing both tables in full.
+CLICK_SYNC_MODE = os.getenv('CLICK_SYNC_MODE', 'buckets').lower()
+CLICK_SYNC_MAX_DEPTH = int(os.getenv('CLICK_SYNC_MAX_DEPTH', '4'))
+CLICK_SYNC_LEAF_ROWS = int(os.getenv('CLICK_SYNC_LEAF_ROWS', '256'))
+
+def find_click_drift_by_buckets() -> tuple:
+    """Apps whose clickCount differs from user_interactions, found by descending mismatched buckets.
+
+    Returns (apps_to_update, stats). Raises if the bucket functions are not installed.
+    """
+    stats = {'mode': 'buckets', 'apps_checked': 0, 'buckets_compared': 0, 'buckets_mismatched': 0, 'rows_pulled': 0, 'depth': 0}
+    prefixes = None
+    leaves = []
+    depth = 1
+    while True:
+        with profile_span('rpc.click_count_buckets', 'supabase', depth=depth):
+            result = supabase.rpc('click_count_buckets', {'p_depth': depth, 'p_prefixes': prefixes}).execute()
+        buckets = result.data or []
+        stats['buckets_compared'] += len(buckets)
+        stats['depth'] = depth
+        if depth == 1:
+            stats['apps_checked'] = sum(bucket['rows'] for bucket in buckets)
+        mismatched = [bucket for bucket in buckets if bucket['appsDigest'] != bucket['interactionsDigest']]
+        if not mismatched:
+            break
+        # Small buckets are cheaper to pull than to split again
+        small = [bucket['bucket'] for bucket in mismatched if bucket['rows'] <= CLICK_SYNC_LEAF_ROWS]
+        large = [bucket['bucket'] for bucket in mismatched if bucket['rows'] > CLICK_SYNC_LEAF_ROWS]
+        if small:
+            leaves.append((depth, small))
+        if not large:
+            break
+        if depth >= CLICK_SYNC_MAX_DEPTH:
+            leaves.append((depth, large))
+            break
+        prefixes = large
+        depth += 1
+
+    apps_to_update = []
+    for leaf_depth, leaf_prefixes in leaves:
+        stats['buckets_mismatched'] += len(leaf_prefixes)
+        with profile_span('rpc.click_count_bucket_rows', 'supabase', buckets=len(leaf_prefixes)):
+            result = supabase.rpc('click_count_bucket_rows', {'p_depth': leaf_depth, 'p_prefixes': leaf_prefixes}).execute()
+        rows = result.data or []
+        stats['rows_pulled'] += len(rows)
+        for row in rows:
+            current_clicks = row.get('clickCount') or 0
+            new_clicks = row.get('interactionClicks') or 0
             if new_clicks != current_clicks:
                 apps_to_update.append({
-                    'id': app['id'],
-                    'name': app['name'],
-                    'sanitizedName': sanitized_name,
+                    'id': row['id'],
+                    'name': row['name'],
+                    'sanitizedName': row['sanitizedName'],
                     'old_clicks': current_clicks,
                     'new_clicks': new_clicks
                 })
+    return apps_to_update, stats
+
+def find_click_drift_full() -> tuple:
+    """Apps whose clickCount differs from user_interactions, by downloading and diffing both tables."""
+    user_interactions = get_user_interactions()
+    if not user_interactions:
+        raise ValueError("No user interactions found")
+    
+    result = supabase.table('apps')\
+        .select('id, name, sanitizedName, clickCount')\
+        .execute()
+    
+    if not result.data:
+        raise ValueError("No apps found")
+    
+    apps_to_update = []
+    for app in result.data:
+        sanitized_name = app['sanitizedName']
+        current_clicks = app.get('clickCount', 0)
+        new_clicks = user_interactions.get(sanitized_name, 0)
+        
+        if new_clicks != current_clicks:
+            apps_to_update.append({
+                'id': app['id'],
+                'name': app['name'],
+                'sanitizedName': sanitized_name,
+                'old_clicks': current_clicks,
+                'new_clicks': new_clicks
+            })
+    return apps_to_update, {'mode': 'full', 'apps_checked': len(result.data), 'user_interactions_loaded': len(user_interactions)}
+
+@app.route('/sync_all_click_counts', methods=['GET'])
+def sync_all_click_counts():
+    """Sync ALL click counts from user_interactions to apps table"""
+    try:
+        log.info('click_sync_started')
+        
+        mode = request.args.get('mode', CLICK_SYNC_MODE).lower()
+        if mode == 'buckets':
+            try:
+                apps_to_update, reconciliation = find_click_drift_by_buckets()
+            except Exception as e:
+                log.warning('click_sync_buckets_unavailable', error=str(e))
+                apps_to_update, reconciliation = find_click_drift_full()
+        else:
+            apps_to_update, reconciliation = find_click_drift_full()
         
         if not apps_to_update:
             return jsonify({
                 "message": "All click counts are already synchronized",
-                "apps_checked": len(result.data),
-                "apps_updated": 0
+                "apps_checked": reconciliation['apps_checked'],
+                "apps_updated": 0,
+                "reconciliation": reconciliation
             })
         
         # Update in batches
@@ -1227,17 +4234,18 @@ def sync_all_click_counts():
                     
                     if update_result.data:
                         updated_count += 1
+                        app_snapshot.apply_rows(update_result.data)
                         
                 except Exception as e:
-                    print(f"Error updating {app['name']}: {str(e)}")
+                    log.error('click_sync_update_failed', app=app['name'], error=str(e))
         
         return jsonify({
             "message": f"Successfully synchronized {updated_count} apps",
             "details": {
-                "apps_checked": len(result.data),
+                "apps_checked": reconciliation['apps_checked'],
                 "apps_needing_update": len(apps_to_update),
                 "apps_updated": updated_count,
-                "user_interactions_loaded": len(user_interactions)
+                "reconciliation": reconciliation
             }
         })
         
@@ -1258,16 +4266,24 @@ def quick_check():
     except (ValueError, TypeError):
         max_apps_to_process = 10
     
-    result = process_apps_from_supabase(
+    result = run_profiled(
+        process_apps_from_supabase,
         click_threshold=click_threshold, 
         counter_key='supabase_quick_check', 
         max_apps_to_process=max_apps_to_process,
         send_notifications=True,
-        notification_base_url=notification_url
+        notification_base_url=notification_url,
+        deadline_ms=get_deadline_ms_arg()
     )
     return jsonify(result)
 
 
+@app.before_request
+def _record_first_request():
+    if _startup_profile['first_request_ms'] is None:
+        _startup_profile['first_request_ms'] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 2)
+
+_startup_profile['module_import_ms'] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 2)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
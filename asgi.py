@@ -0,0 +1,622 @@
+"""ASGI entry point that runs the check endpoints natively on asyncio.
+
+Run with an ASGI server, e.g. `uvicorn asgi:app --host 0.0.0.0 --port $PORT`.
+The Supabase-backed check routes use the async Supabase client and httpx, so an
+in-flight check run only holds a coroutine while it waits on TestFlight,
+PostgREST or the rate-limit sleep. Every other route is served by the Flask app
+in `app.py` on a worker thread.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from typing import Dict, Any, Optional
+from urllib.parse import parse_qs
+
+import httpx
+
+import app as core
+
+# One client per event loop; both clients bind their connection pools to the loop that created them
+_supabase_clients: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_http_clients: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+async def get_async_supabase():
+    """Return the async Supabase client for the running loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _supabase_clients.get(loop)
+    if client is None:
+        from supabase import acreate_client
+        client = await acreate_client(core.SUPABASE_URL, core.SUPABASE_SERVICE_KEY)
+        _supabase_clients[loop] = client
+    return client
+
+def get_async_http() -> httpx.AsyncClient:
+    """Return the pooled httpx client for the running loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        transport = None
+        if os.getenv('HTTP_CASSETTE_MODE'):
+            from http_cassette import AsyncCassetteTransport, cassette_enabled, get_cassette_store
+            if cassette_enabled():
+                transport = AsyncCassetteTransport(get_cassette_store())
+        client = httpx.AsyncClient(follow_redirects=True, transport=transport)
+        _http_clients[loop] = client
+    return client
+
+async def close_async_clients() -> None:
+    loop = asyncio.get_running_loop()
+    client = _http_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+    _supabase_clients.pop(loop, None)
+
+class AsyncSingleFlight:
+    """Per-event-loop counterpart of `SingleFlight` for coroutines.
+
+    The call runs as its own task and every caller, the first included, awaits it
+    through a shield, so a cancelled caller stops waiting without cancelling the
+    call the others share.
+    """
+
+    def __init__(self, flights: 'core.SingleFlight'):
+        self.calls: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        # Counted with the threaded flights so /health shows one set of numbers
+        self.flights = flights
+
+    def _count(self, key: str) -> None:
+        with self.flights.lock:
+            self.flights.stats[key] += 1
+
+    async def do(self, key: str, func, *args) -> tuple:
+        loop = asyncio.get_running_loop()
+        calls = self.calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is not None:
+            self._count('coalesced')
+            return await asyncio.shield(task), True
+        self._count('calls')
+        task = calls[key] = loop.create_task(func(*args))
+        task.add_done_callback(lambda done: self._finished(calls, key, done))
+        return await asyncio.shield(task), False
+
+    @staticmethod
+    def _finished(calls: Dict[str, Any], key: str, task: 'asyncio.Task') -> None:
+        if calls.get(key) is task:
+            del calls[key]
+        if not task.cancelled():
+            task.exception()  # callers re-raise it; don't warn when all of them left
+
+beta_fetch_flights = AsyncSingleFlight(core.beta_fetch_flights)
+status_update_flights = AsyncSingleFlight(core.status_update_flights)
+
+async def fetch_beta_availability_async(url: str) -> str:
+    return (await beta_fetch_flights.do(url, _fetch_beta_availability_async, url))[0]
+
+async def _fetch_beta_availability_async(url: str) -> str:
+    breaker = core.get_circuit_breaker(url)
+    if not breaker.allow_request():
+        return core.CIRCUIT_OPEN_STATUS
+
+    host_ok = False
+    try:
+        if core.hedge_policy.enabled() and breaker.state == 'closed':
+            status, host_ok = await _hedged_beta_fetch_async(url)
+        else:
+            status, host_ok = await _beta_page_attempt_async(url, core.BETA_FETCH_TIMEOUT_SECONDS, asyncio.Event())
+        return status
+    finally:
+        breaker.record(bool(host_ok))
+
+async def _hedged_beta_fetch_async(url: str) -> tuple:
+    """Async counterpart of `core._hedged_beta_fetch`; the losing request is cancelled outright."""
+    started = time.perf_counter()
+    core.hedge_policy.start_fetch()
+    first_byte = asyncio.Event()
+    primary = asyncio.create_task(_beta_page_attempt_async(url, core.BETA_FETCH_TIMEOUT_SECONDS, first_byte))
+    primary.add_done_callback(lambda task: first_byte.set())
+    try:
+        await asyncio.wait_for(first_byte.wait(), core.hedge_policy.delay())
+    except asyncio.TimeoutError:
+        pass
+    if first_byte.is_set() or not core.hedge_policy.try_hedge():
+        return await primary
+
+    remaining = core.BETA_FETCH_TIMEOUT_SECONDS - (time.perf_counter() - started)
+    hedge = asyncio.create_task(_beta_page_attempt_async(url, max(remaining, 0.1), asyncio.Event()))
+    pending = {primary, hedge}
+    result = ('timeout', False)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result[0] not in core.FETCH_FAILURE_STATUSES:
+                    if task is hedge:
+                        core.hedge_policy.record_win()
+                    return result
+        return result
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def _beta_page_attempt_async(url: str, timeout: float, first_byte: asyncio.Event) -> tuple:
+    started = time.perf_counter()
+    try:
+        content = bytearray()
+        async with get_async_http().stream('GET', url, timeout=timeout) as response:
+            core.hedge_policy.observe(time.perf_counter() - started)
+            first_byte.set()
+            response.raise_for_status()
+            # Read only the head of the page, like the sync fetch
+            async for chunk in response.aiter_bytes(1024):
+                content.extend(chunk)
+                if len(content) > core.BETA_PAGE_MAX_BYTES:
+                    break
+        return core.classify_beta_page(content.decode('utf-8', errors='ignore')), True
+    except httpx.TimeoutException:
+        if not first_byte.is_set():
+            core.hedge_policy.observe(time.perf_counter() - started)
+        return 'timeout', False
+    except httpx.HTTPStatusError as e:
+        return 'error', not core.is_host_failure_status(e.response.status_code)
+    except httpx.HTTPError:
+        return 'error', False
+
+async def get_or_create_app_async(app_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    sanitized_name = core.sanitize_string(app_data['name'])
+    try:
+        client = await get_async_supabase()
+        result = await client.table('apps').select('*').eq('sanitizedName', sanitized_name).execute()
+        if result.data:
+            return result.data[0]
+
+        result = await client.table('apps').insert(core.build_new_app(app_data, sanitized_name)).execute()
+        core.app_snapshot.apply_rows(result.data)
+        return result.data[0] if result.data else None
+    except Exception:
+        return None
+
+async def update_app_status_async(app_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Awaitable counterpart of `update_app_status`, returning the same result shape."""
+    if core.write_behind:
+        # A local SQLite write; the sync path owns the write-behind queue
+        return await asyncio.to_thread(core.update_app_status, app_data)
+    update_result, shared = await status_update_flights.do(core.status_update_key(app_data), _persist_app_status_async, app_data)
+    return dict(update_result, coalesced=True) if shared else update_result
+
+async def _persist_app_status_async(app_data: Dict[str, Any]) -> Dict[str, Any]:
+    update_result = await _update_app_status_async(app_data)
+    core.publish_status_outcome(app_data, update_result)
+    return update_result
+
+async def _update_app_status_async(app_data: Dict[str, Any]) -> Dict[str, Any]:
+    sanitized_name = core.sanitize_string(app_data['name'])
+
+    try:
+        client = await get_async_supabase()
+        result = await client.table('apps').select('*').eq('sanitizedName', sanitized_name).execute()
+
+        if not result.data:
+            await get_or_create_app_async(app_data)
+            return {'updated': True, 'status_changed': False, 'previous_status': None}
+
+        current_app = result.data[0]
+        previous_status = current_app.get('betaAvailable', 'unknown')
+
+        if core.app_data_unchanged(current_app, app_data):
+            return {'updated': False, 'status_changed': False, 'previous_status': previous_status}
+
+        update_result = await client.table('apps').update(core.build_app_update(app_data)).eq('sanitizedName', sanitized_name).execute()
+        core.app_snapshot.apply_rows(update_result.data)
+        if not update_result.data:
+            core.log.warning('app_status_not_updated', app=app_data['name'])
+
+        history_entry = core.build_history_entry(current_app['id'], app_data)
+        await client.table('app_history').insert(history_entry).execute()
+        await asyncio.to_thread(core.history_analytics.record, current_app['id'], sanitized_name, previous_status, history_entry)
+
+        history_result = await client.table('app_history')\
+            .select('id')\
+            .eq('appId', current_app['id'])\
+            .order('timestamp', desc=True)\
+            .execute()
+
+        old_ids = [item['id'] for item in history_result.data[core.HISTORY_LIMIT:]]
+        if old_ids:
+            await client.table('app_history').delete().in_('id', old_ids).execute()
+
+        return {
+            'updated': True,
+            'status_changed': core.is_status_change_to_open(previous_status, app_data['betaAvailable']),
+            'previous_status': previous_status,
+            'current_status': app_data['betaAvailable'],
+            'click_count': app_data['clickCount'],
+            'name': app_data['name']
+        }
+
+    except Exception as e:
+        core.log.error('app_status_update_failed', app=app_data.get('name', 'Unknown'), error=str(e))
+        return {'updated': False, 'status_changed': False, 'previous_status': None, 'error': str(e)}
+
+async def claim_notification_async(app_name: str, current_status: str, previous_status: str) -> bool:
+    """Awaitable counterpart of `claim_notification`, with the same conditional write."""
+    row = core.notification_claim_row(app_name, current_status, previous_status)
+    try:
+        client = await get_async_supabase()
+        claimed = await client.table('telegram_posts')\
+            .update(row)\
+            .eq('appname', app_name)\
+            .or_(core.notification_unclaimed_filter(current_status, previous_status))\
+            .execute()
+        if claimed.data:
+            return True
+        try:
+            await client.table('telegram_posts').insert(row).execute()
+            return True
+        except Exception as e:
+            if getattr(e, 'code', None) == core.UNIQUE_VIOLATION:
+                return False
+            raise
+    except Exception as e:
+        core.log.warning('notification_claim_unavailable', app=app_name, error=str(e))
+        return True
+
+async def _post_notification(api_url: str, payload: Dict[str, Any], sent_count: int, timeout: float) -> Dict[str, Any]:
+    try:
+        response = await get_async_http().post(api_url, json=payload, timeout=timeout)
+        if response.status_code == 200:
+            return {'success': True, 'data': response.json(), 'sent_count': sent_count}
+        return {'success': False, 'error': f'HTTP {response.status_code}', 'response': response.text}
+    except httpx.HTTPError as e:
+        return {'success': False, 'error': str(e)}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+async def send_email_notification_async(apps_to_notify: list, base_url: str = core.DEFAULT_NOTIFICATION_URL, timeout: float = 30) -> Dict[str, Any]:
+    if not apps_to_notify:
+        return {'success': False, 'message': 'No apps to notify via email'}
+    return await _post_notification(f"{base_url}/api/sendEmailToList", {'apps': core.build_email_apps(apps_to_notify)}, len(apps_to_notify), timeout)
+
+async def send_telegram_notification_async(apps_to_notify: list, base_url: str = core.DEFAULT_NOTIFICATION_URL, timeout: float = 30) -> Dict[str, Any]:
+    if not apps_to_notify:
+        return {'success': False, 'message': 'No apps to notify'}
+    return await _post_notification(f"{base_url}/api/sendTelegramFromPython", {'apps': apps_to_notify}, len(apps_to_notify), timeout)
+
+async def get_processing_index_async(counter_key: str) -> int:
+    if core.write_behind:
+        local = core.write_behind.get_cursor(counter_key)
+        if local is not None:
+            return local
+    try:
+        client = await get_async_supabase()
+        result = await client.table('processing_indexes').select('lastChecked').eq('counterKey', counter_key).execute()
+        return result.data[0]['lastChecked'] if result.data else 0
+    except Exception as e:
+        core.log.error('processing_index_read_failed', counter_key=counter_key, error=str(e))
+        return 0
+
+async def update_processing_index_async(counter_key: str, last_checked: int) -> None:
+    if core.write_behind:
+        core.write_behind.set_cursor(counter_key, last_checked)
+        return
+    try:
+        client = await get_async_supabase()
+        res = await client.table('processing_indexes').select('counterKey').eq('counterKey', counter_key).execute()
+        if res.data:
+            await client.table('processing_indexes').update({'lastChecked': last_checked}).eq('counterKey', counter_key).execute()
+        else:
+            await client.table('processing_indexes').insert({'counterKey': counter_key, 'lastChecked': last_checked}).execute()
+        core.log.info('processing_index_updated', counter_key=counter_key, index=last_checked)
+    except Exception as e:
+        core.log.error('processing_index_write_failed', counter_key=counter_key, error=str(e))
+
+async def process_apps_from_supabase_async(click_threshold: int, counter_key: str, max_apps_to_process: int = 5, send_notifications: bool = False, notification_base_url: str = core.DEFAULT_NOTIFICATION_URL, deadline_ms: Optional[int] = None) -> Dict[str, Any]:
+    """Async counterpart of `process_apps_from_supabase`, returning the same result shape."""
+    deadline = core.RunDeadline(deadline_ms)
+    journal = None
+    try:
+        # The shared index refreshes at most once per TTL for all routes; when it
+        # does, the paginated reload runs on a worker thread with the sync client
+        apps_data = await asyncio.to_thread(core.threshold_index.window, click_threshold)
+
+        if not apps_data:
+            return {"message": "No apps found in Supabase meeting the threshold", "processed": 0}
+
+        # Lease bookkeeping is a few small PostgREST calls every SHARD_LEASE_SECONDS / 3
+        apps_data, counter_key = await asyncio.to_thread(core.filter_owned_apps, apps_data, counter_key)
+        if not apps_data:
+            return {"message": f"No apps in the shards held by {core.INSTANCE_ID}", "processed": 0}
+        total_apps = len(apps_data)
+
+        governor = core.MemoryGovernor(counter_key, max_apps_to_process)
+        claim = await asyncio.to_thread(core.claim_processing_range, counter_key, min(governor.batch_limit, total_apps))
+        start_index = claim['start'] if claim else await get_processing_index_async(counter_key)
+        # Journal writes are small sync PostgREST calls; they run on a worker thread
+        if claim:
+            journal = core.RunJournal(counter_key, notification_base_url, commit=lambda done: core.checkpoint_processing_range(counter_key, claim, done))
+        else:
+            journal = core.RunJournal(counter_key, notification_base_url, commit=lambda done: core.update_processing_index(counter_key, (start_index + done) % total_apps))
+        count = 0
+        checked = 0
+        # Entries a crashed run claimed but never sent go out with this run's
+        apps_to_notify = await asyncio.to_thread(journal.adopt) if send_notifications else []
+        circuit_open = False
+
+        while count < governor.batch_limit and checked < total_apps and (claim is None or start_index + checked < claim['end']):
+            if not deadline.can_start_app():
+                break
+
+            app = apps_data[(start_index + checked) % total_apps].to_dict()
+            core.log.debug('checking_app', app=app.get('name'), clicks=app.get('clickCount'))
+
+            beta_status = await fetch_beta_availability_async(app['link'])
+            if beta_status == core.CIRCUIT_OPEN_STATUS:
+                # Leave this app for the next run rather than recording a status we never saw
+                circuit_open = True
+                break
+            app['betaAvailable'] = beta_status
+            update_result = await update_app_status_async(app)
+
+            if update_result['updated'] and update_result['status_changed'] and update_result['current_status'] == 'open':
+                if send_notifications and await claim_notification_async(app['name'], 'open', update_result['previous_status']):
+                    entry = core.build_notify_entry(app, update_result['previous_status'])
+                    await asyncio.to_thread(journal.add_notification, entry)
+                    apps_to_notify.append(entry)
+
+            count += 1
+            checked += 1
+            await asyncio.to_thread(journal.app_done, app.get('name'), checked)
+
+            # Rate limiting for scraping/API calls, without holding a thread
+            await asyncio.sleep(1.0)
+            governor.checkpoint()
+
+        notifications = None
+        if send_notifications:
+            if core.NOTIFY_DIGEST_WINDOW_SECONDS > 0:
+                # The digest queue is shared with the threaded routes, so it goes through the sync path
+                notifications = await asyncio.to_thread(journal.dispatch, deadline.request_timeout(30))
+            elif journal.pending:
+                telegram_res, email_res = await asyncio.gather(
+                    send_telegram_notification_async(journal.pending, notification_base_url, timeout=deadline.request_timeout(30)),
+                    send_email_notification_async(journal.pending, notification_base_url, timeout=deadline.request_timeout(30))
+                )
+                notifications = {'queued': 0, 'sent': True, 'apps': len(journal.pending), 'telegram': telegram_res, 'email': email_res}
+                await asyncio.to_thread(journal.dispatched)
+
+        if claim:
+            await asyncio.to_thread(core.complete_processing_range, counter_key, claim, checked)
+        else:
+            await update_processing_index_async(counter_key, (start_index + checked) % total_apps)
+        await asyncio.to_thread(journal.finish)
+
+        return {
+            "message": f"Processed {count} apps from Supabase for {counter_key}.",
+            "details": {
+                "checked": checked,
+                "processed": count,
+                "notifications_sent": len(apps_to_notify)
+            },
+            "memory": governor.report(),
+            "circuit_open": circuit_open,
+            "deadline": deadline.report(),
+            "telegram": notifications and notifications.get('telegram'),
+            "email": notifications and notifications.get('email')
+        }
+    except Exception as e:
+        if journal:
+            await asyncio.to_thread(journal.abandon)
+        return {"error": str(e)}
+
+# path -> (counter_key, default click_threshold, default max_apps_to_process, max_apps_to_process overridable)
+CHECK_ROUTES = {
+    '/check_supabase_api': ('supabase_api_check', 20, 3, True),
+    '/check_apps': ('supabase_check_apps', 20, 5, True),
+    '/check_apps_with_notifications': ('supabase_notifications_check', 10, 10, True),
+    '/daily_stat': ('supabase_daily_stat', 5, 3, False),
+    '/check_high_clicks': ('supabase_high_click_check', 500, 5, True),
+    '/quick_check': ('supabase_quick_check', 10, 10, True),
+}
+
+def _int_arg(args: Dict[str, list], name: str, default: int) -> int:
+    try:
+        return int(args.get(name, [str(default)])[0])
+    except (ValueError, TypeError):
+        return default
+
+async def _handle_events(scope, receive, send) -> None:
+    """Native SSE stream of status changes; each subscriber is a coroutine, not a thread."""
+    headers = dict(scope.get('headers', []))
+    args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    last_event_id = headers.get(b'last-event-id', b'').decode('latin-1') or args.get('last_event_id', [''])[0]
+    cursor = last_event_id or core.status_events.latest_id()
+
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+    waiter = (loop, wakeup)
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect() -> None:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        wakeup.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    core.status_events.add_async_waiter(waiter)
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]
+        })
+        await send({'type': 'http.response.body', 'body': f"retry: 3000\n: connected at {cursor}\n\n".encode(), 'more_body': True})
+        while not disconnected.is_set():
+            wakeup.clear()
+            pending, missed = core.status_events.events_after(cursor)
+            if missed:
+                await send({'type': 'http.response.body', 'body': core.format_resync(missed).encode('utf-8'), 'more_body': True})
+            if not pending:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), core.SSE_KEEPALIVE_SECONDS)
+                    continue
+                except asyncio.TimeoutError:
+                    await send({'type': 'http.response.body', 'body': b": keep-alive\n\n", 'more_body': True})
+                    continue
+            for event in pending:
+                await send({'type': 'http.response.body', 'body': core.format_sse(event).encode('utf-8'), 'more_body': True})
+                cursor = event['id']
+    finally:
+        core.status_events.remove_async_waiter(waiter)
+        watcher.cancel()
+
+async def _send_json(send, payload: Any, status: int = 200) -> None:
+    body = json.dumps(payload, sort_keys=True).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _handle_check(scope, send) -> None:
+    counter_key, default_threshold, default_max, max_overridable = CHECK_ROUTES[scope['path']]
+    args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    result = await process_apps_from_supabase_async(
+        click_threshold=_int_arg(args, 'click_threshold', default_threshold),
+        counter_key=counter_key,
+        max_apps_to_process=_int_arg(args, 'max_apps_to_process', default_max) if max_overridable else default_max,
+        send_notifications=True,
+        notification_base_url=args.get('notification_url', [core.DEFAULT_NOTIFICATION_URL])[0],
+        deadline_ms=_int_arg(args, 'deadline_ms', 0) or None
+    )
+    await _send_json(send, result)
+
+def _wsgi_environ(scope, body: bytes) -> Dict[str, Any]:
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+async def _handle_flask(scope, receive, send) -> None:
+    """Serve a request through the Flask app on a worker thread, streaming the body back.
+
+    A client disconnect stops the worker at its next chunk and closes the response
+    iterator. An exception before the app starts its response is answered with a 500.
+    """
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    environ = _wsgi_environ(scope, body)
+    disconnected = threading.Event()
+
+    def start_response(status, headers, exc_info=None):
+        loop.call_soon_threadsafe(queue.put_nowait, ('start', status, headers))
+
+    def run() -> None:
+        try:
+            iterable = core.app.wsgi_app(environ, start_response)
+            try:
+                for chunk in iterable:
+                    if disconnected.is_set():
+                        break
+                    if chunk:
+                        loop.call_soon_threadsafe(queue.put_nowait, ('body', chunk))
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        except Exception as e:
+            core.log.error('asgi_flask_failed', path=scope['path'], error=str(e))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, ('end',))
+
+    async def watch_disconnect() -> None:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        queue.put_nowait(('disconnect',))
+
+    worker = loop.run_in_executor(None, run)
+    watcher = asyncio.ensure_future(watch_disconnect())
+    started = False
+    try:
+        while True:
+            item = await queue.get()
+            if item[0] == 'start':
+                _, status, headers = item
+                started = True
+                await send({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+                })
+            elif item[0] == 'body':
+                await send({'type': 'http.response.body', 'body': item[1], 'more_body': True})
+            elif item[0] == 'disconnect':
+                # Nobody is listening; the worker stops and closes the iterator on its own
+                return
+            else:
+                if not started:
+                    await send({'type': 'http.response.start', 'status': 500, 'headers': [(b'content-type', b'application/json')]})
+                    await send({'type': 'http.response.body', 'body': json.dumps({'error': 'Internal Server Error'}).encode('utf-8')})
+                else:
+                    await send({'type': 'http.response.body', 'body': b''})
+                break
+        await worker
+    finally:
+        watcher.cancel()
+
+async def app(scope, receive, send) -> None:
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_clients()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    elif scope['type'] == 'http':
+        if scope['path'] in CHECK_ROUTES and scope['method'] in ('GET', 'HEAD'):
+            await _handle_check(scope, send)
+        elif scope['path'] == '/events' and scope['method'] == 'GET':
+            await _handle_events(scope, receive, send)
+        else:
+            await _handle_flask(scope, receive, send)
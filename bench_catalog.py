@@ -0,0 +1,70 @@
+"""Memory benchmark: list-of-dicts catalog vs AppCatalog / InteractionCounts.
+
+Rows are decoded from JSON, as they are from Supabase and the apps API, and the
+decoded list is dropped after building the compact form, so the numbers are
+what each shape keeps alive for the rest of a run.
+
+Usage: python bench_catalog.py [app_count]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from app import AppCatalog, InteractionCounts, STATUS_CODES, sanitize_string
+
+CATEGORIES = ['Games', 'Productivity', 'Utilities', 'Social Networking', 'Education', 'Health & Fitness']
+
+def synthetic_payload(count: int) -> str:
+    rows = []
+    for i in range(count):
+        name = f"Example App {i}"
+        rows.append({
+            'id': i + 1,
+            'name': name,
+            'link': f"https://testflight.apple.com/join/{i:08x}",
+            'betaAvailable': STATUS_CODES[i % 4],
+            'clickCount': (i * 7919) % 5000,
+            'sanitizedName': sanitize_string(name),
+            'categories': [CATEGORIES[i % 6], CATEGORIES[(i + 1) % 6]],
+            'logo': f"https://is1-ssl.mzstatic.com/image/thumb/{i:08x}/512x512bb.jpg",
+            'lastChecked': f"2026-01-01T00:00:{i % 60:02d}+00:00",
+        })
+    return json.dumps(rows)
+
+def measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, peak
+
+def mb(size: int) -> str:
+    return f"{size / 1048576:8.2f} MB"
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    payload = synthetic_payload(count)
+
+    rows, rows_bytes, _ = measure(lambda: json.loads(payload))
+    catalog, catalog_bytes, catalog_peak = measure(lambda: AppCatalog.from_rows(json.loads(payload)))
+    interaction_dict, dict_bytes, _ = measure(lambda: {row['sanitizedName']: row['clickCount'] for row in json.loads(payload)})
+    interactions, counts_bytes, _ = measure(lambda: InteractionCounts((row['sanitizedName'], row['clickCount']) for row in json.loads(payload)))
+
+    # Both shapes must answer the same questions
+    for index in (0, count // 2, count - 1):
+        assert catalog[index].to_dict() == rows[index]
+        name = rows[index]['sanitizedName']
+        assert interactions.get(name) == interaction_dict[name]
+    assert catalog.at_least(2500) == sum(1 for row in rows if row['clickCount'] >= 2500)
+
+    print(f"apps: {count}")
+    print(f"list of dicts:     {mb(rows_bytes)}")
+    print(f"AppCatalog:        {mb(catalog_bytes)}  ({rows_bytes / max(catalog_bytes, 1):.1f}x smaller, build peak {mb(catalog_peak).strip()})")
+    print(f"interactions dict: {mb(dict_bytes)}")
+    print(f"InteractionCounts: {mb(counts_bytes)}  ({dict_bytes / max(counts_bytes, 1):.1f}x smaller)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Record/replay of outbound HTTP for reproducible performance runs.
+
+Enabled with HTTP_CASSETTE_MODE=record or replay. `app.get_http_session()` and
+`asgi.get_async_http()` then route TestFlight, iTunes and notification traffic
+through the cassette at HTTP_CASSETTE_PATH (JSON lines, one exchange per line).
+
+record  - requests go out as usual; status, headers, the first
+          HTTP_CASSETTE_BODY_MAX_BYTES of the body and the elapsed time are
+          appended to the cassette. Only the recorded copy is cut short; the
+          caller gets the whole body. Recording reads every body in full before
+          handing it back, so a caller that asked to stream (stream=True,
+          client.stream()) gets a buffered body in record mode. Timeouts and
+          connection errors are recorded too.
+replay  - nothing leaves the process. Each request is answered from the
+          cassette; repeated requests for the same method/URL/body get the
+          recorded responses in order, wrapping around when they run out.
+          HTTP_CASSETTE_LATENCY=original sleeps for the recorded time, `none`
+          answers at once. A request with no recording fails as a connection
+          error, or goes out live with HTTP_CASSETTE_MISS=passthrough.
+
+Supabase traffic is not captured; it goes through its own clients.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+HTTP_CASSETTE_MODE = os.getenv('HTTP_CASSETTE_MODE', '').lower()
+HTTP_CASSETTE_PATH = os.getenv('HTTP_CASSETTE_PATH', 'cassettes/http.jsonl')
+HTTP_CASSETTE_LATENCY = os.getenv('HTTP_CASSETTE_LATENCY', 'original').lower()
+HTTP_CASSETTE_MISS = os.getenv('HTTP_CASSETTE_MISS', 'error').lower()
+HTTP_CASSETTE_BODY_MAX_BYTES = int(os.getenv('HTTP_CASSETTE_BODY_MAX_BYTES', '65536'))
+
+# Describe the stored (decoded, possibly truncated) body, not the original wire format
+_DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+def cassette_enabled() -> bool:
+    return HTTP_CASSETTE_MODE in ('record', 'replay')
+
+def exchange_key(method: str, url: str, body: Optional[bytes]) -> str:
+    digest = hashlib.sha256(body).hexdigest()[:16] if body else '-'
+    return f"{method.upper()} {url} {digest}"
+
+class CassetteStore:
+    """Append-only JSONL file of recorded exchanges with per-key replay cursors."""
+
+    def __init__(self, path: str = HTTP_CASSETTE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.exchanges: Dict[str, list] = {}
+        self.cursors: Dict[str, int] = {}
+        self.stats = {'recorded': 0, 'replayed': 0, 'missed': 0}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as handle:
+                for line in handle:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.exchanges.setdefault(entry['key'], []).append(entry)
+
+    def record(self, method: str, url: str, body: Optional[bytes], elapsed_ms: float, status: Optional[int] = None, headers: Optional[Dict[str, str]] = None, content: bytes = b'', error: Optional[str] = None) -> None:
+        entry = {
+            'key': exchange_key(method, url, body),
+            'method': method.upper(),
+            'url': url,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'recorded_at': datetime.now(timezone.utc).isoformat()
+        }
+        if error:
+            entry['error'] = error
+        else:
+            entry['status'] = status
+            entry['headers'] = {name: value for name, value in (headers or {}).items() if name.lower() not in _DROPPED_HEADERS}
+            entry['body'] = base64.b64encode(content).decode('ascii')
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                handle.write(json.dumps(entry) + "\n")
+            self.exchanges.setdefault(entry['key'], []).append(entry)
+            self.stats['recorded'] += 1
+
+    def next_exchange(self, method: str, url: str, body: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        key = exchange_key(method, url, body)
+        with self.lock:
+            entries = self.exchanges.get(key)
+            if not entries:
+                self.stats['missed'] += 1
+                return None
+            position = self.cursors.get(key, 0)
+            self.cursors[key] = position + 1
+            self.stats['replayed'] += 1
+            return entries[position % len(entries)]
+
+    def replay_delay(self, entry: Dict[str, Any]) -> float:
+        return entry['elapsed_ms'] / 1000 if HTTP_CASSETTE_LATENCY == 'original' else 0.0
+
+_store: Optional[CassetteStore] = None
+_store_lock = threading.Lock()
+
+def get_cassette_store() -> CassetteStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CassetteStore()
+    return _store
+
+def _as_bytes(body: Any) -> Optional[bytes]:
+    if body is None:
+        return None
+    return body.encode('utf-8') if isinstance(body, str) else bytes(body)
+
+class CassetteAdapter(HTTPAdapter):
+    """requests transport adapter that records to or replays from the cassette."""
+
+    def __init__(self, store: CassetteStore, mode: str = HTTP_CASSETTE_MODE):
+        super().__init__()
+        self.store = store
+        self.mode = mode
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = _as_bytes(request.body)
+        if self.mode == 'replay':
+            entry = self.store.next_exchange(request.method, request.url, body)
+            if entry is not None:
+                return self._replay(request, entry)
+            if HTTP_CASSETTE_MISS != 'passthrough':
+                raise requests.exceptions.ConnectionError(f"No cassette recording for {request.method} {request.url}", request=request)
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        started = time.perf_counter()
+        try:
+            response = super().send(request, stream=True, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+            try:
+                content = response.raw.read(decode_content=True) or b''
+            except ReadTimeoutError as e:
+                raise requests.exceptions.ReadTimeout(e, request=request)
+            except ProtocolError as e:
+                raise requests.exceptions.ConnectionError(e, request=request)
+        except requests.exceptions.Timeout:
+            self.store.record(request.method, request.url, body, (time.perf_counter() - started) * 1000, error='timeout')
+            raise
+        except requests.exceptions.ConnectionError:
+            self.store.record(request.method, request.url, body, (time.perf_counter() - started) * 1000, error='connection')
+            raise
+        response.close()
+        self.store.record(request.method, request.url, body, (time.perf_counter() - started) * 1000, response.status_code, dict(response.headers), content[:HTTP_CASSETTE_BODY_MAX_BYTES])
+        return self._build_response(request, response.status_code, dict(response.headers), content)
+
+    def _replay(self, request, entry: Dict[str, Any]):
+        delay = self.store.replay_delay(entry)
+        if delay:
+            time.sleep(delay)
+        if entry.get('error') == 'timeout':
+            raise requests.exceptions.ReadTimeout(f"Recorded timeout for {request.url}", request=request)
+        if entry.get('error'):
+            raise requests.exceptions.ConnectionError(f"Recorded connection error for {request.url}", request=request)
+        return self._build_response(request, entry['status'], entry['headers'], base64.b64decode(entry['body']))
+
+    def _build_response(self, request, status: int, headers: Dict[str, str], content: bytes):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({name: value for name, value in headers.items() if name.lower() not in _DROPPED_HEADERS})
+        response.raw = io.BytesIO(content)
+        response.url = request.url
+        response.request = request
+        response.reason = ''
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+def install_cassette(session) -> None:
+    """Mount the cassette adapter on a requests session when cassette mode is on."""
+    if cassette_enabled():
+        adapter = CassetteAdapter(get_cassette_store())
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records to or replays from the cassette."""
+
+    def __init__(self, store: CassetteStore, mode: str = HTTP_CASSETTE_MODE, **transport_kwargs):
+        self.store = store
+        self.mode = mode
+        self.inner = httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread() or None
+        url = str(request.url)
+        if self.mode == 'replay':
+            entry = self.store.next_exchange(request.method, url, body)
+            if entry is not None:
+                delay = self.store.replay_delay(entry)
+                if delay:
+                    await asyncio.sleep(delay)
+                if entry.get('error') == 'timeout':
+                    raise httpx.ReadTimeout(f"Recorded timeout for {url}", request=request)
+                if entry.get('error'):
+                    raise httpx.ConnectError(f"Recorded connection error for {url}", request=request)
+                return httpx.Response(entry['status'], headers=entry['headers'], content=base64.b64decode(entry['body']), request=request)
+            if HTTP_CASSETTE_MISS != 'passthrough':
+                raise httpx.ConnectError(f"No cassette recording for {request.method} {url}", request=request)
+            return await self.inner.handle_async_request(request)
+
+        started = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+            content = bytearray()
+            # aiter_bytes decodes any content-encoding, matching what the sync adapter stores
+            async for chunk in response.aiter_bytes():
+                content.extend(chunk)
+            await response.aclose()
+        except httpx.TimeoutException:
+            self.store.record(request.method, url, body, (time.perf_counter() - started) * 1000, error='timeout')
+            raise
+        except httpx.TransportError:
+            self.store.record(request.method, url, body, (time.perf_counter() - started) * 1000, error='connection')
+            raise
+        decoded = bytes(content)
+        self.store.record(request.method, url, body, (time.perf_counter() - started) * 1000, response.status_code, dict(response.headers), decoded[:HTTP_CASSETTE_BODY_MAX_BYTES])
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS}
+        return httpx.Response(response.status_code, headers=headers, content=decoded, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
@@ -0,0 +1,217 @@
+"""Full-catalog status sweep, run from the command line instead of the cron routes.
+
+Checks every app in a source once, in parallel, and writes one NDJSON line per
+result. Progress goes to stderr.
+
+    python sweep.py                                   # every app in Supabase
+    python sweep.py --min-clicks 20 --workers 16 --rate 4
+    python sweep.py --markdown https://.../README.md --dry-run
+    python sweep.py --json https://.../apps.json --output sweep.ndjson
+    python sweep.py --checkpoint sweep.done --resume  # continue an interrupted sweep
+
+Results are persisted through update_app_status unless --dry-run is given, so
+history, analytics and /events behave as for a cron run. With --notify, each open
+beta is queued into the normal notification digest as soon as it is claimed, and
+the digest is flushed on the way out, interrupted or not. Fetches are spaced to
+at most --rate per second across all workers, like the routes' one-per-second pacing.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional
+
+import app as core
+
+def load_supabase_apps(min_clicks: int) -> list:
+    return [row.to_dict() for row in core.threshold_index.window(min_clicks)]
+
+def load_source_apps(url: str, markdown: bool) -> list:
+    response = core.get_http_session().get(url, timeout=30)
+    response.raise_for_status()
+    if markdown:
+        apps = core.parse_markdown(response.text)
+    else:
+        data = response.json()
+        apps = data[0]['apps'] if isinstance(data, list) else data['apps']
+    # Same rule as the routes: clicks come from user_interactions, not the source file
+    interactions = core.get_user_interactions()
+    for app in apps:
+        app['clickCount'] = interactions.get(core.sanitize_string(app['name']), 0)
+    return apps
+
+def load_checkpoint(path: Optional[str]) -> set:
+    if not path:
+        return set()
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return {line.strip() for line in handle if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+class Pacer:
+    """Spaces calls to at most `rate` per second across threads; 0 disables it."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class Progress:
+    """Single status line on stderr, redrawn at most a few times a second."""
+
+    def __init__(self, total: int, enabled: bool):
+        self.total = total
+        self.enabled = enabled
+        self.done = 0
+        self.statuses: Dict[str, int] = {}
+        self.started = time.monotonic()
+        self.drawn_at = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, status: str) -> None:
+        with self.lock:
+            self.done += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if self.enabled and (time.monotonic() - self.drawn_at > 0.25 or self.done == self.total):
+                self.draw()
+
+    def draw(self) -> None:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        counts = ' '.join(f"{status}={count}" for status, count in sorted(self.statuses.items()))
+        sys.stderr.write(f"\r[{self.done}/{self.total}] {rate:.1f}/s eta {eta:.0f}s {counts}\033[K")
+        sys.stderr.flush()
+        self.drawn_at = time.monotonic()
+
+def check_app(app: Dict[str, Any], dry_run: bool, notify: bool, pacer: Pacer) -> Dict[str, Any]:
+    pacer.wait()
+    started = time.perf_counter()
+    result = {'name': app.get('name'), 'link': app.get('link'), 'clickCount': app.get('clickCount', 0), 'previous_status': app.get('betaAvailable')}
+    status = core.fetch_beta_availability(app['link'])
+    result['status'] = status
+    if status != core.CIRCUIT_OPEN_STATUS and not dry_run:
+        app['betaAvailable'] = status
+        update_result = core.update_app_status(app)
+        result['updated'] = update_result.get('updated', False)
+        result['status_changed'] = update_result.get('status_changed', False)
+        if update_result.get('error'):
+            result['error'] = update_result['error']
+        if notify and update_result.get('status_changed') and update_result.get('current_status') == 'open':
+            if core.claim_notification(app['name'], 'open', update_result['previous_status']):
+                result['notify_entry'] = core.build_notify_entry(app, update_result['previous_status'])
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+def queue_entry(entry: Dict[str, Any], base_url: str) -> bool:
+    """Put a claimed entry in the digest queue; False if it has to be sent directly."""
+    if core.NOTIFY_DIGEST_WINDOW_SECONDS <= 0:
+        return False
+    try:
+        core.queue_notifications([entry], base_url)
+        return True
+    except Exception as e:
+        core.log.warning('notification_queue_unavailable', error=str(e))
+        return False
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description='Check the beta status of every app in a catalog.')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--markdown', metavar='URL', help='markdown app list instead of Supabase')
+    source.add_argument('--json', metavar='URL', help='JSON app list instead of Supabase')
+    parser.add_argument('--min-clicks', type=int, default=0, help='Supabase source: only apps with at least this many clicks')
+    parser.add_argument('--limit', type=int, help='stop after this many apps')
+    parser.add_argument('--workers', type=int, default=8, help='parallel fetches (default 8)')
+    parser.add_argument('--rate', type=float, default=2.0, help='fetches per second across all workers, 0 for no limit (default 2)')
+    parser.add_argument('--dry-run', action='store_true', help='fetch statuses but write nothing')
+    parser.add_argument('--notify', action='store_true', help='queue open-beta notifications (ignored with --dry-run)')
+    parser.add_argument('--notification-url', default=core.DEFAULT_NOTIFICATION_URL)
+    parser.add_argument('--output', metavar='PATH', help='NDJSON results file (default stdout)')
+    parser.add_argument('--checkpoint', metavar='PATH', help='file of finished apps, appended as the sweep goes')
+    parser.add_argument('--resume', action='store_true', help='skip apps already in --checkpoint')
+    parser.add_argument('--no-progress', action='store_true')
+    args = parser.parse_args(argv)
+    # stdout may carry the NDJSON results; keep the app's log records off it
+    core.log.stream = sys.stderr
+
+    if args.markdown or args.json:
+        apps = load_source_apps(args.markdown or args.json, markdown=bool(args.markdown))
+    else:
+        apps = load_supabase_apps(args.min_clicks)
+
+    done = load_checkpoint(args.checkpoint) if args.resume else set()
+    apps = [app for app in apps if app.get('link') and core.sanitize_string(app['name']) not in done]
+    if args.limit:
+        apps = apps[:args.limit]
+
+    output = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    checkpoint = open(args.checkpoint, 'a', encoding='utf-8') if args.checkpoint else None
+    progress = Progress(len(apps), enabled=not args.no_progress)
+    notify = args.notify and not args.dry_run
+    pacer = Pacer(args.rate)
+    # Digest mode: entries go to the queue as they are claimed. Otherwise, or if the
+    # queue is down, they wait here and are sent directly on the way out.
+    apps_to_notify = []
+    notified = 0
+    skipped = 0
+    print(f"Sweeping {len(apps)} apps ({len(done)} already done) with {args.workers} workers{' [dry run]' if args.dry_run else ''}", file=sys.stderr)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix='sweep')
+    try:
+        futures = {executor.submit(check_app, app, args.dry_run, notify, pacer): app for app in apps}
+        for future in as_completed(futures):
+            app = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'name': app.get('name'), 'link': app.get('link'), 'status': 'error', 'error': str(e)}
+            entry = result.pop('notify_entry', None)
+            if entry:
+                notified += 1
+                if not queue_entry(entry, args.notification_url):
+                    apps_to_notify.append(entry)
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            # Circuit-open skips were never checked; leave them for --resume
+            if result['status'] == core.CIRCUIT_OPEN_STATUS:
+                skipped += 1
+            elif checkpoint:
+                checkpoint.write(core.sanitize_string(app['name']) + "\n")
+                checkpoint.flush()
+            progress.add(result['status'])
+    except KeyboardInterrupt:
+        print("\nInterrupted; finished apps are in the checkpoint", file=sys.stderr)
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if output is not sys.stdout:
+            output.close()
+        if checkpoint:
+            checkpoint.close()
+        # Claimed entries are sent even when the sweep dies halfway
+        if notified:
+            core.dispatch_notifications(apps_to_notify, args.notification_url)
+
+    if core.write_behind:
+        core.write_behind.close()
+    if progress.enabled:
+        sys.stderr.write("\n")
+    print(f"Done: {progress.done} apps, {skipped} skipped by open circuits, {notified} notifications", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import copy
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as core  # noqa: E402
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """The slice of the postgrest query builder the code under test uses."""
+
+    def __init__(self, db: 'FakeSupabase', table: str):
+        self.db = db
+        self.table = table
+        self.op = 'select'
+        self.payload = None
+        self.filters = []
+        self.ordering = []
+        self.bounds = None
+        self.row_limit = None
+
+    def select(self, *columns, **kwargs):
+        self.op = 'select'
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.op, self.payload = 'insert', payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = 'id', **kwargs):
+        self.op, self.payload, self.on_conflict = 'upsert', payload, on_conflict
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = 'update', payload
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc: bool = False):
+        self.ordering.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def _rows(self) -> list:
+        return [row for row in self.db.tables.setdefault(self.table, []) if all(match(row) for match in self.filters)]
+
+    def execute(self) -> FakeResult:
+        self.db.calls.append((self.table, self.op))
+        table = self.db.tables.setdefault(self.table, [])
+        if self.op == 'select':
+            rows = [copy.deepcopy(row) for row in self._rows()]
+            for column, desc in reversed(self.ordering):
+                rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            if self.bounds:
+                rows = rows[self.bounds[0]:self.bounds[1] + 1]
+            if self.row_limit is not None:
+                rows = rows[:self.row_limit]
+            return FakeResult(rows)
+        if self.op in ('insert', 'upsert'):
+            written = []
+            for row in self.payload if isinstance(self.payload, list) else [self.payload]:
+                existing = [r for r in table if self.op == 'upsert' and r.get(self.on_conflict) == row.get(self.on_conflict)]
+                if existing:
+                    existing[0].update(row)
+                    written.append(copy.deepcopy(existing[0]))
+                else:
+                    row = dict(row)
+                    row.setdefault('id', next(self.db.ids))
+                    table.append(row)
+                    written.append(copy.deepcopy(row))
+            return FakeResult(written)
+        rows = self._rows()
+        if self.op == 'update':
+            for row in rows:
+                row.update(self.payload)
+        else:
+            self.db.tables[self.table] = [row for row in table if row not in rows]
+        return FakeResult(copy.deepcopy(rows))
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {}
+        self.calls = []
+        self.ids = itertools.count(1)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def fake_db(monkeypatch) -> FakeSupabase:
+    db = FakeSupabase()
+    monkeypatch.setattr(core, 'supabase', db)
+    return db
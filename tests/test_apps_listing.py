@@ -0,0 +1,85 @@
+import gzip
+import json
+import threading
+
+import pytest
+
+import app as core
+
+
+@pytest.fixture
+def client(fake_db, monkeypatch):
+    fake_db.tables['apps'] = [
+        {'id': i, 'name': f'App {i}', 'sanitizedName': f'app-{i}', 'link': f'https://testflight.apple.com/join/{i}',
+         'betaAvailable': 'open' if i % 2 else 'full', 'clickCount': 10 * i, 'categories': ['games'] if i < 2 else [],
+         'lastChecked': f'2026-01-01T00:00:0{i}+00:00'}
+        for i in range(4)
+    ]
+    snapshot = core.AppSnapshot()
+    monkeypatch.setattr(core, 'app_snapshot', snapshot)
+    return core.app.test_client()
+
+
+def test_listing_is_filtered_and_sorted(client):
+    response = client.get('/apps?status=open&min_clicks=5')
+    body = response.get_json()
+    assert body['count'] == 2
+    assert [app['name'] for app in body['apps']] == ['App 3', 'App 1']
+    assert client.get('/apps?category=GAMES').get_json()['count'] == 2
+    assert client.get('/apps?limit=1').get_json()['apps'][0]['name'] == 'App 3'
+
+
+def test_etag_revalidates_with_304(client):
+    first = client.get('/apps')
+    etag = first.headers['ETag']
+    assert first.headers['Vary'] == 'Accept-Encoding'
+    again = client.get('/apps', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert client.get('/apps?status=open', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_gzip_is_negotiated_with_its_own_etag(client):
+    plain = client.get('/apps')
+    packed = client.get('/apps', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in plain.headers
+    assert json.loads(gzip.decompress(packed.data)) == plain.get_json()
+    assert packed.headers['ETag'] != plain.headers['ETag']
+    # A validator for one coding must not revalidate the other
+    assert client.get('/apps', headers={'If-None-Match': packed.headers['ETag']}).status_code == 200
+    assert client.get('/apps', headers={'Accept-Encoding': 'gzip', 'If-None-Match': packed.headers['ETag']}).status_code == 304
+
+
+def test_snapshot_changes_move_the_etag(client):
+    etag = client.get('/apps').headers['ETag']
+    core.app_snapshot.apply_rows([{'sanitizedName': 'app-0', 'betaAvailable': 'open', 'lastChecked': '2026-01-02T00:00:00+00:00'}])
+    response = client.get('/apps', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_reads_are_served_while_a_reload_fetches(client, monkeypatch):
+    client.get('/apps')
+    snapshot = core.app_snapshot
+    fetching, release = threading.Event(), threading.Event()
+    fetch = snapshot._fetch
+
+    def slow_fetch(since=None):
+        fetching.set()
+        release.wait(5)
+        return fetch(since)
+
+    monkeypatch.setattr(snapshot, '_fetch', slow_fetch)
+    snapshot.loaded_at -= core.APPS_SNAPSHOT_FULL_SECONDS + 1
+    reload = threading.Thread(target=snapshot.ensure_fresh)
+    reload.start()
+    assert fetching.wait(5)
+    # A second caller neither blocks on the lock nor starts another fetch
+    assert client.get('/apps?limit=1').get_json()['count'] == 1
+    snapshot.apply_rows([{'sanitizedName': 'app-1', 'betaAvailable': 'full', 'lastChecked': '2026-01-03T00:00:00+00:00'}])
+    release.set()
+    reload.join(5)
+    assert snapshot.db_reads == 2
+    # A write made during the reload survives the swap
+    assert snapshot.rows['app-1']['betaAvailable'] == 'full'
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+import app as core
+import asgi
+
+
+def test_followers_survive_the_first_caller_being_cancelled():
+    async def scenario():
+        runs = []
+
+        async def fetch(value):
+            runs.append(value)
+            await asyncio.sleep(0.02)
+            return value * 2
+
+        flights = asgi.AsyncSingleFlight(core.SingleFlight('test'))
+        first = asyncio.create_task(flights.do('k', fetch, 3))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flights.do('k', fetch, 3)) for _ in range(2)]
+        await asyncio.sleep(0.005)
+        first.cancel()
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return runs, results, flights
+
+    runs, results, flights = asyncio.run(scenario())
+    assert runs == [3]
+    assert results == [(6, True), (6, True)]
+    assert flights.flights.stats == {'calls': 1, 'coalesced': 2}
+
+
+def test_errors_reach_every_caller_and_clear_the_key():
+    async def scenario():
+        async def fail():
+            await asyncio.sleep(0.005)
+            raise ValueError('down')
+
+        flights = asgi.AsyncSingleFlight(core.SingleFlight('test'))
+        results = await asyncio.gather(flights.do('k', fail), flights.do('k', fail), return_exceptions=True)
+        return results, flights.calls[asyncio.get_running_loop()]
+
+    results, pending = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert pending == {}
@@ -0,0 +1,49 @@
+import app as core
+
+
+def make_catalog():
+    return core.AppCatalog.from_rows([
+        {'name': 'Alpha', 'link': 'https://testflight.apple.com/join/a', 'clickCount': 5, 'categories': ['games']},
+        {'name': 'Beta', 'link': 'https://testflight.apple.com/join/b', 'clickCount': 50, 'betaAvailable': 'open'},
+        {'name': 'Gamma', 'link': 'https://testflight.apple.com/join/c', 'clickCount': 20, 'categories': ['games']},
+        {'name': 'Delta', 'link': 'https://testflight.apple.com/join/d', 'clickCount': 20},
+    ])
+
+
+def test_rows_round_trip():
+    catalog = make_catalog()
+    assert len(catalog) == 4
+    assert catalog[1].to_dict() == {'name': 'Beta', 'link': 'https://testflight.apple.com/join/b', 'clickCount': 50, 'betaAvailable': 'open'}
+    assert catalog[-1]['name'] == 'Delta'
+    assert catalog[0].get('betaAvailable') is None
+    assert 'categories' not in catalog[1]
+    assert [row['name'] for row in catalog] == ['Alpha', 'Beta', 'Gamma', 'Delta']
+
+
+def test_click_order_is_stable_for_ties():
+    catalog = make_catalog()
+    assert list(catalog.by_click_count()) == [1, 2, 3, 0]
+
+
+def test_at_least_counts_rows_at_or_above_threshold():
+    catalog = make_catalog()
+    assert catalog.at_least(0) == 4
+    assert catalog.at_least(20) == 3
+    assert catalog.at_least(21) == 1
+    assert catalog.at_least(51) == 0
+
+
+def test_appended_rows_invalidate_the_click_order():
+    catalog = make_catalog()
+    catalog.at_least(0)
+    catalog.append({'name': 'Epsilon', 'clickCount': 100})
+    assert catalog.by_click_count()[0] == 4
+    assert catalog[4].get('link') is None
+
+
+def test_interaction_counts_keep_the_latest_pair():
+    counts = core.InteractionCounts([('beta', 3), ('alpha', 1), ('beta', 7)])
+    assert counts.get('beta') == 7
+    assert counts.get('alpha') == 1
+    assert counts.get('missing', 0) == 0
+    assert 'alpha' in counts and 'gamma' not in counts
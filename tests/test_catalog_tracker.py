@@ -0,0 +1,52 @@
+import pytest
+
+import app as core
+
+
+@pytest.fixture
+def tracker(fake_db, monkeypatch):
+    fake_db.tables['apps'] = [
+        {'id': i, 'name': f'App {i}', 'sanitizedName': f'app-{i}', 'link': f'https://testflight.apple.com/join/{i}',
+         'betaAvailable': 'full', 'clickCount': 0, 'lastChecked': f'2026-01-01T00:00:0{i}+00:00'}
+        for i in range(6)
+    ]
+    monkeypatch.setattr(core, 'app_snapshot', core.AppSnapshot())
+    monkeypatch.setattr(core, 'CATALOG_RETIRE_AFTER_FETCHES', 2)
+    monkeypatch.setattr(core, 'CATALOG_RETIRE_MAX_FRACTION', 0.5)
+    return core.CatalogTracker()
+
+
+def sync(tracker, source, numbers):
+    catalog = core.AppCatalog.from_rows(
+        {'name': f'App {i}', 'link': f'https://testflight.apple.com/join/{i}', 'logo': ''} for i in numbers
+    )
+    return tracker.sync(source, catalog, core.InteractionCounts([]))
+
+
+def retired(fake_db):
+    return sorted(row['sanitizedName'] for row in fake_db.tables['apps'] if row.get('retiredAt'))
+
+
+def test_app_is_retired_after_consecutive_misses(tracker, fake_db):
+    sync(tracker, 'json', range(6))
+    assert sync(tracker, 'json', range(5))['removed'] == 0
+    assert retired(fake_db) == []
+    assert sync(tracker, 'json', range(5))['removed'] == 1
+    assert retired(fake_db) == ['app-5']
+    sync(tracker, 'json', range(6))
+    assert retired(fake_db) == []
+
+
+def test_app_listed_by_another_source_is_not_retired(tracker, fake_db):
+    sync(tracker, 'json', range(6))
+    sync(tracker, 'markdown', range(6))
+    for _ in range(4):
+        sync(tracker, 'json', range(5))
+        sync(tracker, 'markdown', range(6))
+    assert retired(fake_db) == []
+    assert tracker.stats()['missing'] == 0
+
+    # Once the last source drops it too, it goes
+    sync(tracker, 'markdown', range(5))
+    sync(tracker, 'markdown', range(5))
+    assert retired(fake_db) == ['app-5']
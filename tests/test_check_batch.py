@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+import app as core
+
+
+@pytest.fixture
+def client(fake_db, monkeypatch):
+    fake_db.tables['apps'] = [
+        {'id': i, 'name': f'App {i}', 'sanitizedName': f'app-{i}', 'link': f'https://testflight.apple.com/join/{i}',
+         'betaAvailable': 'full', 'clickCount': 0, 'lastChecked': f'2026-01-01T00:00:0{i}+00:00'}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(core, 'app_snapshot', core.AppSnapshot())
+    monkeypatch.setattr(core, 'fetch_beta_availability', lambda url: 'open')
+    return core.app.test_client()
+
+
+def test_every_input_gets_a_line(client):
+    items = ['App 1', 'https://testflight.apple.com/join/1', 'Nope', 'app 1', 'https://testflight.apple.com/join/2']
+    response = client.post('/check_batch', json={'items': items})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    summary = lines.pop()
+    by_index = {line['index']: line for line in lines}
+    assert sorted(by_index) == [0, 1, 2, 3, 4]
+    assert by_index[0]['status'] == 'open'
+    assert by_index[1]['duplicate_of'] == 0 and 'status' not in by_index[1]
+    assert by_index[3]['duplicate_of'] == 0
+    assert by_index[2]['error'] == 'Unknown app name'
+    assert summary['checked'] == 3
+    assert summary['statuses'] == {'open': 2, 'unresolved': 1, 'duplicate': 2}
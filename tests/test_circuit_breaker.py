@@ -0,0 +1,52 @@
+import app as core
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_circuit_opens_at_the_failure_rate_and_recovers_through_one_probe(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(core.time, 'monotonic', clock)
+    monkeypatch.setattr(core, 'CIRCUIT_MIN_REQUESTS', 4)
+    monkeypatch.setattr(core, 'CIRCUIT_FAILURE_RATE', 0.5)
+    monkeypatch.setattr(core, 'CIRCUIT_OPEN_SECONDS', 30)
+    breaker = core.CircuitBreaker('testflight.apple.com')
+
+    for success in (True, False, True):
+        breaker.record(success)
+    assert breaker.state == 'closed'
+    breaker.record(False)
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+    clock.now += 31
+    assert breaker.allow_request()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow_request()
+    breaker.record(False)
+    assert breaker.state == 'open'
+    assert breaker.times_opened == 2
+
+    clock.now += 31
+    assert breaker.allow_request()
+    breaker.record(True)
+    assert breaker.state == 'closed'
+    assert breaker.snapshot()['window_requests'] == 0
+
+
+def test_circuit_forgets_outcomes_outside_the_window(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(core.time, 'monotonic', clock)
+    monkeypatch.setattr(core, 'CIRCUIT_WINDOW_SECONDS', 60)
+    monkeypatch.setattr(core, 'CIRCUIT_MIN_REQUESTS', 4)
+    breaker = core.CircuitBreaker('testflight.apple.com')
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 61
+    breaker.record(False)
+    assert breaker.state == 'closed'
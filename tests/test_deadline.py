@@ -0,0 +1,33 @@
+import app as core
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_deadline_stops_when_the_next_app_would_not_fit(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(core.time, 'monotonic', clock)
+    monkeypatch.setattr(core, 'DEADLINE_FLUSH_RESERVE_MS', 1000)
+    monkeypatch.setattr(core, 'DEADLINE_INITIAL_APP_ESTIMATE_MS', 2000)
+    deadline = core.RunDeadline(10000)
+
+    assert deadline.can_start_app()
+    clock.now += 2.0
+    assert deadline.can_start_app()
+    clock.now += 4.5
+    # Estimate is now (2000 + 4500) / 2 = 3250ms; 3500ms left is not enough with the reserve
+    assert not deadline.can_start_app()
+    assert deadline.report()['stopped_early']
+    assert deadline.request_timeout(30) == 3.5
+
+
+def test_unbounded_deadline_never_stops():
+    deadline = core.RunDeadline(None)
+    assert all(deadline.can_start_app() for _ in range(5))
+    assert deadline.request_timeout(30) == 30
+    assert deadline.report() is None
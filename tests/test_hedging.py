@@ -0,0 +1,39 @@
+import app as core
+
+
+def test_hedge_delay_tracks_p95_within_bounds(monkeypatch):
+    monkeypatch.setattr(core, 'HEDGE_MIN_DELAY_MS', 200)
+    monkeypatch.setattr(core, 'HEDGE_MAX_DELAY_MS', 1500)
+    policy = core.HedgePolicy()
+    assert policy.delay() == core.HEDGE_INITIAL_DELAY_MS / 1000
+
+    for i in range(100):
+        policy.observe(0.3 + i / 1000)
+    assert round(policy.delay(), 3) == 0.394
+
+    for _ in range(core.HEDGE_WINDOW):
+        policy.observe(0.01)
+    assert policy.delay() == 0.2
+
+    for _ in range(core.HEDGE_WINDOW):
+        policy.observe(5.0)
+    assert policy.delay() == 1.5
+
+
+def test_hedge_budget_refills_by_ratio_up_to_the_burst(monkeypatch):
+    monkeypatch.setattr(core, 'HEDGE_BUDGET_RATIO', 0.25)
+    monkeypatch.setattr(core, 'HEDGE_BUDGET_BURST', 2)
+    policy = core.HedgePolicy()
+    assert policy.try_hedge() and policy.try_hedge()
+    assert not policy.try_hedge()
+
+    for _ in range(3):
+        policy.start_fetch()
+    assert not policy.try_hedge()
+    policy.start_fetch()
+    assert policy.try_hedge()
+
+    for _ in range(100):
+        policy.start_fetch()
+    assert policy.snapshot()['tokens'] == 2
+    assert policy.snapshot()['budget_denied'] == 2
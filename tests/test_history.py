@@ -0,0 +1,59 @@
+import app as core
+
+
+def fold(entries, previous_status=None):
+    stats = None
+    for status, timestamp in entries:
+        stats = core.fold_history_entry(stats, 7, 'app-7', previous_status, {'status': status, 'timestamp': timestamp})
+        previous_status = status
+    return stats
+
+
+def test_first_entry_seeds_the_row():
+    stats = fold([('full', '2026-01-01T00:00:00+00:00')])
+    assert stats['appId'] == 7
+    assert stats['samples'] == 1
+    assert stats['transitions'] == 0
+    assert stats['lastStatus'] == 'full'
+    assert stats['firstSeenAt'] == '2026-01-01T00:00:00+00:00'
+
+
+def test_open_period_is_measured_between_flips():
+    stats = fold([
+        ('full', '2026-01-01T00:00:00+00:00'),
+        ('open', '2026-01-01T01:00:00+00:00'),
+        ('full', '2026-01-01T01:30:00+00:00'),
+    ])
+    assert stats['transitions'] == 2
+    assert stats['transitionCounts'] == {'full>open': 1, 'open>full': 1}
+    assert stats['opens'] == 1
+    assert stats['openPeriods'] == 1
+    assert stats['openSeconds'] == 1800.0
+    assert stats['openSince'] is None
+    assert stats['lastFlipAt'] == '2026-01-01T01:30:00+00:00'
+
+
+def test_non_definitive_statuses_only_count_as_samples():
+    stats = fold([
+        ('open', '2026-01-01T00:00:00+00:00'),
+        ('timeout', '2026-01-01T00:10:00+00:00'),
+        ('error', '2026-01-01T00:20:00+00:00'),
+    ])
+    assert stats['samples'] == 3
+    assert stats['transitions'] == 0
+    assert stats['lastStatus'] == 'open'
+    assert stats['openSince'] == '2026-01-01T00:00:00+00:00'
+
+
+def test_app_open_before_tracking_has_no_measured_period():
+    stats = fold([('full', '2026-01-01T00:00:00+00:00')], previous_status='open')
+    assert stats['transitions'] == 1
+    assert stats['openPeriods'] == 0
+    assert stats['openSeconds'] == 0.0
+
+
+def test_folding_does_not_mutate_the_input_row():
+    first = fold([('full', '2026-01-01T00:00:00+00:00')])
+    second = core.fold_history_entry(first, 7, 'app-7', 'full', {'status': 'open', 'timestamp': '2026-01-01T00:05:00+00:00'})
+    assert first['samples'] == 1 and first['lastStatus'] == 'full'
+    assert second['samples'] == 2 and second['lastStatus'] == 'open'
@@ -0,0 +1,57 @@
+import app as core
+
+
+def work():
+    with core.profile_span('load_apps', 'source', url='x'):
+        with core.profile_span('fetch', 'fetch'):
+            pass
+        with core.profile_span('fetch', 'fetch'):
+            pass
+    with core.profile_span('persist', 'supabase'):
+        pass
+    return {'processed': 2}
+
+
+def test_spans_nest_and_totals_add_up():
+    with core.app.test_request_context('/check_apps?profile=1'):
+        result = core.run_profiled(work)
+    profile = result.pop('profile')
+    assert result == {'processed': 2}
+
+    load, persist = profile['spans']
+    assert (load['name'], load['meta']) == ('load_apps', {'url': 'x'})
+    assert [child['name'] for child in load['children']] == ['fetch', 'fetch']
+    assert persist['children'] == []
+    assert all(span['duration_ms'] is not None for span in [load, persist] + load['children'])
+    assert load['duration_ms'] >= sum(child['duration_ms'] for child in load['children']) - 0.02
+
+    totals = profile['totals_by_category']
+    assert {category: totals[category]['count'] for category in totals} == {'source': 1, 'fetch': 2, 'supabase': 1}
+    assert profile['total_ms'] >= load['duration_ms']
+
+
+def test_profiler_is_off_without_the_query_flag():
+    with core.app.test_request_context('/check_apps'):
+        result = core.run_profiled(work)
+    assert 'profile' not in result
+    assert getattr(core._profile_state, 'profiler', None) is None
+
+
+def test_span_outside_a_profiled_run_is_a_no_op():
+    ran = []
+    with core.profile_span('anything', 'misc'):
+        ran.append(True)
+    assert ran == [True]
+
+
+def test_profiler_is_cleared_when_the_run_raises():
+    def failing():
+        with core.profile_span('fetch', 'fetch'):
+            raise RuntimeError('boom')
+
+    with core.app.test_request_context('/check_apps?profile=true'):
+        try:
+            core.run_profiled(failing)
+        except RuntimeError:
+            pass
+    assert getattr(core._profile_state, 'profiler', None) is None
@@ -0,0 +1,32 @@
+import app as core
+
+
+def test_reader_that_fell_behind_the_buffer_is_told_how_much_it_missed():
+    events = core.StatusEventBroadcaster(size=3)
+    cursor = events.latest_id()
+    for i in range(5):
+        events.publish('status', {'n': i})
+    pending, missed = events.events_after(cursor)
+    assert [event['data']['n'] for event in pending] == [2, 3, 4]
+    assert missed == 2
+    assert events.events_after(pending[-1]['id']) == ([], 0)
+    assert events.events_after(pending[0]['id'])[1] == 0
+
+
+def test_resync_is_a_named_event_without_an_id():
+    assert core.format_resync(4) == 'event: resync\ndata: {"missed": 4}\n\n'
+
+
+def test_threaded_stream_turns_away_subscribers_past_the_cap(monkeypatch):
+    monkeypatch.setattr(core, 'status_events', core.StatusEventBroadcaster())
+    monkeypatch.setattr(core, 'SSE_MAX_SUBSCRIBERS', 1)
+    client = core.app.test_client()
+    first = client.get('/events', buffered=False)
+    assert first.status_code == 200
+    second = client.get('/events')
+    assert second.status_code == 503
+    assert second.headers['Retry-After'] == '30'
+    first.close()
+    assert core.status_events.subscribers == 0
+    client.get('/events', buffered=False).close()
+    assert core.status_events.subscribers == 0
@@ -0,0 +1,48 @@
+import pytest
+
+import app as core
+
+
+@pytest.fixture
+def index(fake_db, monkeypatch):
+    fake_db.tables['apps'] = [
+        {'id': i, 'name': f'App {i}', 'sanitizedName': f'app-{i}', 'link': f'https://testflight.apple.com/join/{i}',
+         'betaAvailable': 'full', 'clickCount': (i % 3) * 10, 'categories': ['games'],
+         'retiredAt': '2026-01-01T00:00:00+00:00' if i == 5 else None,
+         'lastChecked': f'2026-01-01T00:00:0{i}+00:00'}
+        for i in range(6)
+    ]
+    snapshot = core.AppSnapshot()
+    monkeypatch.setattr(core, 'app_snapshot', snapshot)
+    return core.ThresholdIndex(snapshot)
+
+
+def test_window_is_ordered_by_clicks_then_name(index):
+    window = index.window(10)
+    assert [row['sanitizedName'] for row in window] == ['app-2', 'app-1', 'app-4']
+    assert window[-1]['clickCount'] == 10
+    with pytest.raises(IndexError):
+        window[3]
+
+
+def test_rows_are_views_until_copied(index):
+    row = index.window(0)[0].to_dict()
+    assert row['categories'] == ['games']
+    row['betaAvailable'] = 'open'
+    assert index.window(0)[0]['betaAvailable'] == 'full'
+
+
+def test_lower_threshold_widens_the_index_once(index):
+    assert len(index.window(20)) == 1
+    assert index.stats()['apps'] == 1
+    assert len(index.window(0)) == 5
+    builds = index.builds
+    assert len(index.window(10)) == 3
+    assert index.builds == builds
+
+
+def test_click_changes_rebuild_without_touching_held_windows(index):
+    held = index.window(0)
+    index.snapshot.apply_rows([{'sanitizedName': 'app-0', 'clickCount': 99, 'lastChecked': '2026-01-02T00:00:00+00:00'}])
+    assert index.window(0)[0]['sanitizedName'] == 'app-0'
+    assert held[0]['sanitizedName'] == 'app-2'
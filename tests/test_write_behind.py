@@ -0,0 +1,70 @@
+from collections import Counter
+
+import pytest
+
+import app as core
+
+
+@pytest.fixture
+def store(tmp_path, fake_db, monkeypatch):
+    store = core.WriteBehindStore(str(tmp_path / 'write_behind.db'))
+    # Flushes are driven by the tests, not by the background thread
+    monkeypatch.setattr(store, '_start_flusher', lambda: None)
+    monkeypatch.setattr(core.history_analytics, 'loaded_at', 0.0)
+    fake_db.tables['apps'] = [{'id': i, 'name': f'App {i}', 'sanitizedName': f'app-{i}', 'betaAvailable': 'full'} for i in range(3)]
+    yield store
+    store.db.close()
+
+
+def enqueue(store, app_id: int, status: str, timestamp: str) -> None:
+    current_app = {'id': app_id, 'name': f'App {app_id}', 'sanitizedName': f'app-{app_id}', 'betaAvailable': 'full'}
+    update = {'betaAvailable': status, 'lastChecked': timestamp}
+    entry = {'appId': app_id, 'status': status, 'timestamp': timestamp}
+    store.enqueue_status(current_app, update, entry, 'full')
+
+
+def test_flush_groups_a_window_by_kind(store, fake_db):
+    for i in range(3):
+        enqueue(store, i, 'open', f'2026-01-01T00:00:0{i}+00:00')
+    enqueue(store, 0, 'full', '2026-01-01T00:00:05+00:00')
+    store.set_cursor('k', 4)
+    assert store.stats()['pending'] == 9
+
+    fake_db.calls.clear()
+    assert store.flush() == 9
+    writes = Counter(call for call in fake_db.calls if call[1] != 'select')
+    assert writes[('apps', 'update')] == 3
+    assert writes[('app_history', 'insert')] == 1
+    assert store.stats()['pending'] == 0
+    # The later update of an app wins, and its history keeps write order
+    assert fake_db.tables['apps'][0]['betaAvailable'] == 'full'
+    assert [row['status'] for row in fake_db.tables['app_history'] if row['appId'] == 0] == ['open', 'full']
+    assert fake_db.tables['processing_indexes'][0]['lastChecked'] == 4
+
+
+def test_acknowledged_apps_leave_the_local_cache(store):
+    enqueue(store, 1, 'open', '2026-01-01T00:00:00+00:00')
+    assert store.get_app('app-1')['betaAvailable'] == 'open'
+    store.flush()
+    assert store.get_app('app-1') is None
+
+
+def test_failed_group_stays_queued(store, fake_db, monkeypatch):
+    enqueue(store, 2, 'open', '2026-01-01T00:00:00+00:00')
+    table = fake_db.table
+
+    def failing_history(name):
+        if name == 'app_history':
+            raise RuntimeError('history unavailable')
+        return table(name)
+
+    monkeypatch.setattr(fake_db, 'table', failing_history)
+    with pytest.raises(RuntimeError):
+        store.flush()
+    # The apps update went out; only the history row is left, and the cache is already released
+    assert store.stats()['pending'] == 1
+    assert store.get_app('app-2') is None
+
+    monkeypatch.setattr(fake_db, 'table', table)
+    assert store.flush() == 1
+    assert store.stats()['pending'] == 0